@@ -24,12 +24,8 @@ def time_function(func):
 @time_function
 def process_jsonl_file(file_path, hg):
     with open(file_path, 'r') as f:
-        for line in f:
-            data = json.loads(line)
-            parsed_edges = data.get('parsed_edges', [])
-            for edge_str in parsed_edges:
-                edge = hgraph(edge_str)
-                hg.add(edge)
+        edge_strs = (edge_str for line in f for edge_str in json.loads(line).get('parsed_edges', []))
+        hg.add_many(edge_strs)
 
 @time_function
 def consolidate_database(input_dir, output_file):
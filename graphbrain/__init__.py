@@ -1,23 +1,41 @@
 from contextlib import contextmanager
 
 from graphbrain.hyperedge import hedge
+import graphbrain.memory.inmemory
 import graphbrain.memory.leveldb
+import graphbrain.memory.sharded
+import graphbrain.memory.snapshot
 import graphbrain.memory.sqlite
 
 
-def hgraph(locator_string):
+def hgraph(locator_string, **kwargs):
     """Returns an instance of Hypergraph identified by the locator_string.
     The hypergraph will be created if it does not exist.
 
-    The location_string can be the path to an SQLite3 file or LevelDB folder.
+    The location_string can be the path to an SQLite3 file or LevelDB folder,
+    or an in-memory hypergraph: either ':memory:' or a name with the extension
+    '.mem', or the path to a read-only snapshot file with the extension '.gbs'
+    (see graphbrain.memory.snapshot), or the path to a directory of shards
+    with the extension '.shards' (see graphbrain.memory.sharded).
+
+    Further keyword arguments are passed to the backend, e.g.
+    hgraph('x.hg', sync=True, flush_threshold=10000) for LevelDB.
     """
+    if locator_string == ':memory:':
+        return graphbrain.memory.inmemory.InMemory(locator_string, **kwargs)
     filename_parts = locator_string.split('.')
     if len(filename_parts) > 1:
         extension = filename_parts[-1]
         if extension in {'sqlite', 'sqlite3', 'db'}:
-            return graphbrain.memory.sqlite.SQLite(locator_string)
+            return graphbrain.memory.sqlite.SQLite(locator_string, **kwargs)
         elif extension in {'leveldb', 'hg'}:
-            return graphbrain.memory.leveldb.LevelDB(locator_string)
+            return graphbrain.memory.leveldb.LevelDB(locator_string, **kwargs)
+        elif extension == 'mem':
+            return graphbrain.memory.inmemory.InMemory(locator_string, **kwargs)
+        elif extension == 'gbs':
+            return graphbrain.memory.snapshot.Snapshot(locator_string, **kwargs)
+        elif extension == 'shards':
+            return graphbrain.memory.sharded.ShardedHypergraph(locator_string, **kwargs)
     raise RuntimeError('Unknown hypergraph database type.')
 
 
@@ -29,6 +47,7 @@ def hopen(*args, **kwds):
     try:
         yield hg
     finally:
+        hg.flush()
         hg.batch_mode = False
         hg.end_transaction()
         hg.close()
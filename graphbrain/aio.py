@@ -0,0 +1,202 @@
+"""asyncio facade for hypergraphs.
+
+AsyncHypergraph runs the methods of a hypergraph in a bounded pool of
+threads, so that they do not block the event loop. Query results are read
+from the hypergraph in chunks, and returned by asynchronous iterators:
+
+    hg = await AsyncHypergraph.open('example.hg')
+    async for edge in hg.search('(is/P * *)'):
+        ...
+    degree = await hg.degree('graphbrain/C')
+    await hg.close()
+
+With a single worker thread (the default), all the calls to the hypergraph
+are made by the same thread, which also opens and closes it. With more
+worker threads, the hypergraph is opened and closed by an additional thread
+and queried by the workers, so the backend must support concurrent readers:
+LevelDB and in-memory hypergraphs do, while SQLite hypergraphs must be
+opened with a reader pool (readers > 0).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+
+# number of results read from the hypergraph at a time by iterators
+CHUNK_SIZE = 1000
+
+# queries that can be read in pages with AsyncHypergraph.page()
+PAGED_QUERIES = {'search', 'match', 'star', 'edges_with_edges', 'sequence'}
+
+
+class AsyncHypergraph(object):
+    """Asynchronous wrapper around a hypergraph.
+
+    Keyword arguments:
+    workers -- maximum number of threads that call the hypergraph at the same
+    time (default: 1)
+    chunk_size -- number of results read from the hypergraph at a time by the
+    iterators (default: CHUNK_SIZE)
+
+    Iterators can be cancelled, or left before they are exhausted: the chunk
+    being read when this happens is completed and discarded, and the
+    underlying generator is then closed.
+    """
+
+    def __init__(self, hg, workers=1, chunk_size=CHUNK_SIZE):
+        self.hg = hg
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(workers)
+        # thread that opens and closes the hypergraph
+        self.owner = self.executor if workers == 1 else ThreadPoolExecutor(1)
+
+    @classmethod
+    async def open(cls, locator_string, workers=1, chunk_size=CHUNK_SIZE, **kwargs):
+        """Opens the hypergraph identified by locator_string in one of the
+        worker threads, and returns an AsyncHypergraph for it. Further keyword
+        arguments are passed to hgraph()."""
+        from graphbrain import hgraph
+        ahg = cls(None, workers=workers, chunk_size=chunk_size)
+        ahg.hg = await ahg._run(partial(hgraph, locator_string, **kwargs), ahg.owner)
+        return ahg
+
+    async def close(self):
+        """Closes the hypergraph and stops the worker threads."""
+        if self.owner is not self.executor:
+            # waits for the workers to finish in the owner thread
+            await self._run(self.executor.shutdown, self.owner)
+        await self._run(self.hg.close, self.owner)
+        self.owner.shutdown(wait=False)
+
+    # =========
+    # Iterators
+    # =========
+
+    def all(self):
+        """Asynchronous iterator of all the edges."""
+        return self._iterate(self.hg.all)
+
+    def search(self, pattern, strict=False, ref_edges=None, cursor=None):
+        """Asynchronous iterator of the edges that match a pattern. See
+        Hypergraph.search()."""
+        return self._iterate(partial(self.hg.search, pattern, strict=strict, ref_edges=ref_edges, cursor=cursor))
+
+    def match(self, pattern, strict=False, curvars=None, ref_edges=None, cursor=None):
+        """Asynchronous iterator of the edges that match a pattern, with the
+        values of its variables. See Hypergraph.match()."""
+        return self._iterate(partial(self.hg.match, pattern, strict=strict, curvars=curvars, ref_edges=ref_edges,
+                                     cursor=cursor))
+
+    def star(self, center, limit=None, cursor=None):
+        """Asynchronous iterator of the edges that contain the center. See
+        Hypergraph.star()."""
+        return self._iterate(partial(self.hg.star, center, limit=limit, cursor=cursor))
+
+    def sequence(self, name, start=0, stop=None, cursor=None):
+        """Asynchronous iterator of the edges of a sequence. See
+        Hypergraph.sequence()."""
+        return self._iterate(partial(self.hg.sequence, name, start=start, stop=stop, cursor=cursor))
+
+    def edges_by_attribute(self, attribute, lo=None, hi=None):
+        """Asynchronous iterator of the edges with a numeric value of an
+        attribute between lo and hi. See Hypergraph.edges_by_attribute()."""
+        return self._iterate(partial(self.hg.edges_by_attribute, attribute, lo=lo, hi=hi))
+
+    # ==================
+    # Awaitable methods
+    # ==================
+
+    async def page(self, query, *args, page_size, cursor=None, **kwargs):
+        """Returns a page of the results of one of the queries in
+        PAGED_QUERIES, given by its name, with at most page_size results.
+        Further arguments are passed to the query method, e.g.:
+
+            page = await hg.page('star', 'graphbrain/C', page_size=100)
+            page = await hg.page('star', 'graphbrain/C', page_size=100, cursor=page.cursor)
+        """
+        if query not in PAGED_QUERIES:
+            raise ValueError('Unknown paged query: {}'.format(query))
+        method = getattr(self.hg, query)
+        return await self._run(partial(method, *args, cursor=cursor, page_size=page_size, **kwargs))
+
+    async def exists(self, edge):
+        return await self._run(partial(self.hg.exists, edge))
+
+    async def count(self, pattern, strict=False):
+        return await self._run(partial(self.hg.count, pattern, strict=strict))
+
+    async def estimate_count(self, pattern, strict=False):
+        return await self._run(partial(self.hg.estimate_count, pattern, strict=strict))
+
+    async def top_k(self, attribute, k, pattern=None):
+        return await self._run(partial(self.hg.top_k, attribute, k, pattern=pattern))
+
+    async def is_primary(self, edge):
+        return await self._run(partial(self.hg.is_primary, edge))
+
+    async def degree(self, edge):
+        return await self._run(partial(self.hg.degree, edge))
+
+    async def deep_degree(self, edge):
+        return await self._run(partial(self.hg.deep_degree, edge))
+
+    async def get_str_attribute(self, edge, attribute, or_else=None):
+        return await self._run(partial(self.hg.get_str_attribute, edge, attribute, or_else))
+
+    async def get_int_attribute(self, edge, attribute, or_else=None):
+        return await self._run(partial(self.hg.get_int_attribute, edge, attribute, or_else))
+
+    async def get_float_attribute(self, edge, attribute, or_else=None):
+        return await self._run(partial(self.hg.get_float_attribute, edge, attribute, or_else))
+
+    async def text(self, edge):
+        return await self._run(partial(self.hg.text, edge))
+
+    # =====================
+    # Local private methods
+    # =====================
+
+    async def _run(self, f, executor=None):
+        """Calls f in a worker thread and returns its result."""
+        return await asyncio.get_running_loop().run_in_executor(executor or self.executor, f)
+
+    async def _iterate(self, make_iterator):
+        """Asynchronous iterator of the results of make_iterator(), which is
+        called and consumed in the worker threads, one chunk at a time."""
+        iterator = None
+
+        def next_chunk():
+            nonlocal iterator
+            if iterator is None:
+                iterator = iter(make_iterator())
+            return list(islice(iterator, self.chunk_size))
+
+        def close():
+            if iterator is not None and hasattr(iterator, 'close'):
+                iterator.close()
+
+        future = None
+        try:
+            while True:
+                future = self.executor.submit(next_chunk)
+                chunk = await asyncio.wrap_future(future)
+                for item in chunk:
+                    yield item
+                if len(chunk) < self.chunk_size:
+                    return
+        finally:
+            # the generator is closed in a worker thread, once the chunk that
+            # may still be being read from it is complete
+            if future is None or future.done():
+                self._submit(close)
+            else:
+                future.add_done_callback(lambda _: self._submit(close))
+
+    def _submit(self, f):
+        """Calls f in a worker thread without waiting for it, or in the
+        current thread if the workers were stopped."""
+        try:
+            self.executor.submit(f)
+        except RuntimeError:
+            f()
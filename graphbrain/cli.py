@@ -1,13 +1,19 @@
 import argparse
 import json
 import logging
+import os
 import sys
+import time
+
+import progressbar
 
 from termcolor import colored
 
 import graphbrain.constants as const
-from graphbrain import hgraph, hedge
+from graphbrain import hgraph
 from graphbrain.learner.learner import Learner
+from graphbrain.memory.snapshot import write_snapshot
+from graphbrain.memory.transfer import export_hypergraph, import_hypergraph
 from graphbrain.parsers import parser_lang
 from graphbrain.processors.actors import Actors
 from graphbrain.processors.claims import Claims
@@ -51,10 +57,12 @@ def cli():
     parser.add_argument('--infsrcs', help='add inference sources to hypergraph', action='store_true')
     parser.add_argument('--lang', type=str, help='language', default=None)
     parser.add_argument('--outdir', type=str, help='output directory')
-    parser.add_argument('--outfile', type=str, help='output file', default=None)
+    parser.add_argument('--outfile', '--out', type=str, help='output file', default=None)
     parser.add_argument('--parser', type=str, help='parser', default=None)
+    parser.add_argument('--resume', help='resume interrupted import', action='store_true')
     parser.add_argument('--sequence', type=str, help='sequence name', default=None)
     parser.add_argument('--url', type=str, help='url', default=None)
+    parser.add_argument('--workers', type=int, help='number of worker processes', default=1)
 
     args = parser.parse_args()
 
@@ -105,6 +113,8 @@ def cli():
         print('sequence: {}'.format(args.sequence))
     if args.url:
         print('url: {}'.format(args.url))
+    if args.workers != 1:
+        print('workers: {}'.format(args.workers))
 
     print()
 
@@ -114,23 +124,85 @@ def cli():
     elif args.command == 'export':
         print('exporting hypergraph...')
         hg = hgraph(args.hg)
-        n = 0
-        with open(args.outfile, 'w') as f:
-            for edge, attributes in hg.all_attributes():
-                row = [str(edge), attributes]
-                f.write('{}\n'.format(json.dumps(row, ensure_ascii=False)))
-                n += 1
-        print('{} edges exported.'.format(n))
+        start = time.time()
+        with progressbar.ProgressBar(max_value=progressbar.UnknownLength) as bar:
+            n = export_hypergraph(hg, args.outfile, workers=args.workers,
+                                  progress=lambda edges, position: bar.update(edges))
+        hg.close()
+        print('{} edges exported ({:.0f} edges/s).'.format(n, n / max(time.time() - start, 1e-6)))
     elif args.command == 'import':
         print('importing hypergraph...')
         hg = hgraph(args.hg)
-        n = 0
-        with open(args.infile, 'r') as f:
-            for line in f:
-                edge_str, attributes = json.loads(line)
-                hg.add_with_attributes(hedge(edge_str), attributes)
-                n += 1
-        print('{} edges imported.'.format(n))
+        # the offset reached by the import is recorded, so that it can be
+        # resumed if interrupted
+        state_file = '{}.import'.format(args.hg)
+        offset = 0
+        if args.resume and os.path.exists(state_file):
+            with open(state_file, 'r') as f:
+                state = json.loads(f.read())
+            if state['infile'] != args.infile:
+                error_msg('the interrupted import was from {}'.format(state['infile']))
+                sys.exit(-1)
+            offset = state['offset']
+            print('resuming from offset {}'.format(offset))
+
+        def update(edges, offset_reached, position):
+            with open(state_file, 'w') as f:
+                f.write(json.dumps({'infile': args.infile, 'offset': offset_reached}))
+            bar.update(position)
+
+        start = time.time()
+        with progressbar.ProgressBar(max_value=os.path.getsize(args.infile)) as bar:
+            n, _ = import_hypergraph(hg, args.infile, workers=args.workers, offset=offset, progress=update)
+        hg.close()
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        print('{} edges imported ({:.0f} edges/s).'.format(n, n / max(time.time() - start, 1e-6)))
+    elif args.command == 'snapshot':
+        if not args.outfile:
+            error_msg('the snapshot file must be given with --out')
+            sys.exit(-1)
+        print('writing snapshot...')
+        hg = hgraph(args.hg)
+        n = write_snapshot(hg, args.outfile)
+        hg.close()
+        print('{} edges written.'.format(n))
+    elif args.command == 'recompute_degrees':
+        print('recomputing degrees...')
+        hg = hgraph(args.hg)
+        n = hg.recompute_degrees()
+        hg.close()
+        print('{} edges updated.'.format(n))
+    elif args.command == 'recompute_statistics':
+        print('recomputing statistics...')
+        hg = hgraph(args.hg)
+        n = hg.recompute_statistics()
+        hg.close()
+        print('{} edges counted.'.format(n))
+    elif args.command == 'recompute_sequence_index':
+        print('recomputing sequence index...')
+        hg = hgraph(args.hg)
+        n = hg.recompute_sequence_index()
+        hg.close()
+        print('{} sequence edges indexed.'.format(n))
+    elif args.command == 'recompute_lemma_index':
+        print('recomputing lemma index...')
+        hg = hgraph(args.hg)
+        n = hg.recompute_lemma_index()
+        hg.close()
+        print('{} lemma edges indexed.'.format(n))
+    elif args.command == 'recompute_type_index':
+        print('recomputing type index...')
+        hg = hgraph(args.hg)
+        n = hg.recompute_type_index()
+        hg.close()
+        print('{} type-of edges indexed.'.format(n))
+    elif args.command == 'create_relation_index':
+        print('creating relation index...')
+        hg = hgraph(args.hg)
+        n = hg.create_relation_index()
+        hg.close()
+        print('{} relations indexed.'.format(n))
     elif args.command == 'txt':
         TxtReader(args.infile,
                   hg=hgraph(args.hg),
@@ -1,9 +1,23 @@
+import base64
+import json
+from itertools import islice
 from typing import Iterator, Union, Optional
 
 import graphbrain.constants as const
 from graphbrain.hyperedge import hedge, Hyperedge, str2atom
 
 
+class Page(list):
+    """A page of the results of a query, returned by the query methods that
+    accept page_size. The cursor attribute is an opaque string that resumes
+    the query after the last result of the page, or None if there are no
+    more results. A full page can be followed by an empty one."""
+
+    def __init__(self, results, cursor):
+        super().__init__(results)
+        self.cursor = cursor
+
+
 def _hedge_params(pattern, ref_edges=None):
     """Returns a tuple of the pattern and ref_edges parameters
     after they have been converted to hyperedges.
@@ -14,6 +28,69 @@ def _hedge_params(pattern, ref_edges=None):
     return pattern, ref_edges
 
 
+def _attribute_number(value):
+    """Returns an attribute value as a float, or None if it is not a number.
+    Only numeric values are ranked by top_k() and edges_by_attribute()."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN cannot be ordered
+    return number if number == number else None
+
+
+def _deep_atom(edge):
+    """Returns the atom found by descending the edge, always choosing the
+    subedge immediately after the connector (see utils.lemmas.deep_lemma()).
+    """
+    while edge.not_atom:
+        edge = edge[1]
+    return edge
+
+
+def _encode_cursor(query, position):
+    return base64.urlsafe_b64encode(json.dumps([query, position]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(query, cursor):
+    """Returns the position encoded by a cursor of the given query, or None
+    if cursor is None. Raises ValueError if the cursor is not valid."""
+    if cursor is None:
+        return None
+    try:
+        cursor_query, position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    if cursor_query != query:
+        raise ValueError('Cursor of a {} query used to resume a {} query.'.format(cursor_query, query))
+    return position
+
+
+def _paginate(query, positions, page_size):
+    """Given a generator of (result, position) tuples, returns a Page with
+    its first page_size results, or a generator of all its results if
+    page_size is None."""
+    if page_size is None:
+        return (result for result, _ in positions)
+    if type(page_size) is not int or page_size < 1:
+        raise ValueError('page_size must be a positive integer.')
+    items = list(islice(positions, page_size))
+    if hasattr(positions, 'close'):
+        positions.close()
+    cursor = _encode_cursor(query, items[-1][1]) if len(items) == page_size else None
+    return Page([result for result, _ in items], cursor)
+
+
+def _offset_positions(results, offset):
+    """Returns a generator of (result, position) tuples, where the position
+    is the number of results up to this one, skipping the first offset
+    results."""
+    n = offset or 0
+    for result in islice(results, n, None):
+        n += 1
+        yield result, n
+
+
 class Hypergraph(object):
     """Hypergraph interface."""
 
@@ -52,12 +129,97 @@ class Hypergraph(object):
         dictionary of attribute names to values."""
         raise NotImplementedError()
 
+    def add_many_with_attributes(self, edges_attributes):
+        """Adds edges along with their attributes, in batch. The parameter
+        is an iterable of (edge, attributes) tuples, where attributes is a
+        dictionary of attribute names to values. Returns the number of edges
+        that were added."""
+        raise NotImplementedError()
+
     def begin_transaction(self):
         pass
 
     def end_transaction(self):
         pass
 
+    def flush(self):
+        """Writes any updates that are kept in memory, such as the degree
+        updates that are deferred in batch mode."""
+        pass
+
+    def recompute_degrees(self):
+        """Recomputes the degree and deep degree of every edge from the
+        primary edges, fixing any inconsistencies. Returns the number of
+        edges whose degrees were updated."""
+        raise NotImplementedError()
+
+    def recompute_statistics(self):
+        """Rebuilds the cardinality statistics used to plan queries (see
+        explain()) from the stored edges. Returns the number of edges that
+        were counted."""
+        raise NotImplementedError()
+
+    def recompute_sequence_index(self):
+        """Rebuilds the index used to read sequences (see sequence()) from
+        the stored sequence edges. Returns the number of sequence edges that
+        were indexed."""
+        raise NotImplementedError()
+
+    def recompute_lemma_index(self):
+        """Rebuilds the index used to find lemmas (see lemma_of() and
+        atoms_with_lemma()) from the stored lemma edges. Returns the number
+        of lemma edges that were indexed."""
+        raise NotImplementedError()
+
+    def recompute_type_index(self):
+        """Rebuilds the index of the transitive closure of the type-of
+        relations (see supertypes() and subtypes()) from the stored
+        (_type_of edge type) edges. Returns the number of type-of edges that
+        were indexed."""
+        raise NotImplementedError()
+
+    def create_relation_index(self):
+        """Creates the index used by relations(), or rebuilds it if it
+        already exists. The index is then kept up to date as edges are
+        added and removed. Returns the number of relations indexed."""
+        raise NotImplementedError()
+
+    def drop_relation_index(self):
+        """Removes the index used by relations()."""
+        raise NotImplementedError()
+
+    def create_index(self, attribute):
+        """Creates a secondary index of the numeric values of an attribute,
+        or rebuilds it if it already exists. The index is then kept up to
+        date as edges and attributes are written, and is used by top_k() and
+        edges_by_attribute(). Returns the number of edges indexed."""
+        raise NotImplementedError()
+
+    def drop_index(self, attribute):
+        """Removes the secondary index of an attribute."""
+        raise NotImplementedError()
+
+    def coref_members(self, cref_id):
+        """Returns a generator of the recorded members of the coreference
+        set with the given identifier (see utils.corefs)."""
+        raise NotImplementedError()
+
+    def coref_size(self, cref_id):
+        """Returns the recorded number of members of the coreference set
+        with the given identifier, or None if the set is not recorded."""
+        raise NotImplementedError()
+
+    def add_coref_members(self, cref_id, edges):
+        """Records edges as members of the coreference set with the given
+        identifier, creating its record if needed. Returns the new number of
+        members of the set."""
+        raise NotImplementedError()
+
+    def remove_coref_set(self, cref_id):
+        """Removes the record of the coreference set with the given
+        identifier."""
+        raise NotImplementedError()
+
     # ============================
     # High-level interface methods
     # ============================
@@ -112,6 +274,20 @@ class Hypergraph(object):
             return self.add(hedge(edge), primary=primary, count=count)
         return None
 
+    def add_many(self, edges, primary=True):
+        """Adds all the edges from an iterable, in batch. The result is the
+        same as calling add() for each one of them, but subedges are
+        deduplicated in memory, degree increments are aggregated and the
+        writes to the database are grouped in large transactions. Returns
+        the number of edges that were processed.
+
+        Edges can be passed in both Hyperedge or string format.
+
+        Keyword arguments:
+        primary -- edges are primary (default True). See add().
+        """
+        return self._add_many((hedge(edge) for edge in edges if edge), primary)
+
     def remove(self, edge, deep=False):
         """Removes an edge.
 
@@ -134,8 +310,10 @@ class Hypergraph(object):
             self,
             pattern: Union[Hyperedge, str, list, tuple],
             strict: bool = False,
-            ref_edges: list[Union[Hyperedge, str, list, tuple]] = None
-    ) -> Iterator[Hyperedge]:
+            ref_edges: list[Union[Hyperedge, str, list, tuple]] = None,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = None
+    ) -> Union[Iterator[Hyperedge], Page]:
         """Returns generator for all the edges that match a pattern.
 
         Patterns are themselves edges. They can match families of edges
@@ -155,9 +333,17 @@ class Hypergraph(object):
         Keyword argument:
         strict -- if True atoms are matched exactly and search is faster. If False, atoms in the pattern can match more
         specific versions, e.g.: apple/C in the pattern will match apple/Cc.s/en (default: False)
+        cursor -- resume the search after the last result of a previous page, given the cursor of that page (default:
+        None)
+        page_size -- if given, a Page with at most this number of results is returned, instead of a generator
+        (default: None)
         """
         pattern, ref_edges = _hedge_params(pattern, ref_edges)
 
+        if cursor is not None or page_size is not None:
+            position = _decode_cursor('search', cursor)
+            return _paginate('search', self._search_positions(pattern, strict, ref_edges, position), page_size)
+
         if pattern.atom and len(pattern.parts()) == 1:
             if pattern.parens:
                 return self.all_non_atoms()
@@ -174,9 +360,15 @@ class Hypergraph(object):
             strict: bool = False,
             skip_semsim: bool = False,
             curvars: Optional[dict[str, Hyperedge]] = None,
-            ref_edges: list[Union[Hyperedge, str, list, tuple]] = None
-    ) -> Iterator[tuple[Hyperedge, list[dict[str, Hyperedge]]]]:
+            ref_edges: list[Union[Hyperedge, str, list, tuple]] = None,
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = None
+    ) -> Union[Iterator[tuple[Hyperedge, list[dict[str, Hyperedge]]]], Page]:
         pattern, ref_edges = _hedge_params(pattern, ref_edges)
+        if cursor is not None or page_size is not None:
+            position = _decode_cursor('match', cursor)
+            positions = self._match_positions(pattern, strict, skip_semsim, curvars, ref_edges, position)
+            return _paginate('match', positions, page_size)
         return self._match(pattern, strict, skip_semsim=skip_semsim, curvars=curvars, ref_edges=ref_edges)
 
     def match_sequence(
@@ -206,7 +398,7 @@ class Hypergraph(object):
         pattern, ref_edges = _hedge_params(pattern, ref_edges)
         return self._match_edges(edges, pattern, strict, skip_semsim=skip_semsim, curvars=curvars, ref_edges=ref_edges)
 
-    def count(self, pattern: Union[Hyperedge, str, list, tuple]) -> int:
+    def count(self, pattern: Union[Hyperedge, str, list, tuple], strict: bool = False) -> int:
         """Number of edges that match a pattern.
         See search() method for an explanation of patterns.
 
@@ -214,14 +406,48 @@ class Hypergraph(object):
         strict -- if True atoms are matched exactly and search is faster. If False, atoms in the pattern can match more
         specific versions, e.g.: apple/C in the pattern will match apple/Cc.s/en (default: False)
         """
-        return len(list(self.search(hedge(pattern))))
+        return sum(1 for _ in self.search(hedge(pattern), strict=strict))
+
+    def estimate_count(self, pattern: Union[Hyperedge, str, list, tuple], strict: bool = False) -> int:
+        """Estimated number of edges that match a pattern, meant for
+        progress reporting and query planning. Backends that cannot estimate
+        it return the exact count.
 
-    def star(self, center, limit=None):
+        Keyword argument:
+        strict -- see count() (default: False)
+        """
+        return self.count(pattern, strict=strict)
+
+    def explain(self, pattern: Union[Hyperedge, str, list, tuple], strict: bool = False) -> dict:
+        """Returns a dictionary describing how search() and match() find the
+        candidate edges for a pattern: 'scan' is 'all' if every edge is
+        considered, or 'index' if the edges are found from the elements of
+        the pattern that are not patterns themselves (its anchors).
+        'anchors' lists these elements, each one with its 'edge', 'position'
+        and estimated number of 'rows', 'plan' gives the positions of the
+        anchors that are scanned, in order, and 'rows' is the estimated
+        number of candidates.
+
+        Keyword argument:
+        strict -- see search() (default: False)
+        """
+        return self._explain(hedge(pattern), strict)
+
+    def star(self, center, limit=None, cursor=None, page_size=None):
         """Returns generator of the edges that contain the center.
 
         Keyword argument:
         limit -- maximum number of results to return, infinite if None
+        cursor -- resume after the last result of a previous page, given the
+        cursor of that page (default: None)
+        page_size -- if given, a Page with at most this number of results is
+        returned, instead of a generator (default: None)
         """
+        if cursor is not None or page_size is not None:
+            positions = self._star_positions(hedge(center), _decode_cursor('star', cursor))
+            if limit:
+                positions = islice(positions, limit)
+            return _paginate('star', positions, page_size)
         return self._star(hedge(center), limit=limit)
 
     def atoms_with_root(self, root):
@@ -230,13 +456,20 @@ class Hypergraph(object):
             return {}
         return self._atoms_with_root(root)
 
-    def edges_with_edges(self, edges, root=None):
+    def edges_with_edges(self, edges, root=None, cursor=None, page_size=None):
         """Returns generator of all edges containing the given edges,
         and optionally a given root.
 
         Keyword argument:
         root -- edge must also contain an atom with this root (default None)
+        cursor -- resume after the last result of a previous page, given the
+        cursor of that page (default: None)
+        page_size -- if given, a Page with at most this number of results is
+        returned, instead of a generator (default: None)
         """
+        if cursor is not None or page_size is not None:
+            position = _decode_cursor('edges_with_edges', cursor)
+            return _paginate('edges_with_edges', self._edges_with_edges_positions(edges, root, position), page_size)
         return self._edges_with_edges(edges, root)
 
     def set_attribute(self, edge, attribute, value):
@@ -347,20 +580,35 @@ class Hypergraph(object):
             self.set_primary(edge, True)
         return result
 
-    def sequence(self, name):
+    def sequence(self, name, start=0, stop=None, cursor=None, page_size=None):
         """Returns an iterator for a sequence of hyperedges, given the name
-        of the sequence.
+        of the sequence. Only the edges from position start up to (but not
+        including) position stop are returned, or up to the end of the
+        sequence if stop is None.
+
+        Keyword arguments:
+        cursor -- resume after the last edge of a previous page, given the
+        cursor of that page (default: None)
+        page_size -- if given, a Page with at most this number of edges is
+        returned, instead of an iterator (default: None)
         """
-        pos = 0
-        stop = False
-        while not stop:
+        if cursor is not None or page_size is not None:
+            position = _decode_cursor('sequence', cursor)
+            return _paginate('sequence', self._sequence_positions(name, start, stop, position), page_size)
+        return self._sequence(name, start, stop)
+
+    def _sequence(self, name, start, stop):
+        """Returns an iterator for the edges of a sequence, see
+        sequence()."""
+        pos = start
+        while stop is None or pos < stop:
             iteration = self.search((const.sequence_connector, name, str(pos), '*'), strict=True)
             next_edge = next(iteration, None)
             if next_edge:
                 yield next_edge[3]
                 pos += 1
             else:
-                stop = True
+                return
 
     def sequences(self):
         """Returns an iterator for all the sequence names present in the
@@ -369,6 +617,126 @@ class Hypergraph(object):
         for edge in self.search((const.sequence_connector, '*', '0', '*'), strict=True):
             yield edge[1].to_str()
 
+    def lemma_of(self, atoms):
+        """Returns a list with the lemmas of the given atoms, in the same
+        order, or None for the atoms that do not have a lemma (or are not
+        atoms). Lemmas are given by (_lemma atom lemma) edges, where atoms
+        are simplified (see Atom.simplify())."""
+        lemmas = []
+        for atom in atoms:
+            atom = hedge(atom)
+            lemma = None
+            if atom.atom:
+                for lemma_edge in self.search((const.lemma_connector, atom.simplify(), '*'), strict=True):
+                    lemma = lemma_edge[2]
+                    break
+            lemmas.append(lemma)
+        return lemmas
+
+    def atoms_with_lemma(self, lemma):
+        """Returns a generator of the (simplified) atoms that have the given
+        lemma."""
+        for lemma_edge in self.search((const.lemma_connector, '*', lemma), strict=True):
+            yield lemma_edge[1]
+
+    def supertypes(self, edge, deep=False):
+        """Returns a dictionary with the supertypes of the edge, given by
+        (_type_of edge type) edges, and their depths: 1 for its direct
+        supertypes, 2 for their supertypes, and so on. Only the direct
+        supertypes are returned, unless deep is True. The depth of a
+        supertype is the length of the shortest chain of type-of edges from
+        the edge to it."""
+        return self._type_closure(hedge(edge), 1, 2, deep)
+
+    def subtypes(self, edge, deep=False):
+        """Returns a dictionary with the subtypes of the edge and their
+        depths, like supertypes()."""
+        return self._type_closure(hedge(edge), 2, 1, deep)
+
+    def is_type_of(self, edge, type_edge):
+        """Checks if type_edge is a supertype of edge, directly or not
+        (i.e. if edge is a kind of type_edge)."""
+        return hedge(type_edge) in self.supertypes(edge, deep=True)
+
+    def _type_closure(self, edge, position, other, deep):
+        """Returns the supertypes (position=1, other=2) or subtypes
+        (position=2, other=1) of the edge with their depths, following the
+        type-of edges breadth-first and visiting each edge once."""
+        types = {}
+        frontier = [edge]
+        depth = 1
+        while len(frontier) > 0:
+            next_frontier = []
+            for item in frontier:
+                if position == 1:
+                    pattern = (const.type_of_connector, item, '*')
+                else:
+                    pattern = (const.type_of_connector, '*', item)
+                for type_edge in self.search(pattern, strict=True):
+                    found = type_edge[other]
+                    if found not in types and found != edge:
+                        types[found] = depth
+                        next_frontier.append(found)
+            if not deep:
+                break
+            frontier = next_frontier
+            depth += 1
+        return types
+
+    def relations(self, lemmas, argrole):
+        """Returns a generator of (edge, argument) tuples, for the relations
+        whose predicate has a lemma with its root in lemmas, and for each one
+        of their arguments with the given argument role. The lemma of a
+        predicate is the lemma of its deep atom (see
+        utils.lemmas.deep_lemma()), or the atom itself if it has no lemma.
+        For example, hg.relations({'say', 'claim'}, 's') returns the
+        relations with the predicates 'says' or 'claimed', with their
+        subjects.
+
+        With the relation index (see create_relation_index()), only the
+        relations of the matching predicates are read. Otherwise, all the
+        edges are scanned.
+        """
+        lemmas = set(lemmas)
+        for edge in self.all():
+            if edge.not_atom and edge.connector_mtype() == 'P':
+                arguments = edge.edges_with_argrole(argrole)
+                if len(arguments) > 0:
+                    atom = _deep_atom(edge[0])
+                    lemma = self.lemma_of((atom,))[0]
+                    if (atom if lemma is None else lemma).root() in lemmas:
+                        for argument in arguments:
+                            yield edge, argument
+
+    def top_k(self, attribute, k, pattern=None):
+        """Returns a list of the k edges with the highest numeric values of
+        an attribute, in decreasing order of the values (edges with the same
+        value are ordered by their string representation). Edges without a
+        numeric value of the attribute are not considered.
+
+        Keyword argument:
+        pattern -- only edges that match this pattern are considered
+        (default: None)
+
+        With a secondary index of the attribute (see create_index()), the
+        edges are read in order from the index. Otherwise, the attributes of
+        all the edges are scanned.
+        """
+        if pattern is not None:
+            pattern = hedge(pattern)
+        edges = (edge for edge, _ in self._attribute_values(attribute)
+                 if pattern is None or self._matches(edge, pattern))
+        return list(islice(edges, k))
+
+    def edges_by_attribute(self, attribute, lo=None, hi=None):
+        """Returns a generator of the edges with a numeric value of an
+        attribute between lo and hi (inclusive), in decreasing order of the
+        values, as in top_k(). Bounds that are None are not checked."""
+        for edge, value in self._attribute_values(attribute, hi):
+            if lo is not None and value < lo:
+                return
+            yield edge
+
     def text(self, edge):
         """Returns the text representation of an edge."""
         txt = self.get_str_attribute(edge, 'text')
@@ -387,6 +755,9 @@ class Hypergraph(object):
     def _add(self, edge, primary):
         raise NotImplementedError()
 
+    def _add_many(self, edges, primary):
+        raise NotImplementedError()
+
     def _remove(self, edge, deep):
         raise NotImplementedError()
 
@@ -405,6 +776,9 @@ class Hypergraph(object):
     def _match_edges(self, edges, pattern, strict, skip_semsim=False, curvars=None, ref_edges=None):
         raise NotImplementedError()
 
+    def _explain(self, pattern, strict):
+        raise NotImplementedError()
+
     def _star(self, center, limit=None):
         raise NotImplementedError()
 
@@ -437,3 +811,58 @@ class Hypergraph(object):
 
     def _deep_degree(self, edge):
         raise NotImplementedError()
+
+    # ================================================================
+    # Resumable queries, which derived classes can implement with
+    # positions in their indexes. Positions must be JSON-serializable.
+    # ================================================================
+
+    def _search_positions(self, pattern, strict, ref_edges, position):
+        """Returns a generator of (edge, position) tuples for the results of
+        search(), resumed after the given position if it is not None. By
+        default, the position is the number of results."""
+        return _offset_positions(self.search(pattern, strict=strict, ref_edges=ref_edges), position)
+
+    def _match_positions(self, pattern, strict, skip_semsim, curvars, ref_edges, position):
+        """Same as _search_positions(), for the results of match()."""
+        results = self._match(pattern, strict, skip_semsim=skip_semsim, curvars=curvars, ref_edges=ref_edges)
+        return _offset_positions(results, position)
+
+    def _star_positions(self, center, position):
+        """Same as _search_positions(), for the results of star()."""
+        return _offset_positions(self._star(center), position)
+
+    def _edges_with_edges_positions(self, edges, root, position):
+        """Same as _search_positions(), for the results of
+        edges_with_edges()."""
+        return _offset_positions(self._edges_with_edges(edges, root), position)
+
+    def _sequence_positions(self, name, start, stop, position):
+        """Same as _search_positions(), for the edges of a sequence. The
+        position is the one of the next edge in the sequence."""
+        pos = start if position is None else position
+        for edge in self._sequence(name, pos, stop):
+            pos += 1
+            yield edge, pos
+
+    # ====================================================================
+    # Attribute rankings, which derived classes can implement with indexes
+    # ====================================================================
+
+    def _attribute_values(self, attribute, hi=None):
+        """Returns a generator of (edge, value) tuples for the edges with a
+        numeric value of an attribute not higher than hi (if it is given),
+        in decreasing order of the values and then in increasing order of
+        the edges' string representations. By default, the attributes of all
+        the edges are scanned and sorted."""
+        items = []
+        for edge, attributes in self.all_attributes():
+            value = _attribute_number(attributes.get(attribute))
+            if value is not None and (hi is None or value <= hi):
+                items.append((-value, edge.to_str(), edge))
+        items.sort(key=lambda item: item[:2])
+        for value, _, edge in items:
+            yield edge, -value
+
+    def _matches(self, edge, pattern):
+        return next(iter(self._match_edges((edge,), pattern, False)), None) is not None
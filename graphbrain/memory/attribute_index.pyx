@@ -0,0 +1,104 @@
+import json
+import struct
+
+from graphbrain.hyperedge import hedge
+from graphbrain.hypergraph import _attribute_number
+from graphbrain.memory.auxiliary import ATTRIBUTE_INDEX_PREFIX, ATTRIBUTE_INDEXES_KEY, BATCH_SIZE, _chunks
+
+
+def _index_value(value):
+    """Returns the fixed width key of an attribute value, or None if it is not a number."""
+    number = _attribute_number(value)
+    if number is None:
+        return None
+    bits = struct.unpack('>Q', struct.pack('>d', number))[0]
+    # the bits of negative numbers are inverted, and the sign bit of the
+    # others is set, so that the unsigned integers are in the same order as
+    # the numbers, and then all of them are inverted, so that the index is
+    # scanned from the highest value
+    if bits >> 63:
+        return '{:016x}'.format(bits)
+    return '{:016x}'.format(bits ^ 0x7fffffffffffffff)
+
+
+def _decode_index_value(value):
+    """Returns the bits of the float of an attribute index value (see _index_value())."""
+    bits = int(value, 16)
+    return bits if bits >> 63 else bits ^ 0x7fffffffffffffff
+
+
+def _attribute_index_prefix(attribute):
+    return ''.join((ATTRIBUTE_INDEX_PREFIX, attribute, ' '))
+
+
+class AttributeIndexes(object):
+    """Secondary indexes of the edges by the values of numeric attributes. Mixin of KeyValue."""
+
+    def create_index(self, attribute):
+        if len(attribute) == 0 or ' ' in attribute:
+            raise ValueError('Invalid attribute name for an index: {}'.format(attribute))
+        self.drop_index(attribute)
+        # the entries are collected before they are written, so that the scan
+        # is not affected by the writes
+        entries = []
+        for edge, attributes in self.all_attributes():
+            value = _index_value(attributes.get(attribute))
+            if value is not None:
+                entries.append(self._attribute_index_key(attribute, value, edge.to_str()))
+        for chunk in _chunks(entries, BATCH_SIZE):
+            self.begin_transaction()
+            for key in chunk:
+                self._write_aux(key, '')
+            self.end_transaction()
+        self.indexes.append(attribute)
+        self._write_indexes()
+        return len(entries)
+
+    def drop_index(self, attribute):
+        self.flush()
+        self._remove_aux_with_prefixes((_attribute_index_prefix(attribute),))
+        if attribute in self.indexes:
+            self.indexes.remove(attribute)
+            self._write_indexes()
+
+    # from Hypergraph
+    def _attribute_values(self, attribute, hi=None):
+        if attribute not in self.indexes:
+            yield from super()._attribute_values(attribute, hi)
+            return
+        self.flush()
+        prefix = _attribute_index_prefix(attribute)
+        start = None if hi is None or _index_value(hi) is None else ''.join((prefix, _index_value(hi)))
+        for key, _ in self._aux_with_prefix(prefix, start):
+            value, edge_str = key[len(prefix):].split(' ', 1)
+            number = struct.unpack('>d', struct.pack('>Q', _decode_index_value(value)))[0]
+            yield hedge(edge_str), number
+
+    def _init_attribute_indexes(self):
+        """Reads the attributes with a secondary index."""
+        indexes = self._aux_value(ATTRIBUTE_INDEXES_KEY)
+        self.indexes = [] if indexes is None else json.loads(indexes)
+
+    def _attribute_index_key(self, attribute, value, edge_str):
+        return ''.join((_attribute_index_prefix(attribute), value, ' ', edge_str))
+
+    def _update_attribute_indexes(self, key, old_attributes, attributes):
+        """Updates the index entries of an edge whose attributes change. Must be called inside a transaction."""
+        # attributes is None if the edge is removed
+        edge_str = None
+        for attribute in self.indexes:
+            old_value = None if old_attributes is None else _index_value(old_attributes.get(attribute))
+            value = None if attributes is None else _index_value(attributes.get(attribute))
+            if value == old_value:
+                continue
+            if edge_str is None:
+                edge_str = self._key2str(key)
+            if old_value is not None:
+                self._remove_aux(self._attribute_index_key(attribute, old_value, edge_str))
+            if value is not None:
+                self._write_aux(self._attribute_index_key(attribute, value, edge_str), '')
+
+    def _write_indexes(self):
+        self.begin_transaction()
+        self._write_aux(ATTRIBUTE_INDEXES_KEY, json.dumps(self.indexes))
+        self.end_transaction()
@@ -0,0 +1,52 @@
+# Auxiliary keys of key-value hypergraph databases, which are stored apart
+# from edges and permutations. Their first character tells what they hold:
+#
+# m -- storage options, and flags of the indexes that exist
+# e, i -- id dictionary of the 'ids' encoding, from edges to ids and back
+# a, r -- cardinality statistics, per atom and per root (see planner)
+# q -- sequence index (see sequence_index)
+# n -- attribute indexes (see attribute_index)
+# l, w -- lemma index, from atoms to lemmas and back (see lemma_index)
+# t, u -- type index, from edges to supertypes and back (see type_index)
+# v -- relation index (see relation_index)
+# c -- members and sizes of the coreference sets (see coref_sets)
+
+
+# maximum number of edges that the bulk insertion methods write per transaction
+BATCH_SIZE = 10000
+
+# maximum number of edges with degree updates deferred in batch mode, after
+# which the updates are written
+DEGREE_FLUSH_THRESHOLD = 100000
+
+META_PREFIX = 'm'
+EDGE_ID_PREFIX = 'e'
+ID_EDGE_PREFIX = 'i'
+NEXT_ID_KEY = 'mnext_id'
+ATOM_STATS_PREFIX = 'a'
+ROOT_STATS_PREFIX = 'r'
+STATISTICS_KEY = 'mstatistics'
+SEQUENCE_PREFIX = 'q'
+SEQUENCE_INDEX_KEY = 'msequences'
+ATTRIBUTE_INDEX_PREFIX = 'n'
+ATTRIBUTE_INDEXES_KEY = 'mindexes'
+LEMMA_PREFIX = 'l'
+LEMMA_ATOMS_PREFIX = 'w'
+LEMMA_INDEX_KEY = 'mlemmas'
+TYPE_PREFIX = 't'
+TYPE_SUBTYPES_PREFIX = 'u'
+TYPE_INDEX_KEY = 'mtypes'
+RELATION_PREFIX = 'v'
+RELATION_INDEX_KEY = 'mrelations'
+COREF_PREFIX = 'c'
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
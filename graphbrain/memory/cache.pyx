@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+
+# marks keys that are not in a cache, as opposed to keys that are cached with
+# the value None
+_NOT_CACHED = object()
+
+
+class LRUCache(object):
+    """Bounded dictionary that discards the least recently used entries
+    when full. Keeps count of cache hits and misses.
+
+    Entries can be read and written by several threads, but the counters
+    are then approximate."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """Returns the value for the key, or default if the key is not in the
+        cache."""
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            # discarded by another thread
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Sets the value for the key, possibly discarding the least recently
+        used entry."""
+        self.entries[key] = value
+        try:
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        except KeyError:
+            # concurrent update by another thread
+            pass
+
+    def remove(self, key):
+        """Removes the key from the cache, if present."""
+        self.entries.pop(key, None)
+
+    def clear(self):
+        """Removes all the entries and resets the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,51 @@
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.auxiliary import COREF_PREFIX
+
+
+def _coref_size_key(cref_id):
+    if len(cref_id) == 0 or ' ' in cref_id:
+        raise ValueError('Invalid coreference set identifier: {}'.format(cref_id))
+    return ''.join((COREF_PREFIX, cref_id))
+
+
+def _coref_members_prefix(cref_id):
+    # identifiers cannot contain spaces, so the members of a set never have
+    # the prefix of another one
+    return ''.join((_coref_size_key(cref_id), ' '))
+
+
+class CorefSets(object):
+    """Members and sizes of the coreference sets (see utils.corefs). Mixin of KeyValue."""
+
+    def coref_members(self, cref_id):
+        prefix = _coref_members_prefix(cref_id)
+        for key, _ in self._aux_with_prefix(prefix):
+            yield hedge(key[len(prefix):])
+
+    def coref_size(self, cref_id):
+        value = self._aux_value(_coref_size_key(cref_id))
+        return None if value is None else int(value)
+
+    def add_coref_members(self, cref_id, edges):
+        size_key = _coref_size_key(cref_id)
+        prefix = _coref_members_prefix(cref_id)
+        # the edges are deduplicated here, as writes may not be visible to
+        # reads before the end of the transaction
+        edge_strs = {hedge(edge).to_str() for edge in edges}
+        self.begin_transaction()
+        value = self._aux_value(size_key)
+        size = 0 if value is None else int(value)
+        for edge_str in edge_strs:
+            key = ''.join((prefix, edge_str))
+            if self._aux_value(key) is None:
+                self._write_aux(key, '')
+                size += 1
+        self._write_aux(size_key, str(size))
+        self.end_transaction()
+        return size
+
+    def remove_coref_set(self, cref_id):
+        self._remove_aux_with_prefixes((_coref_members_prefix(cref_id),))
+        self.begin_transaction()
+        self._remove_aux(_coref_size_key(cref_id))
+        self.end_transaction()
@@ -0,0 +1,60 @@
+# Compact string encoding of non-negative integer ids, used by the 'ids'
+# storage encoding of key-value hypergraph databases, where permutations are
+# sequences of edge ids instead of sequences of edge strings.
+#
+# Each id is written in base 63, most significant digit first. The last digit
+# is represented by one of the characters 0x40-0x7e and the other digits by
+# one of the characters 0x01-0x3f. For example:
+#
+# 0 -> '@'
+# 62 -> '~'
+# 63 -> '\x02@'
+#
+# The encoding is prefix-free, so sequences of ids can be concatenated without
+# separators, and the encoding of a prefix of a sequence is a prefix of the
+# encoding of the sequence, which allows for prefix scans. All characters are
+# ASCII, so ids up to 3968 take two bytes and ids up to 15752960 take four.
+
+
+BASE = 63
+FIRST_DIGIT = 0x01
+FIRST_LAST_DIGIT = 0x40
+
+
+def encode_id(n):
+    """Encodes a non-negative integer as a string."""
+    if n < 0:
+        raise ValueError('ids must be non-negative: {}'.format(n))
+    chars = [chr(FIRST_LAST_DIGIT + n % BASE)]
+    n //= BASE
+    while n > 0:
+        chars.append(chr(FIRST_DIGIT + n % BASE))
+        n //= BASE
+    return ''.join(reversed(chars))
+
+
+def decode_id(str s):
+    """Decodes a string produced by encode_id()."""
+    cdef long n = 0
+    cdef int c
+    for char in s:
+        c = ord(char)
+        if c >= FIRST_LAST_DIGIT:
+            return n * BASE + c - FIRST_LAST_DIGIT
+        n = n * BASE + c - FIRST_DIGIT
+    raise ValueError('incomplete id: {}'.format(s))
+
+
+def split_ids(str s):
+    """Splits a concatenation of encoded ids into a list with the encoding of
+    each id."""
+    cdef int start = 0
+    cdef int i
+    tokens = []
+    for i in range(len(s)):
+        if ord(s[i]) >= FIRST_LAST_DIGIT:
+            tokens.append(s[start:i + 1])
+            start = i + 1
+    if start < len(s):
+        raise ValueError('incomplete id: {}'.format(s))
+    return tokens
@@ -0,0 +1,189 @@
+from itertools import islice
+
+from sortedcontainers import SortedDict, SortedSet
+
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.keyvalue import KeyValue
+from graphbrain.memory.permutations import str_plus_1
+
+
+# number of keys fetched at a time by range scans
+SCAN_CHUNK_SIZE = 1000
+
+
+# named in-memory hypergraphs of the current process
+_stores = {}
+
+
+class _Store(object):
+    """Contents of an in-memory hypergraph: a dictionary of edge keys to
+    attributes, kept sorted to allow for prefix scans, a sorted set of
+    permutations and a sorted dictionary of auxiliary keys."""
+
+    def __init__(self):
+        self.v = SortedDict()
+        self.p = SortedSet()
+        self.x = SortedDict()
+
+
+def _scan(keys, prefix, start=None):
+    """Returns a generator of all the keys of a sorted container that start
+    with the given prefix, beginning with the first one not lower than start
+    if it is given.
+
+    Keys are fetched in chunks, each scan resuming after the last key that
+    was returned, so that the container can be safely modified while the
+    generator is consumed.
+    """
+    end_str = str_plus_1(prefix) if len(prefix) > 0 else None
+    start = max(prefix, start or prefix)
+    inclusive = True
+    while True:
+        chunk = list(islice(keys.irange(start, end_str, inclusive=(inclusive, False)), SCAN_CHUNK_SIZE))
+        yield from chunk
+        if len(chunk) < SCAN_CHUNK_SIZE:
+            return
+        start = chunk[-1]
+        inclusive = False
+
+
+class InMemory(KeyValue):
+    """Implements in-memory hypergraph storage.
+
+    The locator string ':memory:' creates a private hypergraph, that is
+    discarded when the object is garbage-collected. Locator strings with the
+    extension '.mem' identify hypergraphs that are shared by all the
+    instances with the same locator string in the current process, and
+    that persist until destroy() is called, even if the hypergraph is
+    closed.
+
+    The contents of the hypergraph can be written to and read from an
+    on-disk database with save() and load().
+
+    Keyword arguments are passed to KeyValue.
+    """
+
+    def __init__(self, locator_string, **kwargs):
+        super().__init__(locator_string, **kwargs)
+        if locator_string == ':memory:':
+            self.store = _Store()
+        else:
+            if locator_string not in _stores:
+                _stores[locator_string] = _Store()
+            self.store = _stores[locator_string]
+        self._init_options()
+
+    # ===================================
+    # Implementation of interface methods
+    # ===================================
+
+    def close(self):
+        self.flush()
+
+    def destroy(self):
+        self.store.v.clear()
+        self.store.p.clear()
+        self.store.x.clear()
+        self._reset_options()
+
+    def all(self):
+        for key in _scan(self.store.v, ''):
+            edge = hedge(key)
+            if edge is not None:
+                yield edge
+
+    def all_attributes(self):
+        self.flush()
+        for key in _scan(self.store.v, ''):
+            edge = hedge(key)
+            attributes = self.store.v.get(key)
+            if edge is not None and attributes is not None:
+                yield edge, dict(attributes)
+
+    # ==========================================
+    # Implementation of private abstract methods
+    # ==========================================
+
+    def _edge2key(self, edge):
+        return edge.to_str()
+
+    def _str2key(self, edge_str):
+        return edge_str
+
+    def _exists_key(self, key):
+        """Checks if the given key exists."""
+        return key in self.store.v
+
+    def _add_key(self, key, attributes):
+        """Adds the given edge, given its key."""
+        self.store.v[key] = dict(attributes)
+
+    def _attribute_key(self, key):
+        attributes = self.store.v.get(key)
+        if attributes is None:
+            return None
+        return dict(attributes)
+
+    def _write_edge_permutation(self, perm):
+        """Writes a given permutation."""
+        self.store.p.add(perm)
+
+    def _remove_edge_permutation(self, perm):
+        """Removes a given permutation."""
+        self.store.p.discard(perm)
+
+    def _remove_key(self, key):
+        """Removes an edge, given its key."""
+        self.store.v.pop(key, None)
+
+    def _permutations_with_prefix(self, prefix, start=None):
+        yield from _scan(self.store.p, prefix, start)
+
+    def _edges_with_prefix(self, prefix):
+        for key in _scan(self.store.v, prefix):
+            yield hedge(key)
+
+    def _aux_value(self, key):
+        return self.store.x.get(key)
+
+    def _write_aux(self, key, value):
+        self.store.x[key] = value
+
+    def _remove_aux(self, key):
+        self.store.x.pop(key, None)
+
+    def _aux_with_prefix(self, prefix, start=None):
+        for key in _scan(self.store.x, prefix, start):
+            value = self.store.x.get(key)
+            if value is not None:
+                yield key, value
+
+    # ==============
+    # Public methods
+    # ==============
+
+    def save(self, locator_string, **kwargs):
+        """Writes the contents of this hypergraph to the database identified
+        by locator_string, replacing its previous contents.
+
+        Further keyword arguments are passed to hgraph().
+        """
+        from graphbrain import hgraph
+
+        hg = hgraph(locator_string, **kwargs)
+        hg.destroy()
+        hg.add_many_with_attributes(self.all_attributes())
+        hg.close()
+
+    def load(self, locator_string, **kwargs):
+        """Replaces the contents of this hypergraph with the ones of the
+        database identified by locator_string.
+
+        Further keyword arguments are passed to hgraph().
+        """
+        from graphbrain import hgraph
+
+        hg = hgraph(locator_string, **kwargs)
+        self.destroy()
+        self.add_many_with_attributes(hg.all_attributes())
+        hg.close()
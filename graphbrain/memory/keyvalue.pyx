@@ -1,50 +1,152 @@
+import json
+import random
 from abc import ABC
 
-from graphbrain.hyperedge import split_edge_str
+from graphbrain.hyperedge import hedge, split_edge_str, Atom, Hyperedge
 from graphbrain.hypergraph import Hypergraph
-from graphbrain.memory.permutations import do_with_edge_permutations, first_permutation, perm2edge
-from graphbrain.patterns import match_pattern, is_full_pattern, is_pattern, is_unordered_pattern
+from graphbrain.memory.attribute_index import AttributeIndexes
+from graphbrain.memory.auxiliary import (BATCH_SIZE, DEGREE_FLUSH_THRESHOLD, EDGE_ID_PREFIX, ID_EDGE_PREFIX,
+                                         META_PREFIX, NEXT_ID_KEY, _chunks)
+from graphbrain.memory.cache import LRUCache, _NOT_CACHED
+from graphbrain.memory.coref_sets import CorefSets
+from graphbrain.memory.ids import decode_id, encode_id, split_ids
+from graphbrain.memory.lemma_index import LemmaIndex, LEMMA_CACHE_SIZE
+from graphbrain.memory.permutations import (decode_permutation, do_with_permutations, first_permutation, permutate,
+                                            permutation_numbers, unpermutate)
+from graphbrain.memory.planner import QueryPlanner, _edge2prefix
+from graphbrain.memory.relation_index import RelationIndex
+from graphbrain.memory.sequence_index import SequenceIndex
+from graphbrain.memory.type_index import TypeIndex
+from graphbrain.patterns import match_pattern, is_full_pattern, is_fun_pattern, is_pattern, is_unordered_pattern
 
 
-def _prefix_heuristic(atom):
-    return len(atom.root())
+# Storage options that are persisted in the database when they are set at
+# creation time, and their default values:
+# encoding -- how permutations are stored. With 'text', a permutation is a
+# sequence of edge strings. With 'ids', edges are mapped to integer ids by a
+# dictionary, and permutations are sequences of compactly encoded ids (see
+# graphbrain.memory.ids).
+# index_positions -- which permutations of each edge are written. With
+# 'full', all of them are written (up to MAX_PERMS). With an integer k, only
+# the ones needed to place any k elements first. Queries that fix more
+# elements than k scan the permutations for the first k and filter the
+# results.
+OPTIONS = {'encoding': 'text', 'index_positions': 'full'}
+ENCODINGS = {'text', 'ids'}
 
+# maximum number of entries of the id dictionary kept in memory
+ID_CACHE_SIZE = 100000
 
-def _edge2prefix(edge):
-    if edge.atom:
-        return str(edge), _prefix_heuristic(edge)
-    else:
-        prefix, heuristic = _edge2prefix(edge[0])
-        return '(' + prefix, heuristic
+# number of candidate edges matched by estimate_count()
+ESTIMATE_SAMPLE_SIZE = 1000
 
+# wildcards that can be checked on permutation keys, without matching
+STRUCTURAL_WILDCARDS = {'*', '.', '(*)'}
 
-def _edges2prefix(edges, strict):
-    if strict:
-        return ' '.join([str(edge) for edge in edges])
-    else:
-        best_heuristic = -1
-        best_prefix = None
-        for edge in edges:
-            prefix, heuristic = _edge2prefix(edge)
-            if heuristic > best_heuristic:
-                best_heuristic = heuristic
-                best_prefix = prefix
-        return best_prefix
+# maximum number of ids of the edges with a given prefix that are loaded in
+# memory to filter candidate edges, in the 'ids' encoding
+FILTER_IDS_LIMIT = 10000
+
+
+def prepare_edge(edge, attributes):
+    """Returns a row for KeyValue.add_many_prepared(): (edge string, element strings or None, attributes)."""
+    child_strs = None if edge.atom else [child.to_str() for child in edge]
+    return edge.to_str(), child_strs, attributes
 
 
-def _prefix_position(prefix, edge):
-    for position, subedge in enumerate(edge):
-        if str(subedge).startswith(prefix):
-            return position
-    return -1
+def _scan_key(position):
+    """Returns the permutation key (see KeyValue._permutation_keys()) of a cursor position."""
+    try:
+        aux_key, perm_key = position
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor position: {}'.format(position))
+    return aux_key, perm_key
 
 
-class KeyValue(Hypergraph, ABC):
+def _structural_pattern(pattern):
+    """Returns (edge_strs, positions, atom_wildcards, length, open_ended) for a structural pattern, or None."""
+    # structural patterns are made of edges without argument roles and of the
+    # wildcards in STRUCTURAL_WILDCARDS. Edges match them if they have the
+    # given edges at the given positions, the required length, and atoms (True)
+    # or non-atoms (False) at the positions of atom_wildcards
+    if pattern.atom or is_fun_pattern(pattern):
+        return None
+    items = list(pattern)
+    open_ended = items[-1].to_str() == '...'
+    if open_ended:
+        items = items[:-1]
+    edge_strs = []
+    positions = []
+    atom_wildcards = {}
+    for i, item in enumerate(items):
+        if is_pattern(item):
+            item_str = item.to_str()
+            if not item.atom or item_str not in STRUCTURAL_WILDCARDS:
+                return None
+            if item_str != '*':
+                atom_wildcards[i] = item_str == '.'
+        elif any(len(atom.argroles()) > 0 for atom in item.all_atoms()):
+            # argument roles make the matcher accept other lengths
+            return None
+        else:
+            edge_strs.append(item.to_str())
+            positions.append(i)
+    if len(positions) == 0:
+        return None
+    return edge_strs, positions, atom_wildcards, len(items), open_ended
+
+
+def _apply_degree_deltas(attributes, deltas):
+    """Adds deferred degree updates to a dictionary of attributes."""
+    d, dd = deltas
+    if d != 0 or 'd' in attributes:
+        attributes['d'] = int(attributes.get('d', 0)) + d
+    attributes['dd'] = int(attributes.get('dd', 0)) + dd
+
+
+class KeyValue(QueryPlanner, SequenceIndex, AttributeIndexes, LemmaIndex, TypeIndex, RelationIndex, CorefSets,
+               Hypergraph, ABC):
     """Common class for key-value based hypergraph storage."""
+    # Derived classes must call _init_options() once the underlying database is
+    # open, and _reset_options() after it is destroyed. The storage options
+    # (see OPTIONS) can only be set when the hypergraph is created, and are
+    # then stored in the database. The attribute cache keeps the attributes of
+    # up to attribute_cache_size edges (0 disables it). It is updated on every
+    # write made through this object, so it must not be enabled if other
+    # processes or objects write to the same database.
 
-    def __init__(self, locator_string):
+    def __init__(self, locator_string, encoding=None, index_positions=None, attribute_cache_size=0):
         super().__init__()
         self.locator_string = locator_string
+        self.requested_options = {'encoding': encoding, 'index_positions': index_positions}
+        self.options = dict(OPTIONS)
+        self.edge_ids = LRUCache(ID_CACHE_SIZE)
+        self.id_edges = LRUCache(ID_CACHE_SIZE)
+        self.attribute_cache = LRUCache(attribute_cache_size) if attribute_cache_size > 0 else None
+        # degree increments of existing edges, deferred in batch mode:
+        # key -> [degree, deep degree]
+        self.degree_deltas = {}
+        # changes to the cardinality statistics that are not written yet:
+        # key -> increment
+        self.stat_deltas = {}
+        self.has_statistics = False
+        self.new_statistics = False
+        self.has_sequence_index = False
+        self.new_sequence_index = False
+        # sizes of the sequences written to in batch mode, which are stored
+        # as attributes on flush(): sequence name atom -> size
+        self.sequence_sizes = {}
+        self.has_lemma_index = False
+        self.new_lemma_index = False
+        # lemmas of simplified atoms read from the lemma index:
+        # atom string -> lemma (or None)
+        self.lemma_cache = LRUCache(LEMMA_CACHE_SIZE)
+        self.has_type_index = False
+        self.new_type_index = False
+        self.has_relation_index = False
+        # attributes with a secondary index
+        self.indexes = []
+        self.next_id = 0
 
     # ===================================
     # Implementation of interface methods
@@ -53,15 +155,163 @@ class KeyValue(Hypergraph, ABC):
     def name(self):
         return self.locator_string
 
+    def attribute_cache_info(self):
+        """Returns the 'hits', 'misses', 'size' and 'maxsize' of the attribute cache, or None if it is disabled."""
+        if self.attribute_cache is None:
+            return None
+        return {'hits': self.attribute_cache.hits,
+                'misses': self.attribute_cache.misses,
+                'size': len(self.attribute_cache),
+                'maxsize': self.attribute_cache.maxsize}
+
     def add_with_attributes(self, edge, attributes):
         self.begin_transaction()
         key = self._edge2key(edge)
-        self._add_key(key, attributes)
+        new = edge.not_atom and not self._key_exists(key)
+        self._put_attributes(key, attributes)
         if edge.not_atom:
-            self._write_edge_permutations(edge)
+            self._write_edge_permutations(edge, new)
+        self._store_statistics()
         self.end_transaction()
         return edge
 
+    def flush(self):
+        if len(self.degree_deltas) == 0 and len(self.stat_deltas) == 0 and len(self.sequence_sizes) == 0:
+            return
+        degree_deltas = self.degree_deltas
+        self.degree_deltas = {}
+        self.begin_transaction()
+        self._write_sequence_sizes()
+        for key, deltas in degree_deltas.items():
+            attributes = self._attributes(key)
+            if attributes is not None:
+                _apply_degree_deltas(attributes, deltas)
+                self._put_attributes(key, attributes)
+        self._write_statistics()
+        self.end_transaction()
+
+    def recompute_degrees(self):
+        degrees = {}
+
+        def count_degrees(edge, depth):
+            if depth > 0:
+                key = self._edge2key(edge)
+                if key not in degrees:
+                    degrees[key] = [0, 0]
+                if depth == 1:
+                    degrees[key][0] += 1
+                degrees[key][1] += 1
+            if edge.not_atom:
+                for child in edge:
+                    count_degrees(child, depth + 1)
+
+        self.flush()
+        for edge, attributes in self.all_attributes():
+            if int(attributes.get('p', 0)) == 1:
+                count_degrees(edge, 0)
+
+        # the updates are collected before they are written, so that the
+        # scan is not affected by them
+        updates = []
+        for edge, attributes in self.all_attributes():
+            key = self._edge2key(edge)
+            d, dd = degrees.pop(key, (0, 0))
+            if int(attributes.get('d', 0)) != d or int(attributes.get('dd', 0)) != dd:
+                attributes['d'] = d
+                attributes['dd'] = dd
+                updates.append((key, attributes))
+        # edges that are included in primary edges but do not exist
+        for key, (d, dd) in degrees.items():
+            updates.append((key, {'p': 0, 'd': d, 'dd': dd}))
+
+        for chunk in _chunks(updates, BATCH_SIZE):
+            self.begin_transaction()
+            for key, attributes in chunk:
+                self._put_attributes(key, attributes)
+            self.end_transaction()
+        return len(updates)
+
+    def count(self, pattern, strict=False):
+        """Number of edges that match a pattern. See Hypergraph.count()."""
+        # with strict matching, patterns made only of edges and of the
+        # wildcards '*', '.' and '(*)' (possibly open-ended) are counted from
+        # the permutation keys, without building and matching the edges
+        pattern = hedge(pattern)
+        if strict:
+            n = self._count_structure(pattern)
+            if n is not None:
+                return n
+        return super().count(pattern, strict=strict)
+
+    def estimate_count(self, pattern, strict=False, sample_size=ESTIMATE_SAMPLE_SIZE):
+        """Estimated number of edges that match a pattern. See Hypergraph.estimate_count()."""
+        # the permutation keys of the candidate edges (the same ones that
+        # search() considers) are scanned without building the edges, and a
+        # uniform sample of sample_size candidates is matched against the
+        # pattern. The result is exact if there are no more candidates than
+        # that, or if the pattern can be counted by count()
+        pattern = hedge(pattern)
+        if pattern.atom:
+            return self.count(pattern, strict=strict)
+        if strict:
+            n = self._count_structure(pattern)
+            if n is not None:
+                return n
+        if is_full_pattern(pattern):
+            candidates = self.all()
+            to_edge = None
+        else:
+            candidates = (tokens for tokens, _ in self._structure_candidates(pattern, strict))
+            to_edge = self._tokens2edge
+        rng = random.Random(0)
+        sample = []
+        n = 0
+        for candidate in candidates:
+            n += 1
+            if len(sample) < sample_size:
+                sample.append(candidate)
+            else:
+                i = rng.randrange(n)
+                if i < sample_size:
+                    sample[i] = candidate
+        matched = 0
+        for candidate in sample:
+            edge = to_edge(candidate) if to_edge else candidate
+            if edge is not None and next(self._match_pattern(edge, pattern, strict), None) is not None:
+                matched += 1
+        if n <= sample_size:
+            return matched
+        return int(round(n * matched / len(sample)))
+
+    def add_many_prepared(self, rows):
+        """Like add_many_with_attributes(), with rows prepared by prepare_edge() (possibly in other processes)."""
+        self.begin_transaction()
+        for edge_str, child_strs, attributes in rows:
+            key = self._str2key(edge_str)
+            new = child_strs is not None and not self._key_exists(key)
+            self._put_attributes(key, attributes)
+            if child_strs is not None:
+                self._write_permutations(child_strs, new)
+        self._store_statistics()
+        self.end_transaction()
+        return len(rows)
+
+    def add_many_with_attributes(self, edges_attributes):
+        n = 0
+        for chunk in _chunks(edges_attributes, BATCH_SIZE):
+            self.begin_transaction()
+            for edge, attributes in chunk:
+                edge = hedge(edge)
+                key = self._edge2key(edge)
+                new = edge.not_atom and not self._key_exists(key)
+                self._put_attributes(key, attributes)
+                if edge.not_atom:
+                    self._write_edge_permutations(edge, new)
+            self._store_statistics()
+            self.end_transaction()
+            n += len(chunk)
+        return n
+
     # ==============================================================
     # Private abstract methods, to be implemented in derived classes
     # ==============================================================
@@ -69,6 +319,18 @@ class KeyValue(Hypergraph, ABC):
     def _edge2key(self, edge):
         raise NotImplementedError()
 
+    def _str2key(self, edge_str):
+        """Returns the key of an edge, given its string representation."""
+        # derived classes should override this method if the key can be
+        # computed without parsing the edge
+        return self._edge2key(hedge(edge_str))
+
+    def _key2str(self, key):
+        """Returns the string representation of an edge, given its key."""
+        # derived classes must override this method if their keys are not the
+        # string representations of the edges
+        return key
+
     def _exists_key(self, key):
         """Checks if the given key exists."""
         raise NotImplementedError()
@@ -78,6 +340,7 @@ class KeyValue(Hypergraph, ABC):
         raise NotImplementedError()
 
     def _attribute_key(self, key):
+        """Returns the attributes of an edge, given its key, or None if the key does not exist."""
         raise NotImplementedError()
 
     def _write_edge_permutation(self, perm):
@@ -97,101 +360,170 @@ class KeyValue(Hypergraph, ABC):
     def _edges_with_prefix(self, prefix):
         raise NotImplementedError()
 
+    def _aux_value(self, key):
+        """Returns the value of an auxiliary key, or None if it does not exist."""
+        # auxiliary keys and values are strings, stored separately from edges
+        # and permutations
+        raise NotImplementedError()
+
+    def _write_aux(self, key, value):
+        """Sets the value of an auxiliary key."""
+        raise NotImplementedError()
+
+    def _remove_aux(self, key):
+        """Removes an auxiliary key."""
+        raise NotImplementedError()
+
+    def _aux_with_prefix(self, prefix, start=None):
+        """Returns a generator of the (key, value) tuples of the auxiliary keys with a prefix, in key order."""
+        # if start is given, the scan starts at the first key not lower than
+        # start
+        raise NotImplementedError()
+
     # ==========================================
     # Implementation of private abstract methods
     # ==========================================
 
     def _exists(self, edge):
-        return self._exists_key(self._edge2key(edge))
+        return self._key_exists(self._edge2key(edge))
 
     def _set_attribute_key(self, key, attribute, value):
         """Sets the value of an attribute by key."""
-        exists = self._exists_key(key)
+        attributes = self._attributes(key)
+        exists = attributes is not None
         if exists:
-            exists = True
-            attributes = self._attribute_key(key)
             attributes[attribute] = value
         else:
             attributes = {'p': 0, 'd': 0, 'dd': 0, attribute: value}
-        self._add_key(key, attributes)
+        self._put_attributes(key, attributes)
         return exists
 
     def _inc_attribute_key(self, key, attribute):
         """Increments an attribute of an edge."""
-        if self._exists_key(key):
-            attributes = self._attribute_key(key)
+        attributes = self._attributes(key)
+        if attributes is not None:
             if attribute in attributes:
                 cur_value = int(attributes[attribute])
                 attributes[attribute] = cur_value + 1
             else:
                 attributes[attribute] = 1
-            self._add_key(key, attributes)
+            self._put_attributes(key, attributes)
             return True
         else:
             return False
 
     def _dec_attribute_key(self, key, attribute):
         """Decrements an attribute of an edge."""
-        if self._exists_key(key):
-            attributes = self._attribute_key(key)
+        attributes = self._attributes(key)
+        if attributes is not None:
             cur_value = int(attributes[attribute])
             attributes[attribute] = cur_value - 1
-            self._add_key(key, attributes)
+            self._put_attributes(key, attributes)
             return True
         else:
             return False
 
     def _inc_degrees(self, edge, depth=0):
-        if depth > 0:
+        if depth > 0 and self.batch_mode:
+            key = self._edge2key(edge)
+            if key in self.degree_deltas or self._key_exists(key):
+                self._defer_degree_deltas(key, 1 if depth == 1 else 0, 1)
+            else:
+                self._put_attributes(key, {'p': 0, 'd': 1 if depth == 1 else 0, 'dd': 1})
+        elif depth > 0:
             key = self._edge2key(edge)
-            if not self._exists_key(key):
+            attributes = self._attributes(key)
+            if attributes is None:
                 d = 1 if depth == 1 else 0
-                self._add_key(key, {'p': 0, 'd': d, 'dd': 1})
+                self._put_attributes(key, {'p': 0, 'd': d, 'dd': 1})
             else:
                 if depth == 1:
-                    self._inc_attribute_key(key, 'd')
-                self._inc_attribute_key(key, 'dd')
+                    attributes['d'] = int(attributes['d']) + 1 if 'd' in attributes else 1
+                attributes['dd'] = int(attributes['dd']) + 1 if 'dd' in attributes else 1
+                self._put_attributes(key, attributes)
         if edge.not_atom:
             for child in edge:
                 self._inc_degrees(child, depth + 1)
 
     def _dec_degrees(self, edge, depth=0):
-        if depth > 0:
+        if depth > 0 and self.batch_mode:
+            key = self._edge2key(edge)
+            if key in self.degree_deltas or self._key_exists(key):
+                self._defer_degree_deltas(key, -1 if depth == 1 else 0, -1)
+        elif depth > 0:
             key = self._edge2key(edge)
-            if depth == 1:
-                self._dec_attribute_key(key, 'd')
-            self._dec_attribute_key(key, 'dd')
+            attributes = self._attributes(key)
+            if attributes is not None:
+                if depth == 1:
+                    attributes['d'] = int(attributes['d']) - 1
+                attributes['dd'] = int(attributes['dd']) - 1
+                self._put_attributes(key, attributes)
         if edge.not_atom:
             for child in edge:
                 self._dec_degrees(child, depth + 1)
 
-    def _write_edge_permutations(self, edge):
-        """Writes all permutations of the edge."""
-        do_with_edge_permutations(edge, self._write_edge_permutation)
+    def _write_edge_permutations(self, edge, new=True):
+        """Writes all permutations of the edge, and indexes it if it is new."""
+        self._write_permutations([child.to_str() for child in edge], new)
+
+    def _write_permutations(self, child_strs, new=True):
+        """Writes all permutations of an edge given its element strings, and indexes it if it is new."""
+        if new:
+            self._update_statistics(child_strs, 1)
+            self._index_sequence(child_strs)
+            self._index_lemma(child_strs)
+            self._index_type(child_strs)
+            self._index_relation(child_strs)
+        if self.options['encoding'] == 'text':
+            do_with_permutations(child_strs, self._write_edge_permutation, self._index_positions())
+        else:
+            ids = [self._assign_edge_id(child_str) for child_str in child_strs]
+            self._do_with_id_permutations(ids, self._write_edge_permutation)
 
     def _remove_edge_permutations(self, edge):
         """Removes all permutations of the edge."""
-        do_with_edge_permutations(edge, self._remove_edge_permutation)
+        child_strs = [child.to_str() for child in edge]
+        self._update_statistics(child_strs, -1)
+        self._unindex_sequence(child_strs)
+        self._unindex_lemma(child_strs)
+        self._unindex_type(child_strs)
+        self._unindex_relation(child_strs)
+        if self.options['encoding'] == 'text':
+            do_with_permutations(child_strs, self._remove_edge_permutation, self._index_positions())
+        else:
+            ids = [self._edge_id(child_str) for child_str in child_strs]
+            if None not in ids:
+                self._do_with_id_permutations(ids, self._remove_edge_permutation)
 
     def _add(self, edge, primary):
         self.begin_transaction()
         key = self._edge2key(edge)
-        if not self._exists_key(key):
+        attributes = self._attributes(key)
+        if attributes is None:
             if primary:
-                self._add_key(key, {'p': 1, 'd': 0, 'dd': 0})
+                self._put_attributes(key, {'p': 1, 'd': 0, 'dd': 0})
                 self._inc_degrees(edge)
             else:
-                self._add_key(key, {'p': 0, 'd': 0, 'dd': 0})
+                self._put_attributes(key, {'p': 0, 'd': 0, 'dd': 0})
             if edge.not_atom:
                 self._write_edge_permutations(edge)
+                self._store_statistics()
         # if an edge is to be added as primary, but it already exists as
         # non-primary, then make it primary and update the degrees
-        elif primary and not self._is_primary(edge):
-            self._set_attribute_key(key, 'p', 1)
+        elif primary and int(attributes.get('p', 0)) != 1:
+            attributes['p'] = 1
+            self._put_attributes(key, attributes)
             self._inc_degrees(edge)
         self.end_transaction()
         return edge
 
+    def _add_many(self, edges, primary):
+        n = 0
+        for chunk in _chunks(edges, BATCH_SIZE):
+            self._add_batch(chunk, primary)
+            n += len(chunk)
+        return n
+
     def _remove(self, edge, deep):
         self.begin_transaction()
         primary = self.is_primary(edge)
@@ -205,10 +537,11 @@ class KeyValue(Hypergraph, ABC):
                     self._dec_degrees(edge)
 
         key = self._edge2key(edge)
-        if self._exists_key(key):
+        if self._key_exists(key):
             if edge.not_atom:
                 self._remove_edge_permutations(edge)
-            self._remove_key(key)
+                self._store_statistics()
+            self._remove_attributes(key)
         self.end_transaction()
 
     def _is_primary(self, edge):
@@ -225,6 +558,35 @@ class KeyValue(Hypergraph, ABC):
         for edge in self._match_structure(pattern, strict):
             yield from self._match_pattern(edge, pattern, strict, skip_semsim, curvars, ref_edges)
 
+    def _search_positions(self, pattern, strict, ref_edges, position):
+        for result, position in self._match_positions(pattern, strict, False, None, ref_edges, position):
+            yield result[0], position
+
+    def _match_positions(self, pattern, strict, skip_semsim, curvars, ref_edges, position):
+        # the position of a result is the key of the permutation where its edge
+        # was found, along with the plan of the scan, so that it is resumed
+        # with the same plan. Full patterns (and atoms) are resumed by skipping
+        # the results before the position instead
+        if pattern.atom or is_full_pattern(pattern):
+            yield from super()._match_positions(pattern, strict, skip_semsim, curvars, ref_edges, position)
+            return
+        if position is None:
+            plan = self._plan(pattern, strict)
+            plan = {'plan': plan['plan'], 'filters': plan['filters']}
+            after = None
+        else:
+            try:
+                plan = {'plan': position['plan'], 'filters': position['filters']}
+                after = _scan_key(position['key'])
+            except (KeyError, TypeError):
+                raise ValueError('Invalid cursor position: {}'.format(position))
+        for tokens, key in self._structure_candidates(pattern, strict, plan, after):
+            edge = self._tokens2edge(tokens)
+            if edge is None:
+                continue
+            for result in self._match_pattern(edge, pattern, strict, skip_semsim, curvars, ref_edges):
+                yield result, {'plan': plan['plan'], 'filters': plan['filters'], 'key': key}
+
     def _match_edges(self, edges, pattern, strict, skip_semsim=False, curvars=None, ref_edges=None):
         for edge in edges:
             yield from self._match_pattern(edge, pattern, strict, skip_semsim, curvars, ref_edges)
@@ -284,46 +646,44 @@ class KeyValue(Hypergraph, ABC):
             for edge in self.all():
                 yield edge
         else:
-            edges = []
-            positions = []
-            for i, edge in enumerate(pattern):
-                if not is_pattern(edge):
-                    edges.append(edge)
-                    positions.append(i)
-                elif strict:
-                    if is_unordered_pattern(edge):
-                        raise RuntimeError(
-                            'Unordered pattern (argument roles inside curly brackets) not allowed in strict match.')
-
-            prefix = _edges2prefix(edges, strict)
-            for perm_str in self._permutations_with_prefix(prefix):
-                tokens = split_edge_str(perm_str)
-                nper = int(tokens[-1])
-                if strict:
-                    if nper == first_permutation(len(tokens) - 1, positions):
-                        yield perm2edge(perm_str)
-                else:
-                    edge = perm2edge(perm_str)
-                    if edge:
-                        position = _prefix_position(prefix, edge)
-                        if nper == first_permutation(len(edge), (position,)):
-                            yield perm2edge(perm_str)
+            for tokens, _ in self._structure_candidates(pattern, strict):
+                edge = self._tokens2edge(tokens)
+                if edge is not None:
+                    yield edge
+
+    def _structure_plan(self, pattern, strict, plan=None):
+        """Returns the anchors of a pattern, their positions, and the positions to scan and to filter."""
+        # the positions to scan and to filter are chosen by _plan(), or given
+        # by plan
+        edges = []
+        positions = []
+        for i, edge in enumerate(pattern):
+            if not is_pattern(edge):
+                edges.append(edge)
+                positions.append(i)
+            elif strict and is_unordered_pattern(edge):
+                raise RuntimeError(
+                    'Unordered pattern (argument roles inside curly brackets) not allowed in strict match.')
+        if plan is None:
+            plan = self._plan(pattern, strict)
+        return edges, positions, plan['plan'], plan['filters']
 
     # from Hypergraph
     def _star(self, center, limit=None):
-        center_str = center.to_str()
-        prefix = ''.join((center_str, ' '))
         count = 0
-        for perm_str in self._permutations_with_prefix(prefix):
+        for edge, _ in self._star_positions(center, None):
             if limit and count >= limit:
                 break
-            edge = perm2edge(perm_str)
-            if edge:
-                position = edge.index(center)
-                nper = int(split_edge_str(perm_str)[-1])
-                if nper == first_permutation(len(edge), (position,)):
-                    count += 1
-                    yield edge
+            count += 1
+            yield edge
+
+    # from Hypergraph
+    def _star_positions(self, center, position):
+        after = None if position is None else _scan_key(position)
+        for edge, nper, key in self._permutations((center.to_str(),), after=after):
+            position = edge.index(center)
+            if nper == first_permutation(len(edge), (position,)):
+                yield edge, key
 
     def _atoms_with_root(self, root):
         prefix = ''.join((root, '/'))
@@ -331,52 +691,501 @@ class KeyValue(Hypergraph, ABC):
             yield edge
 
     def _edges_with_edges(self, edges, root):
-        prefix = ' '.join([edge.to_str() for edge in edges])
-        if root:
-            prefix = ''.join((prefix, ' ', root, '/'))
-        for perm_str in self._permutations_with_prefix(prefix):
-            edge = perm2edge(perm_str)
-            if edge:
-                if root is None:
-                    if all([item in edge for item in edges]):
-                        positions = [edge.index(item) for item in edges]
-                        nper = int(split_edge_str(perm_str)[-1])
-                        if nper == first_permutation(len(edge), positions):
-                            yield edge
-                else:
-                    # TODO: remove redundant results when a root is present
-                    yield edge
+        for edge, _ in self._edges_with_edges_positions(edges, root, None):
+            yield edge
+
+    # from Hypergraph
+    def _edges_with_edges_positions(self, edges, root, position):
+        after = None if position is None else _scan_key(position)
+        edge_strs = [edge.to_str() for edge in edges]
+        root_prefix = ''.join((root, '/')) if root else None
+        n = len(edges) + (1 if root else 0)
+        k = self._indexed_positions(n)
+        if k == n:
+            if root:
+                perms = self._permutations(edge_strs, root_prefix, after)
+            else:
+                perms = self._permutations(edge_strs[:-1], edge_strs[-1], after)
+            for edge, nper, key in perms:
+                if all([item in edge for item in edges]):
+                    positions = [edge.index(item) for item in edges]
+                    if root is not None:
+                        # an edge is found once for each one of its atoms
+                        # with the root: only the first one is kept
+                        root_positions = [i for i, item in enumerate(edge)
+                                          if i not in positions and str(item).startswith(root_prefix)]
+                        if len(root_positions) == 0:
+                            continue
+                        positions.append(root_positions[0])
+                    if nper == first_permutation(len(edge), positions):
+                        yield edge, key
+        else:
+            # not enough elements indexed, scan the permutations for the first
+            # k edges and filter the results
+            for edge, nper, key in self._permutations(edge_strs[:k - 1], edge_strs[k - 1], after):
+                if all([item in edge for item in edges]):
+                    positions = [edge.index(item) for item in edges]
+                    if nper == first_permutation(len(edge), positions[:k]):
+                        if root is None or any(str(item).startswith(root_prefix)
+                                               for i, item in enumerate(edge) if i not in positions):
+                            yield edge, key
 
     # =====================
     # Local private methods
     # =====================
 
-    def _get_str_attribute_key(self, key, attribute, or_else=None):
-        if self._exists_key(key):
+    def _init_options(self):
+        """Determines the storage options, from the stored values or the ones requested at creation time."""
+        encoding = self.requested_options['encoding']
+        if encoding is not None and encoding not in ENCODINGS:
+            raise RuntimeError('Unknown encoding: {}'.format(encoding))
+        index_positions = self.requested_options['index_positions']
+        if index_positions is not None and index_positions != 'full':
+            if type(index_positions) is not int or index_positions < 1:
+                raise RuntimeError('index_positions must be a positive integer or "full".')
+        for name, default in OPTIONS.items():
+            value = self.requested_options[name]
+            stored = self._aux_value(''.join((META_PREFIX, name)))
+            if stored is not None:
+                stored = json.loads(stored)
+                if value is not None and value != stored:
+                    raise RuntimeError('Hypergraph {} was created with {}={}.'.format(
+                        self.locator_string, name, stored))
+                self.options[name] = stored
+            elif value is not None and value != default:
+                if next(iter(self.all()), None) is not None:
+                    raise RuntimeError('{} can only be set when the hypergraph is created.'.format(name))
+                self.options[name] = value
+                self._write_option(name)
+        next_id = self._aux_value(NEXT_ID_KEY)
+        if next_id is not None:
+            self.next_id = int(next_id)
+        self._init_statistics()
+        self._init_sequence_index()
+        self._init_lemma_index()
+        self._init_type_index()
+        self._init_relation_index()
+        self._init_attribute_indexes()
+
+    def _reset_options(self):
+        """Clears the in-memory state of the database contents, and writes the non-default storage options."""
+        self.edge_ids.clear()
+        self.id_edges.clear()
+        if self.attribute_cache is not None:
+            self.attribute_cache.clear()
+        self.degree_deltas = {}
+        self.stat_deltas = {}
+        self.next_id = 0
+        for name, default in OPTIONS.items():
+            if self.options[name] != default:
+                self._write_option(name)
+        self.sequence_sizes = {}
+        self.has_statistics = False
+        self.new_statistics = False
+        self._init_statistics()
+        self.has_sequence_index = False
+        self.new_sequence_index = False
+        self._init_sequence_index()
+        self.lemma_cache.clear()
+        self.has_lemma_index = False
+        self.new_lemma_index = False
+        self._init_lemma_index()
+        self.has_type_index = False
+        self.new_type_index = False
+        self._init_type_index()
+        # the indexes remain declared, like the storage options
+        if len(self.indexes) > 0:
+            self._write_indexes()
+        # and so does the relation index
+        if self.has_relation_index:
+            self._write_relation_index_key()
+
+    def _remove_aux_with_prefixes(self, prefixes):
+        """Removes all the auxiliary keys that start with one of the prefixes."""
+        # the keys are collected before they are removed, so that the scans
+        # are not affected by the removals
+        stale = [key for prefix in prefixes for key, _ in self._aux_with_prefix(prefix)]
+        for chunk in _chunks(stale, BATCH_SIZE):
+            self.begin_transaction()
+            for key in chunk:
+                self._remove_aux(key)
+            self.end_transaction()
+
+    def _write_option(self, name):
+        self.begin_transaction()
+        self._write_aux(''.join((META_PREFIX, name)), json.dumps(self.options[name]))
+        self.end_transaction()
+
+    def _key_exists(self, key):
+        """Checks if the given key exists."""
+        if self.attribute_cache is None:
+            return self._exists_key(key)
+        return self._attributes(key) is not None
+
+    def _attributes(self, key):
+        """Returns the attributes of an edge with its deferred degree updates, or None if the key does not exist."""
+        # the dictionary can be modified by the caller, changes are only stored
+        # by _put_attributes()
+        if self.attribute_cache is None:
             attributes = self._attribute_key(key)
-            if attribute in attributes:
-                return attributes[attribute]
-            else:
-                return or_else
         else:
-            return or_else
+            attributes = self.attribute_cache.get(key, _NOT_CACHED)
+            if attributes is _NOT_CACHED:
+                attributes = self._attribute_key(key)
+                self.attribute_cache.put(key, attributes)
+            if attributes is not None:
+                attributes = dict(attributes)
+        if attributes is not None and key in self.degree_deltas:
+            _apply_degree_deltas(attributes, self.degree_deltas[key])
+        return attributes
 
-    def _get_int_attribute_key(self, key, attribute, or_else=None):
-        if self._exists_key(key):
-            attributes = self._attribute_key(key)
-            if attribute in attributes:
-                return int(attributes[attribute])
-            else:
-                return or_else
+    def _put_attributes(self, key, attributes):
+        """Writes the attributes of an edge, creating it if needed, and drops its deferred degree updates."""
+        self.degree_deltas.pop(key, None)
+        if len(self.indexes) > 0:
+            self._update_attribute_indexes(key, self._stored_attributes(key), attributes)
+        self._add_key(key, attributes)
+        if self.attribute_cache is not None:
+            self.attribute_cache.put(key, dict(attributes))
+
+    def _remove_attributes(self, key):
+        """Removes an edge, given its key."""
+        self.degree_deltas.pop(key, None)
+        if len(self.indexes) > 0:
+            self._update_attribute_indexes(key, self._stored_attributes(key), None)
+        self._remove_key(key)
+        if self.attribute_cache is not None:
+            self.attribute_cache.put(key, None)
+
+    def _stored_attributes(self, key):
+        """Returns the stored attributes of an edge, without deferred degree updates, or None."""
+        if self.attribute_cache is not None:
+            attributes = self.attribute_cache.get(key, _NOT_CACHED)
+            if attributes is not _NOT_CACHED:
+                return attributes
+        return self._attribute_key(key)
+
+    def _defer_degree_deltas(self, key, d, dd):
+        """Adds to the degree updates of an existing edge that are deferred until the next flush()."""
+        if key in self.degree_deltas:
+            deltas = self.degree_deltas[key]
+            deltas[0] += d
+            deltas[1] += dd
         else:
-            return or_else
+            self.degree_deltas[key] = [d, dd]
+            if len(self.degree_deltas) >= DEGREE_FLUSH_THRESHOLD:
+                self.flush()
 
-    def _get_float_attribute_key(self, key, attribute, or_else=None):
-        if self._exists_key(key):
-            attributes = self._attribute_key(key)
-            if attribute in attributes:
-                return float(attributes[attribute])
+    def _edge_id(self, edge_str):
+        """Returns the encoded id of an edge string, or None if it does not have one."""
+        encoded = self.edge_ids.get(edge_str)
+        if encoded is None:
+            encoded = self._aux_value(''.join((EDGE_ID_PREFIX, edge_str)))
+            if encoded is not None:
+                self.edge_ids.put(edge_str, encoded)
+        return encoded
+
+    def _assign_edge_id(self, edge_str):
+        """Returns the encoded id of an edge string, creating it if needed. Must be called inside a transaction."""
+        encoded = self._edge_id(edge_str)
+        if encoded is None:
+            encoded = encode_id(self.next_id)
+            self.next_id += 1
+            self._write_aux(''.join((EDGE_ID_PREFIX, edge_str)), encoded)
+            self._write_aux(''.join((ID_EDGE_PREFIX, encoded)), edge_str)
+            self._write_aux(NEXT_ID_KEY, str(self.next_id))
+            self.edge_ids.put(edge_str, encoded)
+        return encoded
+
+    def _id2edge(self, encoded):
+        """Returns the edge with the given encoded id, or None if the id does not exist."""
+        edge = self.id_edges.get(encoded)
+        if edge is None:
+            edge_str = self._aux_value(''.join((ID_EDGE_PREFIX, encoded)))
+            if edge_str is None:
+                return None
+            edge = hedge(edge_str)
+            self.id_edges.put(encoded, edge)
+        return edge
+
+    def _index_positions(self):
+        """Returns the index_positions option as expected by permutation_numbers()."""
+        index_positions = self.options['index_positions']
+        return None if index_positions == 'full' else index_positions
+
+    def _indexed_positions(self, n):
+        """Returns how many of n fixed elements can be used to find permutations."""
+        index_positions = self.options['index_positions']
+        if index_positions == 'full':
+            return n
+        return min(n, index_positions)
+
+    def _do_with_id_permutations(self, ids, f):
+        """Applies f to all the permutations of a sequence of encoded ids, in their encoded form."""
+        for nperm in permutation_numbers(len(ids), self._index_positions()):
+            f(''.join((''.join(permutate(ids, nperm)), encode_id(nperm))))
+
+    def _permutation_keys(self, elements, partial=None, after=None):
+        """Returns a generator of the keys of the permutations that start with the given elements."""
+        # elements are edge strings, and can be followed by an element whose
+        # string representation starts with partial. Keys are (aux_key,
+        # perm_key) tuples, in scan order, where aux_key is the key of the id
+        # of the partial element in the 'ids' encoding, and None otherwise.
+        # With after, the scan resumes after that key
+        after_aux, after_perm = (None, None) if after is None else after
+        if self.options['encoding'] == 'text':
+            if partial is None:
+                prefix = ''.join((' '.join(elements), ' '))
             else:
-                return or_else
+                prefix = ' '.join(tuple(elements) + (partial,))
+            for perm_str in self._permutations_with_prefix(prefix, after_perm):
+                if perm_str != after_perm:
+                    yield None, perm_str
+            return
+        ids = [self._edge_id(element) for element in elements]
+        if None in ids:
+            return
+        prefix = ''.join(ids)
+        if partial is None:
+            for perm_key in self._permutations_with_prefix(prefix, after_perm):
+                if perm_key != after_perm:
+                    yield None, perm_key
+            return
+        for aux_key, encoded in self._aux_with_prefix(''.join((EDGE_ID_PREFIX, partial)), after_aux):
+            start = after_perm if aux_key == after_aux else None
+            for perm_key in self._permutations_with_prefix(''.join((prefix, encoded)), start):
+                if perm_key != start:
+                    yield aux_key, perm_key
+
+    def _permutations(self, elements, partial=None, after=None):
+        """Returns a generator of (edge, nper, key) tuples for the permutations of _permutation_keys()."""
+        if self.options['encoding'] == 'text':
+            for key in self._permutation_keys(elements, partial, after):
+                decoded = decode_permutation(key[1])
+                if decoded is not None and decoded[0]:
+                    yield decoded[0], decoded[1], key
         else:
-            return or_else
+            for key in self._permutation_keys(elements, partial, after):
+                tokens = split_ids(key[1])
+                children = [self._id2edge(token) for token in tokens[:-1]]
+                if None not in children:
+                    nper = decode_id(tokens[-1])
+                    yield hedge(unpermutate(children, nper)), nper, key
+
+    def _permutation_tokens(self, elements, partial, substrings=(), after=None):
+        """Like _permutations(), with the elements of the edges as tokens in permuted order, not built."""
+        # tokens are strings in the 'text' encoding or encoded ids in the 'ids'
+        # encoding. In the 'text' encoding, permutations that do not contain
+        # all the substrings are skipped before they are split
+        if self.options['encoding'] == 'text':
+            for key in self._permutation_keys(elements, partial, after):
+                perm_str = key[1]
+                if substrings and not all(substring in perm_str for substring in substrings):
+                    continue
+                tokens = split_edge_str(perm_str)
+                if tokens is None or len(tokens) < 2:
+                    continue
+                try:
+                    nper = int(tokens[-1])
+                except ValueError:
+                    continue
+                yield tokens[:-1], nper, key
+        else:
+            for key in self._permutation_keys(elements, partial, after):
+                tokens = split_ids(key[1])
+                yield tokens[:-1], decode_id(tokens[-1]), key
+
+    def _structure_candidates(self, pattern, strict, plan=None, after=None):
+        """Returns a generator of (tokens, key) tuples for the edges of _match_structure(), not built."""
+        # tokens are the elements of an edge in order (see _tokens2edge()), and
+        # key is the permutation where it was found. plan replaces the one
+        # chosen by _plan() (a dictionary with the 'plan' and 'filters'
+        # positions), and after resumes the scan after a permutation key found
+        # with the same plan
+        text = self.options['encoding'] == 'text'
+        edges, positions, plan, filters = self._structure_plan(pattern, strict, plan)
+        if strict:
+            edge_strs = [str(edge) for edge in edges]
+            scanned = [edge_strs[positions.index(position)] for position in plan]
+            k = len(plan)
+            if k < len(positions) and not text:
+                edge_ids = [self._edge_id(edge_str) for edge_str in edge_strs]
+            for perm_tokens, nper, key in self._permutation_tokens(scanned[:-1], scanned[-1], after=after):
+                if nper != first_permutation(len(perm_tokens), plan):
+                    continue
+                tokens = unpermutate(perm_tokens, nper)
+                if k < len(positions):
+                    # the other anchors must match exactly, except for the last
+                    # one, which is matched by prefix
+                    last = len(positions) - 1
+                    if positions[last] >= len(tokens):
+                        continue
+                    if text:
+                        if any(tokens[position] != edge_strs[i] for i, position in enumerate(positions[:last])):
+                            continue
+                        if not tokens[positions[last]].startswith(edge_strs[last]):
+                            continue
+                    else:
+                        if any(tokens[position] != edge_ids[i] for i, position in enumerate(positions[:last])):
+                            continue
+                        child = self._id2edge(tokens[positions[last]])
+                        if child is None or not child.to_str().startswith(edge_strs[last]):
+                            continue
+                yield tokens, key
+        else:
+            # the edges found from the scanned anchor must also contain an
+            # element starting with the prefix of each one of the others
+            prefix = _edge2prefix(pattern[plan[0]])[0]
+            prefixes = [_edge2prefix(pattern[position])[0] for position in filters]
+            if text:
+                for perm_tokens, nper, key in self._permutation_tokens((), prefix, prefixes, after):
+                    if not all(any(token.startswith(other) for token in perm_tokens) for other in prefixes):
+                        continue
+                    tokens = unpermutate(perm_tokens, nper)
+                    position = next((i for i, token in enumerate(tokens) if token.startswith(prefix)), -1)
+                    if nper == first_permutation(len(tokens), (position,)):
+                        yield tokens, key
+            else:
+                prefix_ids = {encoded for _, encoded in self._aux_with_prefix(''.join((EDGE_ID_PREFIX, prefix)))}
+                id_filters = [self._prefix_ids_filter(other) for other in prefixes]
+                for perm_tokens, nper, key in self._permutation_tokens((), prefix, after=after):
+                    if not all(any(contains(token) for token in perm_tokens) for contains in id_filters):
+                        continue
+                    tokens = unpermutate(perm_tokens, nper)
+                    position = next((i for i, token in enumerate(tokens) if token in prefix_ids), -1)
+                    if nper == first_permutation(len(tokens), (position,)):
+                        yield tokens, key
+
+    def _prefix_ids_filter(self, prefix):
+        """Returns a function that checks if an encoded id is the one of an edge starting with prefix."""
+        # the ids are loaded in memory, unless there are more than
+        # FILTER_IDS_LIMIT of them
+        ids = set()
+        for _, encoded in self._aux_with_prefix(''.join((EDGE_ID_PREFIX, prefix))):
+            if len(ids) >= FILTER_IDS_LIMIT:
+                def contains(token):
+                    edge = self._id2edge(token)
+                    return edge is not None and edge.to_str().startswith(prefix)
+                return contains
+            ids.add(encoded)
+        return ids.__contains__
+
+    def _tokens2edge(self, tokens):
+        """Builds an edge from the tokens of _structure_candidates(), or returns None if one does not exist."""
+        if self.options['encoding'] == 'text':
+            # as in decode_permutation(), each element is parsed only once
+            return Hyperedge(tuple(hedge(token) if token[0] == '(' else Atom((token,)) for token in tokens))
+        children = [self._id2edge(token) for token in tokens]
+        if None in children:
+            return None
+        return hedge(children)
+
+    def _count_structure(self, pattern):
+        """Counts the edges that strictly match a structural pattern, or returns None for other patterns."""
+        # edges are counted from their permutation keys, and only built and
+        # matched when one of their elements is a more specific version of the
+        # pattern element, which the strict search also accepts
+        structure = _structural_pattern(pattern)
+        if structure is None:
+            return None
+        edge_strs, positions, atom_wildcards, length, open_ended = structure
+        text = self.options['encoding'] == 'text'
+        fixed = edge_strs if text else [self._edge_id(edge_str) for edge_str in edge_strs]
+        n = 0
+        for tokens, _ in self._structure_candidates(pattern, True):
+            size = len(tokens)
+            if size < length or (size > length and not open_ended):
+                continue
+            if all(tokens[position] == fixed[i] for i, position in enumerate(positions)):
+                if all(self._is_atom_token(tokens[position], text) == is_atom
+                       for position, is_atom in atom_wildcards.items()):
+                    n += 1
+            else:
+                edge = self._tokens2edge(tokens)
+                if edge is not None and next(self._match_pattern(edge, pattern, True), None) is not None:
+                    n += 1
+        return n
+
+    def _is_atom_token(self, token, text):
+        if text:
+            return token[0] != '('
+        edge = self._id2edge(token)
+        return edge is not None and edge.atom
+
+    def _add_batch(self, edges, primary):
+        """Adds a batch of edges, with the same outcome as calling add() for each one in sequence."""
+        # attributes are read at most once per key and kept in memory while the
+        # batch is processed, then all the modified keys and new permutations
+        # are written in one transaction
+        # attributes of every key touched by the batch (None if the key does
+        # not exist) and keys whose attributes must be written
+        attributes = {}
+        dirty = {}
+        new_edges = []
+
+        def get_attributes(key):
+            if key not in attributes:
+                attributes[key] = self._attributes(key)
+            return attributes[key]
+
+        def inc_degrees(edge, depth):
+            if depth > 0:
+                key = self._edge2key(edge)
+                attrs = get_attributes(key)
+                if attrs is None:
+                    attributes[key] = {'p': 0, 'd': 1 if depth == 1 else 0, 'dd': 1}
+                else:
+                    if depth == 1:
+                        attrs['d'] = int(attrs['d']) + 1 if 'd' in attrs else 1
+                    attrs['dd'] = int(attrs['dd']) + 1 if 'dd' in attrs else 1
+                dirty[key] = True
+            if edge.not_atom:
+                for child in edge:
+                    inc_degrees(child, depth + 1)
+
+        def add(edge, is_primary):
+            if edge.atom:
+                return
+            for child in edge:
+                add(child, False)
+            key = self._edge2key(edge)
+            attrs = get_attributes(key)
+            if attrs is None:
+                attributes[key] = {'p': 1 if is_primary else 0, 'd': 0, 'dd': 0}
+                dirty[key] = True
+                new_edges.append(edge)
+                if is_primary:
+                    inc_degrees(edge, 0)
+            elif is_primary and int(attrs.get('p', 0)) != 1:
+                attrs['p'] = 1
+                dirty[key] = True
+                inc_degrees(edge, 0)
+
+        for edge in edges:
+            add(edge, primary)
+
+        self.begin_transaction()
+        for key in dirty:
+            self._put_attributes(key, attributes[key])
+        for edge in new_edges:
+            self._write_edge_permutations(edge)
+        self._store_statistics()
+        self.end_transaction()
+
+    def _get_str_attribute_key(self, key, attribute, or_else=None):
+        attributes = self._attributes(key)
+        if attributes is not None and attribute in attributes:
+            return attributes[attribute]
+        return or_else
+
+    def _get_int_attribute_key(self, key, attribute, or_else=None):
+        attributes = self._attributes(key)
+        if attributes is not None and attribute in attributes:
+            return int(attributes[attribute])
+        return or_else
+
+    def _get_float_attribute_key(self, key, attribute, or_else=None):
+        attributes = self._attributes(key)
+        if attributes is not None and attribute in attributes:
+            return float(attributes[attribute])
+        return or_else
@@ -0,0 +1,124 @@
+import graphbrain.constants as const
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.auxiliary import BATCH_SIZE, LEMMA_ATOMS_PREFIX, LEMMA_INDEX_KEY, LEMMA_PREFIX, _chunks
+from graphbrain.memory.cache import _NOT_CACHED
+
+
+# maximum number of lemmas of atoms kept in memory
+LEMMA_CACHE_SIZE = 100000
+
+
+def _lemma_keys(child_strs):
+    """Returns the keys of a (_lemma atom lemma) edge, from the atom to the lemma and back, or None."""
+    # atoms cannot contain spaces, so the keys of an atom (or lemma) never
+    # have the prefix of another one
+    if (len(child_strs) == 3 and child_strs[0] == const.lemma_connector and
+            child_strs[1][0] != '(' and child_strs[2][0] != '('):
+        return (''.join((LEMMA_PREFIX, child_strs[1], ' ', child_strs[2])),
+                ''.join((LEMMA_ATOMS_PREFIX, child_strs[2], ' ', child_strs[1])))
+    return None
+
+
+class LemmaIndex(object):
+    """Index of the lemmas of atoms, in both directions. Mixin of KeyValue."""
+
+    def recompute_lemma_index(self):
+        self.flush()
+        self._remove_aux_with_prefixes((LEMMA_PREFIX, LEMMA_ATOMS_PREFIX))
+        self.lemma_cache.clear()
+        entries = (_lemma_keys(child_strs)
+                   for child_strs in ([child.to_str() for child in edge]
+                                      for edge in self.search((const.lemma_connector, '*', '*'), strict=True)))
+        n = 0
+        # the entries are collected in chunks before they are written, so
+        # that the search is not affected by the writes
+        for chunk in _chunks((keys for keys in entries if keys is not None), BATCH_SIZE):
+            self.begin_transaction()
+            for keys in chunk:
+                for key in keys:
+                    self._write_aux(key, '')
+            self.end_transaction()
+            n += len(chunk)
+        self.begin_transaction()
+        self._write_aux(LEMMA_INDEX_KEY, '1')
+        self.end_transaction()
+        self.has_lemma_index = True
+        self.new_lemma_index = False
+        return n
+
+    def lemma_of(self, atoms):
+        """Returns a list with the lemmas of the given atoms. See Hypergraph.lemma_of()."""
+        if not self.has_lemma_index:
+            return super().lemma_of(atoms)
+        # each distinct atom is looked up with a prefix scan of the index, and
+        # its lemma is then kept in memory
+        lemmas = {}
+        atom_strs = []
+        for atom in atoms:
+            atom = hedge(atom)
+            atom_str = atom.simplify().to_str() if atom.atom else None
+            atom_strs.append(atom_str)
+            if atom_str is not None and atom_str not in lemmas:
+                lemma = self.lemma_cache.get(atom_str, _NOT_CACHED)
+                if lemma is _NOT_CACHED:
+                    prefix = ''.join((LEMMA_PREFIX, atom_str, ' '))
+                    key = next((key for key, _ in self._aux_with_prefix(prefix)), None)
+                    lemma = None if key is None else hedge(key[len(prefix):])
+                    self.lemma_cache.put(atom_str, lemma)
+                lemmas[atom_str] = lemma
+        return [None if atom_str is None else lemmas[atom_str] for atom_str in atom_strs]
+
+    def atoms_with_lemma(self, lemma):
+        """Returns a generator of the atoms that have the given lemma. See Hypergraph.atoms_with_lemma()."""
+        if not self.has_lemma_index:
+            yield from super().atoms_with_lemma(lemma)
+            return
+        prefix = ''.join((LEMMA_ATOMS_PREFIX, hedge(lemma).to_str(), ' '))
+        for key, _ in self._aux_with_prefix(prefix):
+            yield hedge(key[len(prefix):])
+
+    def _init_lemma_index(self):
+        """Reads whether the index exists, or starts it if the hypergraph is empty."""
+        # older hypergraphs find lemmas with searches until
+        # recompute_lemma_index() is called
+        self.has_lemma_index = self._aux_value(LEMMA_INDEX_KEY) is not None
+        if not self.has_lemma_index and next(iter(self.all()), None) is None:
+            # the key is written with the first index entry
+            self.has_lemma_index = True
+            self.new_lemma_index = True
+
+    def _index_lemma(self, child_strs):
+        """Indexes a new edge, if it is a lemma edge. Must be called inside a transaction."""
+        if not self.has_lemma_index:
+            return
+        keys = _lemma_keys(child_strs)
+        if keys is None:
+            return
+        if self.new_lemma_index:
+            self._write_aux(LEMMA_INDEX_KEY, '1')
+            self.new_lemma_index = False
+        for key in keys:
+            self._write_aux(key, '')
+        self.lemma_cache.remove(child_strs[1])
+
+    def _unindex_lemma(self, child_strs):
+        """Unindexes an edge that is removed, if it is a lemma edge. Must be called inside a transaction."""
+        if not self.has_lemma_index:
+            return
+        keys = _lemma_keys(child_strs)
+        if keys is None:
+            return
+        for key in keys:
+            self._remove_aux(key)
+        self.lemma_cache.remove(child_strs[1])
+
+    def _atoms_with_lemma_root(self, root):
+        """Returns a generator of the string representations of the atoms whose lemma has the given root."""
+        if not self.has_lemma_index:
+            for lemma_edge in self.search((const.lemma_connector, '*', '*'), strict=True):
+                if lemma_edge[2].atom and lemma_edge[2].root() == root:
+                    yield lemma_edge[1].to_str()
+            return
+        # lemma atoms start with their root, followed by '/'
+        for key, _ in self._aux_with_prefix(''.join((LEMMA_ATOMS_PREFIX, root, '/'))):
+            yield key[key.index(' ') + 1:]
@@ -1,6 +1,7 @@
 import json
 
 import plyvel
+from sortedcontainers import SortedDict
 
 from graphbrain.hyperedge import hedge
 from graphbrain.memory.keyvalue import KeyValue
@@ -16,23 +17,54 @@ def _decode_attributes(value):
 
 
 class LevelDB(KeyValue):
-    """Implements LevelDB hypergraph storage."""
-
-    def __init__(self, locator_string):
-        super().__init__(locator_string)
+    """Implements LevelDB hypergraph storage.
+
+    Writes performed inside a transaction are accumulated in a plyvel
+    WriteBatch and applied atomically when the transaction ends. Pending
+    writes are kept in a sorted overlay, so that reads performed inside the
+    transaction see them.
+
+    Keyword arguments:
+    sync -- if True, writes are synced to disk before being considered
+    complete, which is safer but much slower (default False)
+    flush_threshold -- if given, the pending writes are applied whenever
+    there are this many of them, which bounds the memory used by large
+    transactions, but makes them no longer atomic: if a transaction is
+    interrupted, the writes applied before are kept (default None)
+
+    Further keyword arguments are passed to KeyValue.
+    """
+
+    def __init__(self, locator_string, sync=False, flush_threshold=None, **kwargs):
+        super().__init__(locator_string, **kwargs)
+        self.sync = sync
+        self.flush_threshold = flush_threshold
         self.db = plyvel.DB(self.locator_string, create_if_missing=True)
+        self.batch = None
+        self.pending = SortedDict()
+        self.transaction_depth = 0
+        self._init_options()
 
     # ===================================
     # Implementation of interface methods
     # ===================================
 
     def close(self):
+        self.flush()
+        self._flush()
+        self.batch = None
+        self.transaction_depth = 0
         self.db.close()
 
     def destroy(self):
+        self.batch = None
+        self.pending = SortedDict()
         self.db.close()
         plyvel.destroy_db(self.locator_string)
         self.db = plyvel.DB(self.locator_string, create_if_missing=True)
+        if self.transaction_depth > 0:
+            self.batch = self.db.write_batch(sync=self.sync)
+        self._reset_options()
 
     def all(self):
         start_str = 'v'
@@ -40,27 +72,37 @@ class LevelDB(KeyValue):
         start_key = start_str.encode('utf-8')
         end_key = end_str.encode('utf-8')
 
-        for key, value in self.db.iterator(start=start_key, stop=end_key):
+        for key, value in self._iterator(start_key, end_key):
             edge = hedge(key.decode('utf-8')[1:])
             if edge is not None:
                 yield edge
 
     def all_attributes(self):
+        self.flush()
         start_str = 'v'
         end_str = str_plus_1(start_str)
         start_key = start_str.encode('utf-8')
         end_key = end_str.encode('utf-8')
 
-        for key, value in self.db.iterator(start=start_key, stop=end_key):
+        for key, value in self._iterator(start_key, end_key):
             edge = hedge(key.decode('utf-8')[1:])
             attributes = _decode_attributes(value)
             yield edge, attributes
 
     def begin_transaction(self):
-        pass
+        if self.batch_mode:
+            return
+        if self.transaction_depth == 0:
+            self.batch = self.db.write_batch(sync=self.sync)
+        self.transaction_depth += 1
 
     def end_transaction(self):
-        pass
+        if self.batch_mode:
+            return
+        self.transaction_depth -= 1
+        if self.transaction_depth == 0:
+            self._flush()
+            self.batch = None
 
     # ==========================================
     # Implementation of private abstract methods
@@ -69,38 +111,46 @@ class LevelDB(KeyValue):
     def _edge2key(self, edge):
         return (''.join(('v', edge.to_str()))).encode('utf-8')
 
+    def _str2key(self, edge_str):
+        return (''.join(('v', edge_str))).encode('utf-8')
+
+    def _key2str(self, key):
+        return key.decode('utf-8')[1:]
+
     def _exists_key(self, key):
         """Checks if the given key exists."""
-        return self.db.get(key) is not None
+        return self._get(key) is not None
 
     def _add_key(self, key, attributes):
         """Adds the given edge, given its key."""
         value = _encode_attributes(attributes)
-        self.db.put(key, value)
+        self._put(key, value)
 
     def _attribute_key(self, key):
-        value = self.db.get(key)
+        value = self._get(key)
+        if value is None:
+            return None
         return _decode_attributes(value)
 
     def _write_edge_permutation(self, perm):
         """Writes a given permutation."""
         perm_key = (''.join(('p', perm))).encode('utf-8')
-        self.db.put(perm_key, b'x')
+        self._put(perm_key, b'x')
 
     def _remove_edge_permutation(self, perm):
         """Removes a given permutation."""
         perm_key = (''.join(('p', perm))).encode('utf-8')
-        self.db.delete(perm_key)
+        self._delete(perm_key)
 
     def _remove_key(self, key):
         """Removes an edge, given its key."""
-        self.db.delete(key)
+        self._delete(key)
 
-    def _permutations_with_prefix(self, prefix):
+    def _permutations_with_prefix(self, prefix, start=None):
         end_str = str_plus_1(prefix)
-        start_key = (''.join(('p', prefix))).encode('utf-8')
+        start_key = (''.join(('p', max(prefix, start or prefix)))).encode('utf-8')
         end_key = (''.join(('p', end_str))).encode('utf-8')
-        for key, _ in self.db.iterator(start=start_key, stop=end_key):
+        for key, _ in self._iterator(start_key, end_key):
             perm_str = key.decode('utf-8')
             yield perm_str[1:]
 
@@ -108,5 +158,88 @@ class LevelDB(KeyValue):
         end_str = str_plus_1(prefix)
         start_key = (''.join(('v', prefix))).encode('utf-8')
         end_key = (''.join(('v', end_str))).encode('utf-8')
-        for key, _ in self.db.iterator(start=start_key, stop=end_key):
+        for key, _ in self._iterator(start_key, end_key):
             yield hedge(key.decode('utf-8')[1:])
+
+    def _aux_value(self, key):
+        value = self._get((''.join(('x', key))).encode('utf-8'))
+        if value is None:
+            return None
+        return value.decode('utf-8')
+
+    def _write_aux(self, key, value):
+        self._put((''.join(('x', key))).encode('utf-8'), value.encode('utf-8'))
+
+    def _remove_aux(self, key):
+        self._delete((''.join(('x', key))).encode('utf-8'))
+
+    def _aux_with_prefix(self, prefix, start=None):
+        end_str = str_plus_1(prefix)
+        start_key = (''.join(('x', max(prefix, start or prefix)))).encode('utf-8')
+        end_key = (''.join(('x', end_str))).encode('utf-8')
+        for key, value in self._iterator(start_key, end_key):
+            yield key.decode('utf-8')[1:], value.decode('utf-8')
+
+    # =====================
+    # Local private methods
+    # =====================
+
+    def _get(self, key):
+        if key in self.pending:
+            return self.pending[key]
+        return self.db.get(key)
+
+    def _put(self, key, value):
+        if self.batch is None:
+            self.db.put(key, value, sync=self.sync)
+        else:
+            self.batch.put(key, value)
+            self.pending[key] = value
+            if self.flush_threshold is not None and len(self.pending) >= self.flush_threshold:
+                self._flush()
+
+    def _delete(self, key):
+        if self.batch is None:
+            self.db.delete(key, sync=self.sync)
+        else:
+            self.batch.delete(key)
+            self.pending[key] = None
+            if self.flush_threshold is not None and len(self.pending) >= self.flush_threshold:
+                self._flush()
+
+    def _flush(self):
+        """Writes the current batch to the database and starts a new one."""
+        if self.batch is not None and len(self.pending) > 0:
+            self.batch.write()
+            self.batch = self.db.write_batch(sync=self.sync)
+            self.pending = SortedDict()
+
+    def _iterator(self, start_key, end_key):
+        """Iterates over the (key, value) pairs in the given range, merging
+        the database contents with pending writes."""
+        if len(self.pending) == 0:
+            yield from self.db.iterator(start=start_key, stop=end_key)
+            return
+        # the pending writes in the range are copied, because the overlay can
+        # change while the results are consumed
+        pending = [(key, self.pending[key])
+                   for key in self.pending.irange(start_key, end_key, inclusive=(True, False))]
+        if len(pending) == 0:
+            yield from self.db.iterator(start=start_key, stop=end_key)
+            return
+        i = 0
+        for key, value in self.db.iterator(start=start_key, stop=end_key):
+            while i < len(pending) and pending[i][0] < key:
+                if pending[i][1] is not None:
+                    yield pending[i]
+                i += 1
+            if i < len(pending) and pending[i][0] == key:
+                if pending[i][1] is not None:
+                    yield pending[i]
+                i += 1
+            else:
+                yield key, value
+        while i < len(pending):
+            if pending[i][1] is not None:
+                yield pending[i]
+            i += 1
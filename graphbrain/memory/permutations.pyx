@@ -17,14 +17,14 @@
 import itertools
 import math
 
-from graphbrain.hyperedge import hedge, split_edge_str
+from graphbrain.hyperedge import hedge, split_edge_str, Atom, Hyperedge
 
 
 # maximum permutations of an edge that are written to the database
 MAX_PERMS = 1000
 
 
-permcache = {}
+perm_numbers_cache = {}
 
 
 def fact(n):
@@ -36,81 +36,129 @@ def fact(n):
     return res
 
 
-def nthperm(n, nper):
-    if n in permcache and nper in permcache[n]:
-        return permcache[n][nper]
+def nthperm(int n, nper):
+    """Returns the indices of the permutation of n elements with the given
+    number, in lexicographic order (the order of itertools.permutations()).
 
-    pos = 0
-    pindices = None
-    for perm in itertools.permutations(range(n)):
-        if pos >= nper:
-            pindices = perm
-            break
-        pos += 1
-    perm = tuple(pindices[i] for i in range(n))
-    if n not in permcache:
-        permcache[n] = {}
-    permcache[n][nper] = perm
-    return perm
+    The permutation is obtained directly from the digits of the number in
+    the factorial number system.
+    """
+    cdef int i
+    cdef list pool = list(range(n))
+    cdef list perm = []
+    radix = math.factorial(n)
+    for i in range(n, 0, -1):
+        radix //= i
+        digit, nper = divmod(nper, radix)
+        perm.append(pool.pop(digit))
+    return tuple(perm)
 
 
 def permutate(tokens, nper):
     """Reorder the tokens vector to perform a permutation,
        specified by nper.
     """
-    n = len(tokens)
-    indices = nthperm(n, nper)
-    return tuple(tokens[i] for i in indices)
+    return tuple(tokens[i] for i in nthperm(len(tokens), nper))
 
 
 def unpermutate(tokens, nper):
     """Reorder the tokens vector to revert a permutation,
        specified by nper.
     """
-    n = len(tokens)
+    cdef int pos
+    cdef int n = len(tokens)
     indices = nthperm(n, nper)
     res = [''] * n
-    for pos, i in enumerate(indices):
-        res[i] = tokens[pos]
+    for pos in range(n):
+        res[indices[pos]] = tokens[pos]
     return res
 
 
 def first_permutation(elements, positions):
+    """Number of the first permutation of a sequence with the given number of
+    elements that starts with the elements at the given positions, in the
+    given order."""
     n_elements = elements
     fp = 0
     for i in range(len(positions)):
         position = positions[i]
-        fp += fact(n_elements - 1) * (position - i)
+        preceding = sum(1 for previous in positions[:i] if previous < position)
+        fp += fact(n_elements - 1) * (position - preceding)
         n_elements -= 1
     return fp
 
 
-def do_with_edge_permutations(edge, f):
-    """Applies the function f to all permutations of the given edge."""
-    nperms = min(math.factorial(len(edge)), MAX_PERMS)
-    for nperm in range(nperms):
-        perm_str = ' '.join([e.to_str() for e in permutate(edge, nperm)])
-        perm_str = ''.join((perm_str, ' ', str(nperm)))
-        f(perm_str)
+def permutation_numbers(n, index_positions=None):
+    """Returns the sorted numbers of the permutations that are written to the
+    database for an edge with n elements.
 
+    Keyword argument:
+    index_positions -- if None, all permutations are written (up to
+    MAX_PERMS). Otherwise, only the permutations needed to place any
+    index_positions elements first, in any order. (default None)
+    """
+    key = (n, index_positions)
+    if key not in perm_numbers_cache:
+        if index_positions is None:
+            numbers = tuple(range(min(math.factorial(n), MAX_PERMS)))
+        else:
+            k = min(index_positions, n)
+            numbers = tuple(sorted(set(first_permutation(n, positions)
+                                       for positions in itertools.permutations(range(n), k))))
+        perm_numbers_cache[key] = numbers
+    return perm_numbers_cache[key]
+
+
+def do_with_permutations(child_strs, f, index_positions=None):
+    """Applies the function f to all permutations of an edge, given the
+    string representations of its elements.
+
+    Keyword argument:
+    index_positions -- see permutation_numbers() (default None)
+    """
+    for nperm in permutation_numbers(len(child_strs), index_positions):
+        f(''.join((' '.join(permutate(child_strs, nperm)), ' ', str(nperm))))
 
-def perm2edge(perm_str):
-    """Transforms a permutation string from a database query
-       into an edge.
+
+def do_with_edge_permutations(edge, f, index_positions=None):
+    """Applies the function f to all permutations of the given edge.
+
+    Keyword argument:
+    index_positions -- see permutation_numbers() (default None)
     """
+    do_with_permutations([child.to_str() for child in edge], f, index_positions)
+
+
+def decode_permutation(str perm_str):
+    """Transforms a permutation string from a database query into a tuple
+    (edge, permutation number), or None if the string is not valid.
+    """
+    cdef str token
     try:
         tokens = split_edge_str(perm_str)
-        if tokens is None:
+        if tokens is None or len(tokens) < 2:
             return None
         nper = int(tokens[-1])
-        tokens = tokens[:-1]
-        tokens = unpermutate(tokens, nper)
-        edge_str = ' '.join(tokens)
-        if len(tokens) > 1:
-            edge_str = ''.join(('(', edge_str, ')'))
-        return hedge(edge_str)
-    except ValueError:
+        tokens = unpermutate(tokens[:-1], nper)
+    except (ValueError, IndexError):
+        return None
+    if len(tokens) == 1:
+        edge = hedge(tokens[0])
+    else:
+        # tokens are already split at the top level, so each child is parsed
+        # only once
+        edge = Hyperedge(tuple(hedge(token) if token[0] == '(' else Atom((token,)) for token in tokens))
+    return edge, nper
+
+
+def perm2edge(perm_str):
+    """Transforms a permutation string from a database query
+       into an edge.
+    """
+    decoded = decode_permutation(perm_str)
+    if decoded is None:
         return None
+    return decoded[0]
 
 
 def str_plus_1(s):
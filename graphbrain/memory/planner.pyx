@@ -0,0 +1,189 @@
+from graphbrain.memory.auxiliary import (ATOM_STATS_PREFIX, BATCH_SIZE, DEGREE_FLUSH_THRESHOLD, ROOT_STATS_PREFIX,
+                                         STATISTICS_KEY, _chunks)
+from graphbrain.patterns import is_full_pattern, is_pattern
+
+
+# maximum number of atom statistics that are added up to estimate the rows
+# of a prefix, after which the statistics of its root are used instead
+STATS_SCAN_LIMIT = 100
+
+
+def _prefix_heuristic(atom):
+    return len(atom.root())
+
+
+def _edge2prefix(edge):
+    if edge.atom:
+        parts = edge.parts()
+        if len(parts) == 1:
+            return str(edge), _prefix_heuristic(edge)
+        # atoms with more specific types, argument roles or further parts
+        # also match
+        return ''.join((parts[0], '/', parts[1].split('.', 1)[0])), _prefix_heuristic(edge)
+    else:
+        prefix, heuristic = _edge2prefix(edge[0])
+        return '(' + prefix, heuristic
+
+
+def _edges2prefix(edges):
+    best_heuristic = -1
+    best_prefix = None
+    for edge in edges:
+        prefix, heuristic = _edge2prefix(edge)
+        if heuristic > best_heuristic:
+            best_heuristic = heuristic
+            best_prefix = prefix
+    return best_prefix
+
+
+def _stat_keys(edge_str):
+    """Returns the atom and root statistics keys of an element of an edge."""
+    # elements that are not atoms are counted under their first atom, nested
+    # at the same depth, as they are found by non-strict searches
+    depth = len(edge_str) - len(edge_str.lstrip('('))
+    head = edge_str[depth:].split(' ', 1)[0].split(')', 1)[0]
+    parens = edge_str[:depth]
+    return (''.join((ATOM_STATS_PREFIX, parens, head)),
+            ''.join((ROOT_STATS_PREFIX, parens, head.split('/', 1)[0])))
+
+
+def _count_elements(counts, child_strs, delta):
+    """Adds delta to the statistics of each element of an edge."""
+    for child_str in child_strs:
+        for key in _stat_keys(child_str):
+            counts[key] = counts.get(key, 0) + delta
+
+
+class QueryPlanner(object):
+    """Cardinality statistics of the elements of edges, and the search plans
+    that are chosen from them. Mixin of KeyValue."""
+
+    def recompute_statistics(self):
+        self.flush()
+        counts = {}
+        n = 0
+        for edge in self.all():
+            if edge.not_atom:
+                _count_elements(counts, [child.to_str() for child in edge], 1)
+                n += 1
+        self._remove_aux_with_prefixes((ATOM_STATS_PREFIX, ROOT_STATS_PREFIX))
+        for chunk in _chunks(counts.items(), BATCH_SIZE):
+            self.begin_transaction()
+            for key, value in chunk:
+                self._write_aux(key, str(value))
+            self.end_transaction()
+        self.begin_transaction()
+        self._write_aux(STATISTICS_KEY, '1')
+        self.end_transaction()
+        self.has_statistics = True
+        self.new_statistics = False
+        return n
+
+    # from Hypergraph
+    def _explain(self, pattern, strict):
+        if pattern.atom or is_full_pattern(pattern):
+            return {'scan': 'all', 'anchors': [], 'plan': [], 'filters': [], 'rows': None,
+                    'statistics': self.has_statistics}
+        return self._plan(pattern, strict, estimate=True)
+
+    def _init_statistics(self):
+        """Reads whether the statistics exist, or starts them if the hypergraph is empty."""
+        # hypergraphs created before the statistics existed are searched
+        # without them until recompute_statistics() is called
+        self.has_statistics = self._aux_value(STATISTICS_KEY) is not None
+        if not self.has_statistics and next(iter(self.all()), None) is None:
+            # the key is written with the first statistics
+            self.has_statistics = True
+            self.new_statistics = True
+
+    def _update_statistics(self, child_strs, delta):
+        """Adds delta to the pending statistics of the elements of an edge."""
+        if not self.has_statistics:
+            return
+        _count_elements(self.stat_deltas, child_strs, delta)
+        if self.batch_mode and len(self.stat_deltas) >= DEGREE_FLUSH_THRESHOLD:
+            self.flush()
+
+    def _store_statistics(self):
+        """Writes the pending statistics, unless they are deferred in batch mode."""
+        if not self.batch_mode and len(self.stat_deltas) > 0:
+            self._write_statistics()
+
+    def _write_statistics(self):
+        """Writes the pending statistics. Must be called inside a transaction."""
+        if self.new_statistics and len(self.stat_deltas) > 0:
+            self._write_aux(STATISTICS_KEY, '1')
+            self.new_statistics = False
+        stat_deltas = self.stat_deltas
+        self.stat_deltas = {}
+        for key, delta in stat_deltas.items():
+            if delta == 0:
+                continue
+            value = self._aux_value(key)
+            n = delta if value is None else int(value) + delta
+            if n > 0:
+                self._write_aux(key, str(n))
+            elif value is not None:
+                self._remove_aux(key)
+
+    def _statistic(self, key):
+        value = self._aux_value(key)
+        return (0 if value is None else int(value)) + self.stat_deltas.get(key, 0)
+
+    def _estimate_rows(self, edge, strict, partial):
+        """Estimated number of edges found by scanning a pattern element."""
+        # with strict matching, the element is matched exactly, or by prefix
+        # if it is partial (see _plan()). For elements that are not atoms
+        # this is an upper bound
+        if strict:
+            atom_key, root_key = _stat_keys(edge.to_str())
+            if edge.not_atom or not partial:
+                return self._statistic(atom_key)
+        else:
+            atom_key, root_key = _stat_keys(_edge2prefix(edge)[0])
+        n = 0
+        for i, (_, value) in enumerate(self._aux_with_prefix(atom_key)):
+            if i >= STATS_SCAN_LIMIT:
+                return self._statistic(root_key)
+            n += int(value)
+        return n
+
+    def _plan(self, pattern, strict, estimate=False):
+        """Chooses the anchors of a pattern to scan. See Hypergraph.explain()."""
+        # Without strict matching, one anchor is scanned: the one with the
+        # fewest estimated rows. With strict matching, all the anchors are
+        # scanned if the index allows it, otherwise the most selective ones
+        # are chosen, and the last anchor of the pattern (matched by prefix)
+        # is always scanned last. Without statistics, the choices are the
+        # anchor with the longest root, or the first anchors. With estimate,
+        # the rows of every anchor are estimated, even if they are not needed
+        anchors = [{'edge': edge.to_str(), 'position': i}
+                   for i, edge in enumerate(pattern) if not is_pattern(edge)]
+        k = self._indexed_positions(len(anchors)) if strict else 1
+        choose = k < len(anchors) and self.has_statistics
+        if choose or (estimate and self.has_statistics):
+            last = len(anchors) - 1
+            for i, anchor in enumerate(anchors):
+                anchor['rows'] = self._estimate_rows(pattern[anchor['position']], strict, i == last)
+        else:
+            for anchor in anchors:
+                anchor['rows'] = None
+        if strict:
+            if choose:
+                chosen = sorted(anchors, key=lambda anchor: anchor['rows'])[:k]
+                chosen.sort(key=lambda anchor: (anchor is anchors[-1], anchor['rows']))
+            else:
+                chosen = anchors[:k]
+        elif choose:
+            chosen = [min(anchors, key=lambda anchor: anchor['rows'])]
+        else:
+            prefix = _edges2prefix([pattern[anchor['position']] for anchor in anchors])
+            chosen = [next(anchor for anchor in anchors if _edge2prefix(pattern[anchor['position']])[0] == prefix)]
+        rows = None
+        if anchors[0]['rows'] is not None:
+            rows = min(anchor['rows'] for anchor in chosen)
+        # without strict matching, the other anchors are checked on the keys
+        # of the scanned edges, before they are built
+        filters = [] if strict else [anchor['position'] for anchor in anchors if anchor not in chosen]
+        return {'scan': 'index', 'anchors': anchors, 'plan': [anchor['position'] for anchor in chosen],
+                'filters': filters, 'rows': rows, 'statistics': self.has_statistics}
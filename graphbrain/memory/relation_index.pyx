@@ -0,0 +1,103 @@
+from graphbrain.hyperedge import hedge
+from graphbrain.hypergraph import _deep_atom
+from graphbrain.memory.auxiliary import BATCH_SIZE, RELATION_INDEX_KEY, RELATION_PREFIX, _chunks
+
+
+def _relation_keys(child_strs):
+    """Returns the index keys of a relation, one per argument role, or an empty list if the edge is not one."""
+    connector = hedge(child_strs[0])
+    if connector.mtype() != 'P':
+        return []
+    argroles = connector.argroles()
+    if len(argroles) > 0 and argroles[0] == '{':
+        argroles = argroles[1:-1]
+    argroles = argroles.replace(',', '')[:len(child_strs) - 1]
+    # relations are indexed by the simplified deep atom of their predicate
+    pred_str = _deep_atom(connector).simplify().to_str()
+    edge_str = ''.join(('(', ' '.join(child_strs), ')'))
+    return [''.join((RELATION_PREFIX, pred_str, ' ', argrole, ' ', edge_str)) for argrole in sorted(set(argroles))]
+
+
+class RelationIndex(object):
+    """Index of the relations by predicate and argument role. Mixin of KeyValue."""
+
+    def create_relation_index(self):
+        self.drop_relation_index()
+        # the entries are collected in chunks before they are written, so
+        # that the scan is not affected by the writes
+        entries = (_relation_keys([child.to_str() for child in edge]) for edge in self.all_non_atoms())
+        n = 0
+        for chunk in _chunks((keys for keys in entries if len(keys) > 0), BATCH_SIZE):
+            self.begin_transaction()
+            for keys in chunk:
+                for key in keys:
+                    self._write_aux(key, '')
+            self.end_transaction()
+            n += len(chunk)
+        self._write_relation_index_key()
+        self.has_relation_index = True
+        return n
+
+    def drop_relation_index(self):
+        self.has_relation_index = False
+        self.begin_transaction()
+        self._remove_aux(RELATION_INDEX_KEY)
+        self.end_transaction()
+        self._remove_aux_with_prefixes((RELATION_PREFIX,))
+
+    def relations(self, lemmas, argrole):
+        """Returns a generator of (edge, argument) tuples. See Hypergraph.relations()."""
+        if not self.has_relation_index:
+            yield from super().relations(lemmas, argrole)
+            return
+        # the predicate atoms with the given lemmas are found first, and then
+        # only their relations are read
+        pred_strs = set()
+        for root in set(lemmas):
+            pred_strs.update(self._atoms_with_lemma_root(root))
+            # predicates without a lemma are their own lemma
+            candidates = list(self._relation_predicates(root))
+            pred_strs.update(pred_str for pred_str, lemma in zip(candidates, self.lemma_of(candidates))
+                             if lemma is None)
+        for pred_str in sorted(pred_strs):
+            prefix = ''.join((RELATION_PREFIX, pred_str, ' ', argrole, ' '))
+            for key, _ in self._aux_with_prefix(prefix):
+                edge = hedge(key[len(prefix):])
+                for argument in edge.edges_with_argrole(argrole):
+                    yield edge, argument
+
+    def _init_relation_index(self):
+        """Reads whether the index exists."""
+        # unlike the other indexes, it only exists once it is created
+        self.has_relation_index = self._aux_value(RELATION_INDEX_KEY) is not None
+
+    def _write_relation_index_key(self):
+        self.begin_transaction()
+        self._write_aux(RELATION_INDEX_KEY, '1')
+        self.end_transaction()
+
+    def _index_relation(self, child_strs):
+        """Indexes a new edge, if it is a relation. Must be called inside a transaction."""
+        if self.has_relation_index:
+            for key in _relation_keys(child_strs):
+                self._write_aux(key, '')
+
+    def _unindex_relation(self, child_strs):
+        """Unindexes an edge that is removed, if it is a relation. Must be called inside a transaction."""
+        if self.has_relation_index:
+            for key in _relation_keys(child_strs):
+                self._remove_aux(key)
+
+    def _relation_predicates(self, root):
+        """Returns a generator of the string representations of the indexed predicate atoms with the given root."""
+        # the index is scanned skipping from one predicate to the next
+        prefix = ''.join((RELATION_PREFIX, root, '/'))
+        start_key = None
+        while True:
+            key = next((key for key, _ in self._aux_with_prefix(prefix, start_key)), None)
+            if key is None:
+                return
+            pred_str = key[len(RELATION_PREFIX):key.index(' ')]
+            yield pred_str
+            # '!' is the character after the space that ends the atom
+            start_key = ''.join((RELATION_PREFIX, pred_str, '!'))
@@ -0,0 +1,135 @@
+import graphbrain.constants as const
+from graphbrain.hyperedge import hedge, str2atom
+from graphbrain.memory.auxiliary import BATCH_SIZE, SEQUENCE_INDEX_KEY, SEQUENCE_PREFIX, _chunks
+
+
+# number of digits of the positions in the sequence index keys
+SEQUENCE_POS_DIGITS = 10
+
+
+def _sequence_prefix(name_str):
+    """Returns the prefix of the index keys of a sequence, given its name."""
+    # atoms cannot contain spaces, so the keys of a sequence never have the
+    # prefix of another one
+    return ''.join((SEQUENCE_PREFIX, name_str, ' '))
+
+
+def _sequence_key(child_strs):
+    """Returns the index key of a (_seq name pos edge) edge, or None."""
+    if len(child_strs) == 4 and child_strs[0] == const.sequence_connector and child_strs[2].isdigit():
+        return ''.join((_sequence_prefix(child_strs[1]), child_strs[2].zfill(SEQUENCE_POS_DIGITS)))
+    return None
+
+
+class SequenceIndex(object):
+    """Index of the edges of every sequence by position. Mixin of KeyValue."""
+
+    def recompute_sequence_index(self):
+        self.flush()
+        self._remove_aux_with_prefixes((SEQUENCE_PREFIX,))
+        entries = ((_sequence_key(child_strs), child_strs[3])
+                   for child_strs in ([child.to_str() for child in edge]
+                                      for edge in self.search((const.sequence_connector, '*', '*', '*'), strict=True)))
+        n = 0
+        # the entries are collected in chunks before they are written, so
+        # that the search is not affected by the writes
+        for chunk in _chunks((entry for entry in entries if entry[0] is not None), BATCH_SIZE):
+            self.begin_transaction()
+            for key, value in chunk:
+                self._write_aux(key, value)
+            self.end_transaction()
+            n += len(chunk)
+        self.begin_transaction()
+        self._write_aux(SEQUENCE_INDEX_KEY, '1')
+        self.end_transaction()
+        self.has_sequence_index = True
+        self.new_sequence_index = False
+        return n
+
+    def add_to_sequence(self, name, edge, primary=True):
+        """Adds 'edge' to sequence 'name'. See Hypergraph.add_to_sequence()."""
+        if not self.batch_mode:
+            return super().add_to_sequence(name, edge, primary=primary)
+        # in batch mode, the size of the sequence is read once, and then kept
+        # in memory until flush()
+        seq_atom = str2atom(name)
+        pos = self.sequence_sizes.get(seq_atom)
+        if pos is None:
+            seq_attrs_edge = hedge((const.sequence_attrs_connector, seq_atom))
+            pos = self.get_int_attribute(seq_attrs_edge, 'size', 0)
+        result = self.add((const.sequence_connector, seq_atom, str(pos), edge))
+        self.sequence_sizes[seq_atom] = pos + 1
+        if primary:
+            self.set_primary(edge, True)
+        return result
+
+    def sequences(self):
+        """Returns an iterator for all the sequence names present in the hypergraph."""
+        if not self.has_sequence_index:
+            yield from super().sequences()
+            return
+        start_key = None
+        while True:
+            key = next((key for key, _ in self._aux_with_prefix(SEQUENCE_PREFIX, start_key)), None)
+            if key is None:
+                return
+            name_str = key[len(SEQUENCE_PREFIX):key.index(' ')]
+            yield name_str
+            # '!' is the character after the space that ends the name
+            start_key = ''.join((SEQUENCE_PREFIX, name_str, '!'))
+
+    # from Hypergraph
+    def _sequence(self, name, start, stop):
+        if not self.has_sequence_index:
+            yield from super()._sequence(name, start, stop)
+            return
+        prefix = _sequence_prefix(hedge(name).to_str())
+        start_key = ''.join((prefix, str(start).zfill(SEQUENCE_POS_DIGITS)))
+        pos = start
+        for key, edge_str in self._aux_with_prefix(prefix, start_key):
+            if stop is not None and pos >= stop:
+                return
+            # like the search for each position, stops at the first gap
+            if int(key[len(prefix):]) != pos:
+                return
+            yield hedge(edge_str)
+            pos += 1
+
+    def _init_sequence_index(self):
+        """Reads whether the index exists, or starts it if the hypergraph is empty."""
+        # older hypergraphs read their sequences with searches until
+        # recompute_sequence_index() is called
+        self.has_sequence_index = self._aux_value(SEQUENCE_INDEX_KEY) is not None
+        if not self.has_sequence_index and next(iter(self.all()), None) is None:
+            # the key is written with the first index entry
+            self.has_sequence_index = True
+            self.new_sequence_index = True
+
+    def _write_sequence_sizes(self):
+        """Stores the sizes of the sequences kept in batch mode. Must be called inside a transaction."""
+        sequence_sizes = self.sequence_sizes
+        self.sequence_sizes = {}
+        for seq_atom, size in sequence_sizes.items():
+            seq_attrs_edge = hedge((const.sequence_attrs_connector, seq_atom))
+            self._set_attribute_key(self._edge2key(seq_attrs_edge), 'size', size)
+
+    def _index_sequence(self, child_strs):
+        """Indexes a new edge, if it is part of a sequence. Must be called inside a transaction."""
+        if not self.has_sequence_index:
+            return
+        key = _sequence_key(child_strs)
+        if key is None:
+            return
+        if self.new_sequence_index:
+            self._write_aux(SEQUENCE_INDEX_KEY, '1')
+            self.new_sequence_index = False
+        self._write_aux(key, child_strs[3])
+
+    def _unindex_sequence(self, child_strs):
+        """Unindexes an edge that is removed. Must be called inside a transaction."""
+        if not self.has_sequence_index:
+            return
+        key = _sequence_key(child_strs)
+        # the entry may refer to another edge at the same position
+        if key is not None and self._aux_value(key) == child_strs[3]:
+            self._remove_aux(key)
@@ -0,0 +1,338 @@
+# Hypergraphs partitioned over several key-value databases (shards) in a
+# local directory.
+#
+# Every edge that is not an atom is stored in one of the edge shards,
+# determined by a stable hash of the edge, together with all of its
+# permutations. Atoms, with their degrees, and all the auxiliary keys (the id
+# dictionary, statistics and indexes) are stored in a separate atom shard. The
+# attributes of an edge are thus kept in a single place and updated there, so
+# no shard needs to replicate information about the others. Permutation
+# scans, on which search(), match() and star() are built, are sent to all the
+# edge shards and their sorted results are merged, so that they are returned
+# in the same order as with a single database. atoms_with_root() only reads
+# the atom shard.
+#
+# Each shard commits its own transaction, so transactions are not atomic
+# across shards. The atom shard commits first, and then the edge shards. If
+# the process stops between two commits, the id dictionary and the indexes
+# may refer to edges that were not written, and the degrees and statistics
+# may count them. recompute_degrees(), recompute_statistics() and the
+# functions that rebuild the indexes repair them. An edge is always written
+# together with its permutations, but it may lack some of its subedges.
+#
+# Sharding spreads the storage and the reads of a hypergraph. All the writes
+# still go through the process that owns it, one at a time.
+import heapq
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from graphbrain.memory.keyvalue import KeyValue
+from graphbrain.memory.leveldb import LevelDB
+from graphbrain.memory.sqlite import SQLite
+
+
+# file in the hypergraph directory with the number of shards and their backend
+MANIFEST = 'shards.json'
+
+# version of the layout of the shards, stored in the manifest
+LAYOUT_VERSION = 2
+
+# backends that can be used for shards, by file extension
+SHARD_BACKENDS = {'db': SQLite, 'hg': LevelDB}
+
+# backends whose connections can be used by the threads of a worker pool
+THREAD_SAFE_BACKENDS = {'hg'}
+
+DEFAULT_SHARDS = 4
+DEFAULT_SHARD_BACKEND = 'db'
+
+# number of keys read from a shard at a time by the worker threads
+PREFETCH_SIZE = 1000
+
+# prefix of the auxiliary keys of the sharded hypergraph in the shards,
+# separating them from the storage options of the shards themselves
+AUX_PREFIX = 's'
+
+
+def shard_index(key, n):
+    """Returns the shard, out of n, where the key (a string) is stored."""
+    return zlib.crc32(key.encode('utf-8')) % n
+
+
+def _edge_key(edge):
+    return edge.to_str()
+
+
+def _item_key(item):
+    return item[0]
+
+
+def _edge_item_key(item):
+    return item[0].to_str()
+
+
+def _prefetch(executor, iterator):
+    """Starts reading the iterator in chunks in a worker thread, and returns
+    a generator of its items. The next chunk is read while the current one
+    is consumed."""
+    def read_chunk():
+        return list(islice(iterator, PREFETCH_SIZE))
+
+    future = executor.submit(read_chunk)
+
+    def items(future):
+        while True:
+            chunk = future.result()
+            if len(chunk) < PREFETCH_SIZE:
+                yield from chunk
+                return
+            future = executor.submit(read_chunk)
+            yield from chunk
+
+    return items(future)
+
+
+def _read_manifest(locator_string):
+    path = os.path.join(locator_string, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class ShardedHypergraph(KeyValue):
+    """Implements hypergraph storage partitioned over several SQLite or
+    LevelDB databases (shards), kept in a local directory.
+
+    Keyword arguments:
+    shards -- number of edge shards (default: stored value, or
+    DEFAULT_SHARDS)
+    shard_backend -- backend of the shards, 'db' (SQLite) or 'hg' (LevelDB)
+    (default: stored value, or DEFAULT_SHARD_BACKEND)
+    workers -- number of threads that read from the shards in parallel
+    during queries, or 1 to read from them sequentially in the calling
+    thread. Only LevelDB shards can be read by worker threads. With more
+    than one worker, the hypergraph should not be modified while the results
+    of a query are being consumed. (default: one per shard, up to the number
+    of CPUs, with LevelDB shards, and 1 with SQLite shards)
+
+    The number of shards and their backend can only be set when the
+    hypergraph is created, and are then stored in the directory. Further
+    keyword arguments are passed to KeyValue.
+    """
+
+    def __init__(self, locator_string, shards=None, shard_backend=None, workers=None, **kwargs):
+        super().__init__(locator_string, **kwargs)
+        manifest = _read_manifest(locator_string)
+        if manifest is None:
+            manifest = {'shards': DEFAULT_SHARDS if shards is None else shards,
+                        'backend': DEFAULT_SHARD_BACKEND if shard_backend is None else shard_backend,
+                        'version': LAYOUT_VERSION}
+            if type(manifest['shards']) is not int or manifest['shards'] < 1:
+                raise RuntimeError('shards must be a positive integer.')
+            if manifest['backend'] not in SHARD_BACKENDS:
+                raise RuntimeError('Unknown shard backend: {}'.format(manifest['backend']))
+            os.makedirs(locator_string, exist_ok=True)
+            with open(os.path.join(locator_string, MANIFEST), 'w') as f:
+                json.dump(manifest, f)
+        else:
+            if manifest.get('version') != LAYOUT_VERSION:
+                raise RuntimeError('Hypergraph {} was created with another layout of the shards.'.format(
+                    locator_string))
+            for name, value in (('shards', shards), ('backend', shard_backend)):
+                if value is not None and value != manifest[name]:
+                    raise RuntimeError('Hypergraph {} was created with {}={}.'.format(
+                        locator_string, name, manifest[name]))
+        self.shard_backend = manifest['backend']
+        if workers is None:
+            if self.shard_backend in THREAD_SAFE_BACKENDS:
+                workers = min(manifest['shards'] + 1, os.cpu_count() or 1)
+            else:
+                workers = 1
+        elif workers > 1 and self.shard_backend not in THREAD_SAFE_BACKENDS:
+            raise RuntimeError('Shards with backend {} cannot be read by worker threads.'.format(
+                self.shard_backend))
+
+        backend = SHARD_BACKENDS[self.shard_backend]
+        self.shards = [backend(os.path.join(locator_string, 'shard{}.{}'.format(i, self.shard_backend)))
+                       for i in range(manifest['shards'])]
+        self.atom_shard = backend(os.path.join(locator_string, 'atoms.{}'.format(self.shard_backend)))
+        # the edge shards, followed by the atom shard
+        self.all_shards = self.shards + [self.atom_shard]
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        # shards where a transaction was started by the current transaction
+        self.open_shards = set()
+        self.transaction_depth = 0
+        # edge shard of the permutations that are being written or removed
+        self.perm_shard = None
+        self._init_options()
+
+    # ===================================
+    # Implementation of interface methods
+    # ===================================
+
+    def close(self):
+        if self.shards is None:
+            return
+        self.flush()
+        self._end_shard_transactions()
+        self.transaction_depth = 0
+        # chunks may still be being read from queries that were not
+        # exhausted, which must be completed before the shards are closed
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for shard in self.all_shards:
+            shard.close()
+        self.shards = None
+        self.atom_shard = None
+        self.all_shards = None
+
+    def destroy(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = ThreadPoolExecutor(self.workers)
+        for shard in self.all_shards:
+            shard.destroy()
+        self._reset_options()
+
+    def all(self):
+        return self._gather([shard.all() for shard in self.all_shards], _edge_key)
+
+    def all_attributes(self):
+        self.flush()
+        return self._gather([shard.all_attributes() for shard in self.all_shards], _edge_item_key)
+
+    def begin_transaction(self):
+        if self.batch_mode:
+            return
+        self.transaction_depth += 1
+
+    def end_transaction(self):
+        if self.batch_mode:
+            return
+        self.transaction_depth -= 1
+        if self.transaction_depth <= 0:
+            self.transaction_depth = 0
+            self._end_shard_transactions()
+
+    def remove_by_pattern(self, pattern, strict=False):
+        # the results are collected first, because with worker threads the
+        # shards cannot be modified while they are being read
+        for edge in list(self.search(pattern, strict=strict)):
+            self.remove(edge)
+
+    # ==========================================
+    # Implementation of private abstract methods
+    # ==========================================
+
+    def _edge2key(self, edge):
+        return edge.to_str()
+
+    def _str2key(self, edge_str):
+        return edge_str
+
+    def _exists_key(self, key):
+        """Checks if the given key exists."""
+        shard = self.all_shards[self._key_shard(key)]
+        return shard._exists_key(shard._str2key(key))
+
+    def _add_key(self, key, attributes):
+        """Adds the given edge, given its key."""
+        shard = self._write_shard(self._key_shard(key))
+        shard._add_key(shard._str2key(key), attributes)
+
+    def _attribute_key(self, key):
+        shard = self.all_shards[self._key_shard(key)]
+        return shard._attribute_key(shard._str2key(key))
+
+    def _write_edge_permutation(self, perm):
+        """Writes a given permutation."""
+        self._write_shard(self.perm_shard)._write_edge_permutation(perm)
+
+    def _remove_edge_permutation(self, perm):
+        """Removes a given permutation."""
+        self._write_shard(self.perm_shard)._remove_edge_permutation(perm)
+
+    def _remove_key(self, key):
+        """Removes an edge, given its key."""
+        shard = self._write_shard(self._key_shard(key))
+        shard._remove_key(shard._str2key(key))
+
+    def _permutations_with_prefix(self, prefix, start=None):
+        return self._gather([shard._permutations_with_prefix(prefix, start) for shard in self.shards])
+
+    def _edges_with_prefix(self, prefix):
+        if len(prefix) == 0:
+            shards = self.all_shards
+        elif prefix[0] == '(':
+            shards = self.shards
+        else:
+            shards = [self.atom_shard]
+        return self._gather([shard._edges_with_prefix(prefix) for shard in shards], _edge_key)
+
+    def _aux_value(self, key):
+        return self.atom_shard._aux_value(''.join((AUX_PREFIX, key)))
+
+    def _write_aux(self, key, value):
+        self._write_shard(len(self.shards))._write_aux(''.join((AUX_PREFIX, key)), value)
+
+    def _remove_aux(self, key):
+        self._write_shard(len(self.shards))._remove_aux(''.join((AUX_PREFIX, key)))
+
+    def _aux_with_prefix(self, prefix, start=None):
+        shard_prefix = ''.join((AUX_PREFIX, prefix))
+        shard_start = None if start is None else ''.join((AUX_PREFIX, start))
+        for key, value in self.atom_shard._aux_with_prefix(shard_prefix, shard_start):
+            yield key[len(AUX_PREFIX):], value
+
+    # ==========================================
+    # Routing of the permutations of KeyValue
+    # ==========================================
+
+    def _write_permutations(self, child_strs, new=True):
+        # the permutations of an edge are stored in the shard of the edge
+        self.perm_shard = shard_index(''.join(('(', ' '.join(child_strs), ')')), len(self.shards))
+        super()._write_permutations(child_strs, new)
+
+    def _remove_edge_permutations(self, edge):
+        self.perm_shard = shard_index(edge.to_str(), len(self.shards))
+        super()._remove_edge_permutations(edge)
+
+    # =====================
+    # Local private methods
+    # =====================
+
+    def _key_shard(self, key):
+        """Returns the index in all_shards of the shard where an edge is stored, given its key."""
+        if key[0] == '(':
+            return shard_index(key, len(self.shards))
+        return len(self.shards)
+
+    def _write_shard(self, i):
+        """Returns the shard with the given index in all_shards, starting a
+        transaction on it if needed. Shard transactions are started only
+        when they are first written to, and all end with the outermost
+        transaction."""
+        shard = self.all_shards[i]
+        if i not in self.open_shards:
+            shard.begin_transaction()
+            self.open_shards.add(i)
+        return shard
+
+    def _end_shard_transactions(self):
+        # the atom shard is committed first (see the top of this module)
+        for i in sorted(self.open_shards, key=lambda i: (i != len(self.shards), i)):
+            self.all_shards[i].end_transaction()
+        self.open_shards = set()
+
+    def _gather(self, iterators, key=None):
+        """Merges the sorted iterators from the shards. With worker threads,
+        all the shards start being read at once."""
+        if self.executor is not None and len(iterators) > 1:
+            iterators = [_prefetch(self.executor, iterator) for iterator in iterators]
+        return heapq.merge(*iterators, key=key)
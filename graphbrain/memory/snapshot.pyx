@@ -0,0 +1,453 @@
+# Immutable hypergraph snapshots: single files that are memory-mapped, so
+# that several processes can serve queries from the same file while sharing
+# the operating system's page cache. Only the file is shared: the edges
+# found by queries are decoded from it into new Hyperedge objects, as with
+# the other backends.
+#
+# A snapshot file contains:
+#
+# - a header: the magic string, followed by the size of a JSON object with
+# the storage options of the hypergraph and the offsets of the sections;
+# - the edge table: the strings of all the edges (and of the elements of
+# edges that were not stored themselves) in sorted order. The position of an
+# edge in this table is its id;
+# - the existence flags of the edges in the edge table, one byte per edge;
+# - the attribute columns: one 64 bit integer per edge for each one of the
+# attributes in INT_COLUMNS;
+# - the extra attributes: the JSON encoding of the remaining attributes of
+# each edge, or an empty string;
+# - the permutation table: the sorted permutations of all the edges, in the
+# 'ids' encoding (see graphbrain.memory.ids), using the edge table ids.
+#
+# String tables are written as the number of strings, followed by n + 1
+# offsets and by the UTF-8 encoded strings. All integers are little-endian,
+# and all sections start at multiples of 8 bytes.
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.ids import decode_id, encode_id
+from graphbrain.memory.auxiliary import EDGE_ID_PREFIX, ID_EDGE_PREFIX, META_PREFIX, NEXT_ID_KEY
+from graphbrain.memory.keyvalue import KeyValue, OPTIONS
+from graphbrain.memory.permutations import permutate, permutation_numbers
+
+
+MAGIC = b'GBSNAP\x00\x01'
+
+# attributes that are stored in fixed-width columns
+INT_COLUMNS = ('p', 'd', 'dd')
+
+# value of an integer column for edges that do not have the attribute
+MISSING = -2 ** 63
+
+# maximum number of permutations sorted in memory while a snapshot is
+# written, before they are written to a temporary file to be merged
+RUN_SIZE = 1000000
+
+_UINT64 = struct.Struct('<Q')
+_INT64 = struct.Struct('<q')
+
+
+def _is_int(value):
+    if type(value) is int:
+        return True
+    if type(value) is str:
+        return value.lstrip('-').isdigit()
+    return False
+
+
+def _align(f):
+    padding = -f.tell() % 8
+    if padding:
+        f.write(b'\x00' * padding)
+    return f.tell()
+
+
+def _write_string_table(f, strings):
+    """Writes a sequence of strings (with a length) as a string table and
+    returns its offset."""
+    offset = _align(f)
+    f.write(_UINT64.pack(len(strings)))
+    position = 0
+    f.write(_UINT64.pack(position))
+    for item in strings:
+        position += len(item.encode('utf-8'))
+        f.write(_UINT64.pack(position))
+    for item in strings:
+        f.write(item.encode('utf-8'))
+    return offset
+
+
+def _write_run(path, items):
+    """Writes a sorted run of byte strings to a temporary file."""
+    with open(path, 'wb') as f:
+        for item in items:
+            f.write(_UINT64.pack(len(item)))
+            f.write(item)
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            size = f.read(8)
+            if len(size) == 0:
+                return
+            yield f.read(_UINT64.unpack(size)[0])
+
+
+def _write_merged_table(f, runs, n, tmpdir):
+    """Writes the n byte strings of sorted runs (in temporary files) as one
+    sorted string table and returns its offset. The strings are merged once:
+    the offsets are written directly, and the data goes through another
+    temporary file."""
+    offset = _align(f)
+    f.write(_UINT64.pack(n))
+    position = 0
+    f.write(_UINT64.pack(position))
+    data_path = os.path.join(tmpdir, 'data')
+    with open(data_path, 'wb') as data:
+        for item in heapq.merge(*[_read_run(path) for path in runs]):
+            position += len(item)
+            f.write(_UINT64.pack(position))
+            data.write(item)
+    with open(data_path, 'rb') as data:
+        shutil.copyfileobj(data, f)
+    return offset
+
+
+def _write_column(f, values, fmt):
+    offset = _align(f)
+    f.write(struct.pack('<{}{}'.format(len(values), fmt), *values))
+    return offset
+
+
+def write_snapshot(hg, locator_string, run_size=RUN_SIZE):
+    """Writes an immutable snapshot of the hypergraph hg to the file
+    locator_string, which can then be opened with hgraph().
+
+    The edges are read twice, first to assign their ids and then to write
+    their attributes and permutations. The edge strings are kept in memory,
+    while the permutations are sorted in runs of run_size, which are stored
+    in temporary files next to the snapshot and then merged. Returns the
+    number of edges in the snapshot.
+    """
+    options = dict(OPTIONS)
+    if isinstance(hg, KeyValue):
+        options['index_positions'] = hg.options['index_positions']
+    # snapshots always use the ids encoding
+    options['encoding'] = 'ids'
+    index_positions = None if options['index_positions'] == 'full' else options['index_positions']
+
+    edge_strs = set()
+    for edge in hg.all():
+        edge_strs.add(edge.to_str())
+        if edge.not_atom:
+            edge_strs.update(child.to_str() for child in edge)
+    edge_strs = sorted(edge_strs)
+    ids = {edge_str: i for i, edge_str in enumerate(edge_strs)}
+
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(locator_string)))
+    try:
+        exists = bytearray(len(edge_strs))
+        columns = {name: [MISSING] * len(edge_strs) for name in INT_COLUMNS}
+        extras = [''] * len(edge_strs)
+        n_edges = 0
+        runs = []
+        n_perms = 0
+        perms = []
+
+        def write_run():
+            perms.sort()
+            runs.append(os.path.join(tmpdir, 'run{}'.format(len(runs))))
+            _write_run(runs[-1], perms)
+            perms.clear()
+
+        for edge, edge_attributes in hg.all_attributes():
+            i = ids[edge.to_str()]
+            exists[i] = 1
+            n_edges += 1
+            extra = {}
+            for name, value in edge_attributes.items():
+                if name in columns and _is_int(value):
+                    columns[name][i] = int(value)
+                else:
+                    extra[name] = value
+            if len(extra) > 0:
+                extras[i] = json.dumps(extra, ensure_ascii=False)
+            if edge.not_atom:
+                child_ids = [encode_id(ids[child.to_str()]) for child in edge]
+                for nperm in permutation_numbers(len(child_ids), index_positions):
+                    perms.append(''.join((''.join(permutate(child_ids, nperm)), encode_id(nperm))).encode('ascii'))
+                    n_perms += 1
+                if len(perms) >= run_size:
+                    write_run()
+        if len(perms) > 0:
+            write_run()
+
+        header = {'options': options, 'edges': len(edge_strs)}
+        with open(locator_string, 'wb') as f:
+            # the header is written twice, the first time to reserve its space
+            f.write(b'\x00' * 4096)
+            header['edge_table'] = _write_string_table(f, edge_strs)
+            header['exists'] = _align(f)
+            f.write(bytes(exists))
+            for name in INT_COLUMNS:
+                header['column_{}'.format(name)] = _write_column(f, columns[name], 'q')
+            header['extras'] = _write_string_table(f, extras)
+            header['permutations'] = _write_merged_table(f, runs, n_perms, tmpdir)
+            header_data = json.dumps(header).encode('utf-8')
+            if len(MAGIC) + 8 + len(header_data) > 4096:
+                raise RuntimeError('Snapshot header too large.')
+            f.seek(0)
+            f.write(MAGIC)
+            f.write(_UINT64.pack(len(header_data)))
+            f.write(header_data)
+    finally:
+        shutil.rmtree(tmpdir)
+    return n_edges
+
+
+class _StringTable(object):
+    """Read-only sequence of the strings in a string table of a snapshot,
+    as UTF-8 encoded bytes."""
+
+    def __init__(self, buf, offset):
+        self.buf = buf
+        self.n = _UINT64.unpack_from(buf, offset)[0]
+        self.offsets = offset + 8
+        self.data = self.offsets + 8 * (self.n + 1)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        start = _UINT64.unpack_from(self.buf, self.offsets + 8 * i)[0]
+        end = _UINT64.unpack_from(self.buf, self.offsets + 8 * (i + 1))[0]
+        return self.buf[self.data + start:self.data + end]
+
+    def bisect(self, value):
+        """Returns the position of the first string that is not smaller than
+        value."""
+        lo = 0
+        hi = self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def index(self, value):
+        """Returns the position of value, or -1 if it is not in the
+        table."""
+        i = self.bisect(value)
+        if i < self.n and self[i] == value:
+            return i
+        return -1
+
+    def with_prefix(self, prefix, start=None):
+        """Returns a generator of (position, string) tuples of the strings
+        that start with prefix, beginning with the first one not smaller than
+        start if it is given."""
+        i = self.bisect(prefix if start is None else max(prefix, start))
+        while i < self.n:
+            value = self[i]
+            if not value.startswith(prefix):
+                return
+            yield i, value
+            i += 1
+
+
+class Snapshot(KeyValue):
+    """Implements read-only hypergraph storage on immutable snapshot files
+    created by write_snapshot().
+
+    The file is memory-mapped, so that multiple processes opening the same
+    snapshot share its pages. Permutations are stored in the 'ids' encoding,
+    and the degrees and primary flags are read directly from fixed-width
+    columns. All the methods that modify the hypergraph raise RuntimeError.
+
+    Keyword arguments are passed to KeyValue.
+    """
+
+    def __init__(self, locator_string, **kwargs):
+        super().__init__(locator_string, **kwargs)
+        self.file = open(locator_string, 'rb')
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buf[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise RuntimeError('{} is not a hypergraph snapshot.'.format(locator_string))
+        header_size = _UINT64.unpack_from(self.buf, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        self.header = json.loads(self.buf[start:start + header_size].decode('utf-8'))
+        self.n = self.header['edges']
+        self.edge_table = _StringTable(self.buf, self.header['edge_table'])
+        self.exists_offset = self.header['exists']
+        self.columns = {name: self.header['column_{}'.format(name)] for name in INT_COLUMNS}
+        self.extras = _StringTable(self.buf, self.header['extras'])
+        self.perm_table = _StringTable(self.buf, self.header['permutations'])
+        self._init_options()
+
+    # ===================================
+    # Implementation of interface methods
+    # ===================================
+
+    def close(self):
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+            self.file.close()
+
+    def destroy(self):
+        _read_only()
+
+    def all(self):
+        for i in range(self.n):
+            if self.buf[self.exists_offset + i]:
+                yield hedge(self.edge_table[i].decode('utf-8'))
+
+    def all_attributes(self):
+        for i in range(self.n):
+            if self.buf[self.exists_offset + i]:
+                yield hedge(self.edge_table[i].decode('utf-8')), self._attributes_at(i)
+
+    def add_with_attributes(self, edge, attributes):
+        _read_only()
+
+    def add_many_with_attributes(self, edges_attributes):
+        _read_only()
+
+    # ==========================================
+    # Implementation of private abstract methods
+    # ==========================================
+
+    def _edge2key(self, edge):
+        return edge.to_str()
+
+    def _exists_key(self, key):
+        """Checks if the given key exists."""
+        return self._position(key) >= 0
+
+    def _add_key(self, key, attributes):
+        _read_only()
+
+    def _attribute_key(self, key):
+        i = self._position(key)
+        if i < 0:
+            return None
+        return self._attributes_at(i)
+
+    def _write_edge_permutation(self, perm):
+        _read_only()
+
+    def _remove_edge_permutation(self, perm):
+        _read_only()
+
+    def _remove_key(self, key):
+        _read_only()
+
+    def _permutations_with_prefix(self, prefix, start=None):
+        start = None if start is None else start.encode('utf-8')
+        for _, perm in self.perm_table.with_prefix(prefix.encode('utf-8'), start):
+            yield perm.decode('utf-8')
+
+    def _edges_with_prefix(self, prefix):
+        for i, edge_str in self.edge_table.with_prefix(prefix.encode('utf-8')):
+            if self.buf[self.exists_offset + i]:
+                yield hedge(edge_str.decode('utf-8'))
+
+    def _aux_value(self, key):
+        if key.startswith(EDGE_ID_PREFIX):
+            i = self.edge_table.index(key[len(EDGE_ID_PREFIX):].encode('utf-8'))
+            return encode_id(i) if i >= 0 else None
+        elif key.startswith(ID_EDGE_PREFIX):
+            i = decode_id(key[len(ID_EDGE_PREFIX):])
+            return self.edge_table[i].decode('utf-8') if i < self.n else None
+        elif key == NEXT_ID_KEY:
+            return str(self.n)
+        elif key.startswith(META_PREFIX):
+            name = key[len(META_PREFIX):]
+            if name in self.header['options']:
+                return json.dumps(self.header['options'][name])
+        return None
+
+    def _write_aux(self, key, value):
+        _read_only()
+
+    def _remove_aux(self, key):
+        _read_only()
+
+    def _init_statistics(self):
+        # snapshots do not store cardinality statistics
+        self.has_statistics = False
+
+    def _init_sequence_index(self):
+        # nor the sequence index
+        self.has_sequence_index = False
+
+    def _init_lemma_index(self):
+        # nor the lemma index
+        self.has_lemma_index = False
+
+    def _init_relation_index(self):
+        # nor the relation index
+        self.has_relation_index = False
+
+    def _init_type_index(self):
+        # nor the type index
+        self.has_type_index = False
+
+    def _aux_with_prefix(self, prefix, start=None):
+        # only the edge to id dictionary is searched by prefix
+        if prefix.startswith(EDGE_ID_PREFIX):
+            if start is not None:
+                start = start[len(EDGE_ID_PREFIX):].encode('utf-8') if start.startswith(EDGE_ID_PREFIX) else None
+            for i, edge_str in self.edge_table.with_prefix(prefix[len(EDGE_ID_PREFIX):].encode('utf-8'), start):
+                yield ''.join((EDGE_ID_PREFIX, edge_str.decode('utf-8'))), encode_id(i)
+
+    # ===============================================
+    # Faster implementations of KeyValue's attributes
+    # ===============================================
+
+    def _get_int_attribute_key(self, key, attribute, or_else=None):
+        if attribute in self.columns:
+            i = self._position(key)
+            if i < 0:
+                return or_else
+            value = _INT64.unpack_from(self.buf, self.columns[attribute] + 8 * i)[0]
+            if value != MISSING:
+                return value
+        return super()._get_int_attribute_key(key, attribute, or_else)
+
+    # =====================
+    # Local private methods
+    # =====================
+
+    def _position(self, key):
+        """Returns the position of an existing edge in the edge table, given
+        its key, or -1."""
+        i = self.edge_table.index(key.encode('utf-8'))
+        if i >= 0 and self.buf[self.exists_offset + i]:
+            return i
+        return -1
+
+    def _attributes_at(self, i):
+        """Returns the attributes of the edge at position i of the edge
+        table."""
+        extra = self.extras[i]
+        attributes = json.loads(extra.decode('utf-8')) if len(extra) > 0 else {}
+        for name, offset in self.columns.items():
+            value = _INT64.unpack_from(self.buf, offset + 8 * i)[0]
+            if value != MISSING:
+                attributes[name] = value
+        return attributes
+
+
+def _read_only():
+    raise RuntimeError('Snapshot hypergraphs are read-only.')
@@ -1,12 +1,65 @@
 import json
+import threading
+from queue import Empty, Queue
 
 from sqlite3 import connect
+from urllib.request import pathname2url
 
 from graphbrain.hyperedge import hedge
 from graphbrain.memory.keyvalue import KeyValue
 from graphbrain.memory.permutations import str_plus_1
 
 
+# version of the database schema, stored as the SQLite user_version
+# 0 -- original schema with rowid tables
+# 2 -- WITHOUT ROWID tables
+# 3 -- table x for auxiliary keys
+SCHEMA_VERSION = 3
+
+# performance profiles, as PRAGMA statements to execute when opening
+# the database
+PROFILES = {
+    # SQLite defaults
+    'default': (),
+    # durable writes, readers do not block the writer
+    'safe': ('PRAGMA journal_mode = WAL',
+             'PRAGMA synchronous = FULL',
+             'PRAGMA cache_size = -65536',
+             'PRAGMA mmap_size = 268435456'),
+    # fast ingestion, at the risk of losing the most recent writes
+    # in case of power failure or OS crash
+    'bulk': ('PRAGMA journal_mode = WAL',
+             'PRAGMA synchronous = OFF',
+             'PRAGMA cache_size = -1048576',
+             'PRAGMA mmap_size = 1073741824',
+             'PRAGMA temp_store = MEMORY'),
+    # query serving, the database is opened in read-only mode
+    'readonly': ('PRAGMA query_only = ON',
+                 'PRAGMA cache_size = -262144',
+                 'PRAGMA mmap_size = 1073741824'),
+}
+
+# maximum number of prepared statements cached by each connection
+CACHED_STATEMENTS = 256
+
+# PRAGMA statements executed by the connections of the reader pool
+READER_PRAGMAS = PROFILES['readonly']
+
+SQL_SELECT_ALL = 'SELECT key, value FROM v'
+SQL_EXISTS = 'SELECT 1 FROM v WHERE key = ?'
+SQL_ATTRIBUTES = 'SELECT value FROM v WHERE key = ?'
+SQL_ADD_KEY = 'INSERT OR REPLACE INTO v (key, value) VALUES(?, ?)'
+SQL_REMOVE_KEY = 'DELETE FROM v WHERE key = ?'
+SQL_EDGES_WITH_PREFIX = 'SELECT key FROM v WHERE key >= ? AND key < ?'
+SQL_WRITE_PERM = 'INSERT OR IGNORE INTO p (key) VALUES(?)'
+SQL_REMOVE_PERM = 'DELETE FROM p WHERE key = ?'
+SQL_PERMS_WITH_PREFIX = 'SELECT key FROM p WHERE key >= ? AND key < ?'
+SQL_AUX_VALUE = 'SELECT value FROM x WHERE key = ?'
+SQL_WRITE_AUX = 'INSERT OR REPLACE INTO x (key, value) VALUES(?, ?)'
+SQL_REMOVE_AUX = 'DELETE FROM x WHERE key = ?'
+SQL_AUX_WITH_PREFIX = 'SELECT key, value FROM x WHERE key >= ? AND key < ?'
+
+
 def _encode_attributes(attributes):
     return json.dumps(attributes, ensure_ascii=False, check_circular=False, separators=(',', ':'))
 
@@ -15,20 +68,91 @@ def _decode_attributes(value):
     return json.loads(value)
 
 
+def _create_tables(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS v (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+    conn.execute('CREATE TABLE IF NOT EXISTS p (key TEXT PRIMARY KEY) WITHOUT ROWID')
+    conn.execute('CREATE TABLE IF NOT EXISTS x (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+
+
+def _migrate(conn):
+    """Converts the tables of a database with the original schema (rowid
+    tables) to WITHOUT ROWID tables."""
+    conn.execute('BEGIN TRANSACTION')
+    conn.execute('CREATE TABLE v_new (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+    conn.execute('CREATE TABLE p_new (key TEXT PRIMARY KEY) WITHOUT ROWID')
+    conn.execute('INSERT INTO v_new (key, value) SELECT key, value FROM v')
+    conn.execute('INSERT INTO p_new (key) SELECT key FROM p')
+    conn.execute('DROP TABLE v')
+    conn.execute('DROP TABLE p')
+    conn.execute('ALTER TABLE v_new RENAME TO v')
+    conn.execute('ALTER TABLE p_new RENAME TO p')
+    conn.execute('COMMIT')
+
+
 class SQLite(KeyValue):
-    """Implements SQLite hypergraph storage."""
+    """Implements SQLite hypergraph storage.
 
-    def __init__(self, locator_string):
-        super().__init__(locator_string)
+    Keyword arguments:
+    profile -- performance profile, one of 'default', 'safe', 'bulk' or
+    'readonly'. See PROFILES. (default 'default')
+    readers -- maximum number of read-only connections used by threads other
+    than the one that opened the hypergraph, 0 to disable the reader pool.
+    With a reader pool the database is put in WAL mode, so that readers do
+    not block the writer, and other threads can query the hypergraph while
+    the opening thread writes to it. Only the opening thread can write.
+    (default 0)
 
-        self.conn = connect(self.locator_string, isolation_level=None)
+    Further keyword arguments are passed to KeyValue.
+
+    Databases created with older schemas are automatically migrated to the
+    current one when opened in a mode that allows writing.
+    """
+
+    def __init__(self, locator_string, profile='default', readers=0, **kwargs):
+        super().__init__(locator_string, **kwargs)
+
+        if profile not in PROFILES:
+            raise RuntimeError('Unknown SQLite profile: {}'.format(profile))
+        self.profile = profile
+        if readers > 0 and locator_string == ':memory:':
+            raise RuntimeError('A reader pool requires an SQLite database file.')
+        self.readers = readers
+
+        if profile == 'readonly':
+            uri = 'file:{}?mode=ro'.format(pathname2url(self.locator_string))
+            self.conn = connect(uri, uri=True, isolation_level=None, cached_statements=CACHED_STATEMENTS)
+        else:
+            self.conn = connect(self.locator_string, isolation_level=None, cached_statements=CACHED_STATEMENTS)
         self.cur = None
 
-        # self.conn.execute('PRAGMA synchronous = OFF')
-        # self.conn.execute('PRAGMA journal_mode = MEMORY')
+        for pragma in PROFILES[profile]:
+            self.conn.execute(pragma)
+        if readers > 0 and profile != 'readonly':
+            self.conn.execute('PRAGMA journal_mode = WAL')
+
+        # reader pool: idle connections, number of connections opened and
+        # state of the current thread (connection in use and number of uses)
+        self.pool = Queue() if readers > 0 else None
+        self.pool_connections = 0
+        self.pool_lock = threading.Lock()
+        self.local = threading.local()
+        self.writer_thread = threading.get_ident()
 
-        self.conn.execute('CREATE TABLE IF NOT EXISTS v (key TEXT PRIMARY KEY, value TEXT)')
-        self.conn.execute('CREATE TABLE IF NOT EXISTS p (key TEXT PRIMARY KEY)')
+        if profile == 'readonly':
+            tables = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'x'")
+            self.has_aux = tables.fetchone() is not None
+        else:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                if version == 0:
+                    tables = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'v'")
+                    if tables.fetchone():
+                        _migrate(self.conn)
+                _create_tables(self.conn)
+                self.conn.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+            self.has_aux = True
+
+        self._init_options()
 
     # ===================================
     # Implementation of interface methods
@@ -36,24 +160,32 @@ class SQLite(KeyValue):
 
     def close(self):
         if self.conn:
+            self.flush()
             self.conn.close()
             self.conn = None
+        if self.pool is not None:
+            while True:
+                try:
+                    self.pool.get_nowait().close()
+                except Empty:
+                    break
 
     def destroy(self):
         cur = self.conn.cursor()
         cur.execute('DELETE FROM v')
         cur.execute('DELETE FROM p')
+        cur.execute('DELETE FROM x')
+        self._reset_options()
 
     def all(self):
-        cur = self.conn.cursor()
-        for key, _ in cur.execute('SELECT * FROM v'):
+        for key, _ in self._read_rows(SQL_SELECT_ALL):
             edge = hedge(key)
             if edge is not None:
                 yield edge
 
     def all_attributes(self):
-        cur = self.conn.cursor()
-        for key, value in cur.execute('SELECT * FROM v'):
+        self.flush()
+        for key, value in self._read_rows(SQL_SELECT_ALL):
             edge = hedge(key)
             if edge is not None:
                 attributes = _decode_attributes(value)
@@ -78,44 +210,148 @@ class SQLite(KeyValue):
     def _edge2key(self, edge):
         return edge.to_str()
 
+    def _str2key(self, edge_str):
+        return edge_str
+
     def _exists_key(self, key):
         """Checks if the given key exists."""
-        cur = self.conn.cursor()
-        for key, _ in cur.execute('SELECT * FROM v WHERE key = ?', (key, )):
-            return True
-        return False
+        return self._read_row(SQL_EXISTS, (key,)) is not None
 
     def _add_key(self, key, attributes):
         """Adds the given edge, given its key."""
         value = _encode_attributes(attributes)
-        self.cur.execute('INSERT OR REPLACE INTO v (key, value) VALUES(?, ?)', (key, value))
+        self.cur.execute(SQL_ADD_KEY, (key, value))
 
     def _attribute_key(self, key):
-        cur = self.conn.cursor()
-        for key, value in cur.execute('SELECT * FROM v WHERE key = ?', (key,)):
-            return _decode_attributes(value)
-        return None
+        row = self._read_row(SQL_ATTRIBUTES, (key,))
+        if row is None:
+            return None
+        return _decode_attributes(row[0])
 
     def _write_edge_permutation(self, perm):
         """Writes a given permutation."""
-        self.cur.execute('INSERT OR IGNORE INTO p (key) VALUES(?)', (perm,))
+        self.cur.execute(SQL_WRITE_PERM, (perm,))
 
     def _remove_edge_permutation(self, perm):
         """Removes a given permutation."""
-        self.cur.execute('DELETE FROM p WHERE key = ?', (perm,))
+        self.cur.execute(SQL_REMOVE_PERM, (perm,))
 
     def _remove_key(self, key):
         """Removes an edge, given its key."""
-        self.cur.execute('DELETE FROM v WHERE key = ?', (key,))
+        self.cur.execute(SQL_REMOVE_KEY, (key,))
 
-    def _permutations_with_prefix(self, prefix):
+    def _permutations_with_prefix(self, prefix, start=None):
         end_str = str_plus_1(prefix)
-        cur = self.conn.cursor()
-        for row in cur.execute('SELECT * FROM p WHERE key >= ? AND key < ?', (prefix, end_str)):
+        for row in self._read_rows(SQL_PERMS_WITH_PREFIX, (max(prefix, start or prefix), end_str)):
             yield row[0]
 
     def _edges_with_prefix(self, prefix):
         end_str = str_plus_1(prefix)
-        cur = self.conn.cursor()
-        for key, _ in cur.execute('SELECT * FROM v WHERE key >= ? AND key < ?', (prefix, end_str)):
-            yield hedge(key)
+        for row in self._read_rows(SQL_EDGES_WITH_PREFIX, (prefix, end_str)):
+            yield hedge(row[0])
+
+    def _aux_value(self, key):
+        if not self.has_aux:
+            return None
+        row = self._read_row(SQL_AUX_VALUE, (key,))
+        if row is None:
+            return None
+        return row[0]
+
+    def _write_aux(self, key, value):
+        self.cur.execute(SQL_WRITE_AUX, (key, value))
+
+    def _remove_aux(self, key):
+        self.cur.execute(SQL_REMOVE_AUX, (key,))
+
+    def _aux_with_prefix(self, prefix, start=None):
+        if not self.has_aux:
+            return
+        end_str = str_plus_1(prefix)
+        for key, value in self._read_rows(SQL_AUX_WITH_PREFIX, (max(prefix, start or prefix), end_str)):
+            yield key, value
+
+    # =====================
+    # Local private methods
+    # =====================
+
+    def _checkout(self):
+        """Returns a connection for reading in the current thread, and the
+        reader state of the thread (or None for the writer connection).
+
+        The thread that opened the hypergraph always reads from the writer
+        connection, so that it sees its own uncommitted writes. Other threads
+        take a connection from the reader pool, which is kept until all the
+        reads of the thread end, so that nested reads do not exhaust the
+        pool. If all the connections are in use, the thread waits for one to
+        be returned."""
+        if self.pool is None or threading.get_ident() == self.writer_thread:
+            return self.conn, None
+        state = getattr(self.local, 'state', None)
+        if state is None:
+            state = [None, 0]
+            self.local.state = state
+        # a generator may be finished by another thread, so the state is
+        # only modified while holding the lock
+        with self.pool_lock:
+            if state[1] > 0:
+                state[1] += 1
+                return state[0], state
+        try:
+            conn = self.pool.get_nowait()
+        except Empty:
+            conn = self._open_reader()
+        with self.pool_lock:
+            state[0] = conn
+            state[1] = 1
+        return conn, state
+
+    def _checkin(self, state):
+        """Ends a read started with _checkout()."""
+        if state is None:
+            return
+        with self.pool_lock:
+            state[1] -= 1
+            if state[1] > 0:
+                return
+            conn = state[0]
+            state[0] = None
+        self.pool.put(conn)
+
+    def _open_reader(self):
+        """Opens a new read-only connection if the pool is not full, or
+        waits for a connection to be returned to it."""
+        with self.pool_lock:
+            if self.pool_connections >= self.readers:
+                conn = None
+            else:
+                self.pool_connections += 1
+                uri = 'file:{}?mode=ro'.format(pathname2url(self.locator_string))
+                conn = connect(uri, uri=True, isolation_level=None, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+                for pragma in READER_PRAGMAS:
+                    conn.execute(pragma)
+        if conn is None:
+            conn = self.pool.get()
+        return conn
+
+    def _read_row(self, sql, params):
+        """Returns the first row of the results of a query."""
+        if self.pool is None:
+            return self.conn.execute(sql, params).fetchone()
+        conn, state = self._checkout()
+        try:
+            return conn.execute(sql, params).fetchone()
+        finally:
+            self._checkin(state)
+
+    def _read_rows(self, sql, params=()):
+        """Returns a generator of the rows of the results of a query. With
+        a reader pool, the connection is used until the generator is
+        exhausted or closed."""
+        conn, state = self._checkout()
+        try:
+            for row in conn.cursor().execute(sql, params):
+                yield row
+        finally:
+            self._checkin(state)
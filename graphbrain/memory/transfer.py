@@ -0,0 +1,205 @@
+"""Export and import of hypergraphs as streams of JSON lines.
+
+Each line contains a JSON array with the string representation of an edge
+and a dictionary with its attributes. Files with the extension '.gz' are
+compressed with gzip and files with the extension '.zst' with Zstandard
+(which requires the zstandard package). Other files are not compressed.
+
+Lines are processed in chunks. With more than one worker, chunks are encoded
+and compressed (on export) or decoded and parsed (on import) by a pool of
+processes, while the main process reads from or writes to the hypergraph.
+Compressed files are written as one gzip member or Zstandard frame per chunk,
+which are valid files when concatenated.
+"""
+import gzip
+import io
+import json
+from collections import deque
+from multiprocessing import Pool
+
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.keyvalue import KeyValue, prepare_edge
+
+
+# number of lines per chunk
+CHUNK_SIZE = 10000
+
+
+def _compression(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    elif path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError('The zstandard package is required to read or write .zst files.')
+    return zstandard
+
+
+def _compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    elif compression == 'zstd':
+        return _zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def _encode_chunk(args):
+    """Returns the number of rows and the encoded chunk."""
+    rows, compression = args
+    lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+    lines.append('')
+    return len(rows), _compress('\n'.join(lines).encode('utf-8'), compression)
+
+
+def _decode_chunk(args):
+    """Returns the rows prepared from a chunk of lines (or None and an error
+    message if a line is not valid), and the offset of the end of the
+    chunk."""
+    lines, offset = args
+    rows = []
+    for line in lines:
+        if len(line.strip()) > 0:
+            try:
+                edge_str, attributes = json.loads(line)
+                # atoms cannot contain parenthesis, so these must be balanced
+                edge = hedge(edge_str) if edge_str.count('(') == edge_str.count(')') else None
+            except (AttributeError, TypeError, ValueError):
+                edge = None
+            if edge is None or type(attributes) is not dict:
+                line_str = line.decode('utf-8', errors='replace').strip()
+                return None, 'Invalid line at offset {}: {}'.format(offset, line_str[:100]), offset
+            rows.append(prepare_edge(edge, attributes))
+        offset += len(line)
+    return rows, None, offset
+
+
+def _imap(function, chunks, workers):
+    """Applies the function to each chunk, in a pool of processes if there
+    is more than one worker, and yields the results in order. Chunks are read
+    by the calling thread (hypergraph connections cannot be shared between
+    threads), and at most two chunks per worker are pending at a time."""
+    if workers <= 1:
+        yield from map(function, chunks)
+        return
+    with Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(function, (chunk,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while len(pending) > 0:
+            yield pending.popleft().get()
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _open_lines(path, offset):
+    """Opens the file path for reading, positioned at the given offset of
+    the uncompressed data. Returns the underlying file, to track the progress
+    of the reading, and a binary stream of the uncompressed data."""
+    f = open(path, 'rb')
+    compression = _compression(path)
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=f)
+    elif compression == 'zstd':
+        reader = _zstandard().ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        stream = io.BufferedReader(reader)
+    else:
+        stream = f
+    # decompression streams can only move forward by reading the data
+    remaining = offset
+    if compression is None:
+        stream.seek(offset)
+        remaining = 0
+    while remaining > 0:
+        data = stream.read(min(remaining, 1 << 20))
+        if len(data) == 0:
+            break
+        remaining -= len(data)
+    return f, stream
+
+
+def export_hypergraph(hg, path, workers=1, progress=None):
+    """Writes all the edges of the hypergraph hg, with their attributes, to
+    the file path. Returns the number of edges written.
+
+    Keyword arguments:
+    workers -- number of processes that encode and compress the lines
+    (default: 1)
+    progress -- function called after each chunk is written, with the number
+    of edges and the number of bytes written so far (default: None)
+    """
+    compression = _compression(path)
+    if compression == 'zstd':
+        _zstandard()
+    rows = ((edge.to_str(), attributes) for edge, attributes in hg.all_attributes())
+    chunks = ((chunk, compression) for chunk in _chunks(rows, CHUNK_SIZE))
+    n = 0
+    with open(path, 'wb') as f:
+        for n_rows, data in _imap(_encode_chunk, chunks, workers):
+            f.write(data)
+            n += n_rows
+            if progress:
+                progress(n, f.tell())
+    return n
+
+
+def import_hypergraph(hg, path, workers=1, offset=0, progress=None):
+    """Adds the edges in the file path, with their attributes, to the
+    hypergraph hg. Each chunk of lines is added in one transaction. Returns
+    a tuple with the number of edges added and the offset of the end of the
+    uncompressed data.
+
+    Keyword arguments:
+    workers -- number of processes that decode and parse the lines
+    (default: 1)
+    offset -- offset of the uncompressed data where the import starts, to
+    resume an interrupted import (default: 0)
+    progress -- function called after each chunk is added, with the number
+    of edges added, the offset of the uncompressed data that was reached and
+    the number of bytes of the file that were read so far. An import that is
+    interrupted can be resumed from the last offset. (default: None)
+
+    Raises ValueError if a line is not valid. The edges of the preceding
+    chunks are kept.
+    """
+    f, stream = _open_lines(path, offset)
+
+    def chunks():
+        chunk_offset = offset
+        for lines in _chunks(stream, CHUNK_SIZE):
+            yield lines, chunk_offset
+            chunk_offset += sum(len(line) for line in lines)
+
+    n = 0
+    end_offset = offset
+    try:
+        for rows, error, end_offset in _imap(_decode_chunk, chunks(), workers):
+            if error:
+                raise ValueError(error)
+            if isinstance(hg, KeyValue):
+                hg.add_many_prepared(rows)
+            else:
+                hg.add_many_with_attributes((hedge(edge_str), attributes) for edge_str, _, attributes in rows)
+            n += len(rows)
+            if progress:
+                progress(n, end_offset, f.tell())
+    finally:
+        stream.close()
+        f.close()
+    return n, end_offset
@@ -0,0 +1,184 @@
+import graphbrain.constants as const
+from graphbrain.hyperedge import hedge
+from graphbrain.memory.auxiliary import BATCH_SIZE, TYPE_INDEX_KEY, TYPE_PREFIX, TYPE_SUBTYPES_PREFIX, _chunks
+
+
+def _type_of_pair(child_strs):
+    """Returns the edge and type strings of a (_type_of edge type) edge between different edges, or None."""
+    if len(child_strs) == 3 and child_strs[0] == const.type_of_connector and child_strs[1] != child_strs[2]:
+        return child_strs[1], child_strs[2]
+    return None
+
+
+def _type_keys(edge_str, type_str):
+    """Returns the keys of a supertype of an edge, from the edge to the type and back."""
+    # edges are balanced, so the prefix of an edge followed by a space is
+    # never the prefix of the keys of another one
+    return (''.join((TYPE_PREFIX, edge_str, ' ', type_str)),
+            ''.join((TYPE_SUBTYPES_PREFIX, type_str, ' ', edge_str)))
+
+
+def _type_closure(supertypes, edge_str):
+    """Returns the supertypes of an edge with their depths, given the direct supertypes of every edge."""
+    # supertypes: edge string -> set of type strings
+    types = {}
+    frontier = [edge_str]
+    depth = 1
+    while len(frontier) > 0:
+        next_frontier = []
+        for item in frontier:
+            for type_str in supertypes.get(item, ()):
+                if type_str not in types and type_str != edge_str:
+                    types[type_str] = depth
+                    next_frontier.append(type_str)
+        frontier = next_frontier
+        depth += 1
+    return types
+
+
+class TypeIndex(object):
+    """Index of the deep supertypes and subtypes of edges, with their depths. Mixin of KeyValue."""
+
+    def recompute_type_index(self):
+        self.flush()
+        self._remove_aux_with_prefixes((TYPE_PREFIX, TYPE_SUBTYPES_PREFIX))
+        # direct supertypes: edge string -> set of type strings
+        supertypes = {}
+        n = 0
+        for edge in self.search((const.type_of_connector, '*', '*'), strict=True):
+            pair = _type_of_pair([child.to_str() for child in edge])
+            if pair is not None:
+                supertypes.setdefault(pair[0], set()).add(pair[1])
+                n += 1
+        entries = ((edge_str, type_str, depth)
+                   for edge_str in supertypes
+                   for type_str, depth in _type_closure(supertypes, edge_str).items())
+        for chunk in _chunks(entries, BATCH_SIZE):
+            self.begin_transaction()
+            for edge_str, type_str, depth in chunk:
+                for key in _type_keys(edge_str, type_str):
+                    self._write_aux(key, str(depth))
+            self.end_transaction()
+        self.begin_transaction()
+        self._write_aux(TYPE_INDEX_KEY, '1')
+        self.end_transaction()
+        self.has_type_index = True
+        self.new_type_index = False
+        return n
+
+    def supertypes(self, edge, deep=False):
+        """Returns a dictionary with the supertypes of the edge and their depths. See Hypergraph.supertypes()."""
+        # deep supertypes are read with one prefix scan of the index
+        if not (deep and self.has_type_index):
+            return super().supertypes(edge, deep=deep)
+        return self._indexed_types(TYPE_PREFIX, hedge(edge).to_str())
+
+    def subtypes(self, edge, deep=False):
+        """Returns a dictionary with the subtypes of the edge and their depths. See Hypergraph.subtypes()."""
+        if not (deep and self.has_type_index):
+            return super().subtypes(edge, deep=deep)
+        return self._indexed_types(TYPE_SUBTYPES_PREFIX, hedge(edge).to_str())
+
+    def is_type_of(self, edge, type_edge):
+        """Checks if type_edge is a supertype of edge, directly or not. See Hypergraph.is_type_of()."""
+        if not self.has_type_index:
+            return super().is_type_of(edge, type_edge)
+        return self._aux_value(_type_keys(hedge(edge).to_str(), hedge(type_edge).to_str())[0]) is not None
+
+    def _init_type_index(self):
+        """Reads whether the index exists, or starts it if the hypergraph is empty."""
+        # older hypergraphs follow the type-of edges with searches until
+        # recompute_type_index() is called
+        self.has_type_index = self._aux_value(TYPE_INDEX_KEY) is not None
+        if not self.has_type_index and next(iter(self.all()), None) is None:
+            # the key is written with the first index entry
+            self.has_type_index = True
+            self.new_type_index = True
+
+    def _index_type(self, child_strs):
+        """Indexes a new edge, if it is a type-of edge. Must be called inside a transaction."""
+        if not self.has_type_index:
+            return
+        pair = _type_of_pair(child_strs)
+        if pair is None:
+            return
+        if self.new_type_index:
+            self._write_aux(TYPE_INDEX_KEY, '1')
+            self.new_type_index = False
+        # every subtype of the edge (or the edge itself) becomes a subtype of
+        # every supertype of the type (or the type itself), unless it already
+        # was at a lower depth
+        edge_str, type_str = pair
+        subtypes = self._indexed_type_strs(TYPE_SUBTYPES_PREFIX, edge_str)
+        subtypes[edge_str] = 0
+        supertypes = self._indexed_type_strs(TYPE_PREFIX, type_str)
+        supertypes[type_str] = 0
+        for sub_str, sub_depth in subtypes.items():
+            for sup_str, sup_depth in supertypes.items():
+                if sub_str != sup_str:
+                    depth = sub_depth + 1 + sup_depth
+                    keys = _type_keys(sub_str, sup_str)
+                    current = self._aux_value(keys[0])
+                    if current is None or int(current) > depth:
+                        for key in keys:
+                            self._write_aux(key, str(depth))
+
+    def _unindex_type(self, child_strs):
+        """Unindexes an edge that is removed, if it is a type-of edge. Must be called inside a transaction."""
+        if not self.has_type_index:
+            return
+        pair = _type_of_pair(child_strs)
+        if pair is None:
+            return
+        # only the supertypes of the edge and of its subtypes can change: they
+        # are removed and found again
+        edge_str = pair[0]
+        affected = set(self._indexed_type_strs(TYPE_SUBTYPES_PREFIX, edge_str))
+        affected.add(edge_str)
+        closures = {item: self._type_closure_without(item, affected, pair) for item in affected}
+        for item in affected:
+            for type_str in self._indexed_type_strs(TYPE_PREFIX, item):
+                for key in _type_keys(item, type_str):
+                    self._remove_aux(key)
+        for item, types in closures.items():
+            for type_str, depth in types.items():
+                for key in _type_keys(item, type_str):
+                    self._write_aux(key, str(depth))
+
+    def _type_closure_without(self, edge_str, affected, removed):
+        """Returns the supertypes of an affected edge with their depths, without the removed (edge, type) pair."""
+        # type-of edges are followed from the affected edges, and the
+        # supertypes of the other ones are read from the index
+        types = {}
+        frontier = [edge_str]
+        visited = {edge_str}
+        depth = 1
+        while len(frontier) > 0:
+            next_frontier = []
+            for item in frontier:
+                for type_edge in self.search((const.type_of_connector, hedge(item), '*'), strict=True):
+                    type_str = type_edge[2].to_str()
+                    if (item, type_str) == removed or type_str == edge_str:
+                        continue
+                    if type_str not in types or types[type_str] > depth:
+                        types[type_str] = depth
+                    if type_str in affected:
+                        if type_str not in visited:
+                            visited.add(type_str)
+                            next_frontier.append(type_str)
+                    else:
+                        for sup_str, sup_depth in self._indexed_type_strs(TYPE_PREFIX, type_str).items():
+                            if sup_str != edge_str and (sup_str not in types or types[sup_str] > depth + sup_depth):
+                                types[sup_str] = depth + sup_depth
+            frontier = next_frontier
+            depth += 1
+        return types
+
+    def _indexed_type_strs(self, prefix, edge_str):
+        """Returns the indexed supertypes or subtypes of an edge (by prefix), from their strings to their depths."""
+        key_prefix = ''.join((prefix, edge_str, ' '))
+        return {key[len(key_prefix):]: int(value) for key, value in self._aux_with_prefix(key_prefix)}
+
+    def _indexed_types(self, prefix, edge_str):
+        """Like _indexed_type_strs(), with the edges themselves."""
+        return {hedge(type_str): depth for type_str, depth in self._indexed_type_strs(prefix, edge_str).items()}
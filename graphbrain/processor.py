@@ -1,3 +1,12 @@
+def _distinct(edges):
+    # the relations of each edge are consecutive
+    previous = None
+    for edge in edges:
+        if edge != previous:
+            yield edge
+            previous = edge
+
+
 class Processor:
     def __init__(self, hg, sequence=None):
         self.hg = hg
@@ -12,12 +21,24 @@ class Processor:
     def report(self):
         return ''
 
-    def run(self):
+    def edges(self):
+        """Returns the edges to process. Processors that only act on some
+        edges can override this to read fewer of them."""
         if self.sequence is None:
-            for edge in self.hg.all():
-                self.process_edge(edge)
-        else:
-            for edge in self.hg.sequence(self.sequence):
-                self.process_edge(edge)
+            return self.hg.all()
+        return self.hg.sequence(self.sequence)
+
+    def relation_edges(self, lemmas, argrole):
+        """Returns the relations whose predicates have one of the given
+        lemmas and an argument with the given role (see
+        Hypergraph.relations()), or the edges of the sequence if there is
+        one."""
+        if self.sequence is not None:
+            return self.hg.sequence(self.sequence)
+        return _distinct(edge for edge, _ in self.hg.relations(lemmas, argrole))
+
+    def run(self):
+        for edge in self.edges():
+            self.process_edge(edge)
         self.on_end()
         print(self.report())
@@ -1,27 +1,45 @@
 from collections import Counter
 
-from graphbrain.utils.corefs import main_coref
+from graphbrain.utils.corefs import main_coref, MainCorefResolver
 from graphbrain.processor import Processor
 from graphbrain.utils.concepts import has_proper_concept, strip_concept
 from graphbrain.utils.lemmas import deep_lemma
 
 
-def is_actor(hg, edge):
-    """Checks if the edge is a coreference to an actor."""
+def _main_coref(hg, edge, resolver):
+    if resolver is None:
+        return main_coref(hg, edge)
+    return resolver.main_coref(edge)
+
+
+def is_actor(hg, edge, resolver=None):
+    """Checks if the edge is a coreference to an actor.
+
+    Keyword argument:
+    resolver -- MainCorefResolver used to find the main coreferences of
+    edges. Should be given when checking many edges. (default: None)
+    """
     if edge.mtype() == 'C':
-        return hg.exists(('actor/P/.', main_coref(hg, edge)))
+        return hg.exists(('actor/P/.', _main_coref(hg, edge, resolver)))
     else:
         return False
 
 
-def find_actors(hg, edge):
-    """Returns set of all coreferences to actors found in the edge."""
+def find_actors(hg, edge, resolver=None):
+    """Returns set of all coreferences to actors found in the edge.
+
+    Keyword argument:
+    resolver -- MainCorefResolver used to find the main coreferences of
+    edges. (default: a new one, which loads all the main coreferences)
+    """
+    if resolver is None:
+        resolver = MainCorefResolver(hg)
     _actors = set()
-    if is_actor(hg, edge):
-        _actors.add(main_coref(hg, edge))
+    if is_actor(hg, edge, resolver):
+        _actors.add(resolver.main_coref(edge))
     if edge.not_atom:
         for item in edge:
-            _actors |= find_actors(hg, item)
+            _actors |= find_actors(hg, item, resolver)
     return _actors
 
 
@@ -39,6 +57,10 @@ class Actors(Processor):
     def __init__(self, hg, sequence=None):
         super().__init__(hg=hg, sequence=sequence)
         self.actor_counter = Counter()
+        self.corefs = MainCorefResolver(hg)
+
+    def edges(self):
+        return self.relation_edges(ACTOR_PRED_LEMMAS, 's')
 
     def process_edge(self, edge):
         if edge.not_atom:
@@ -52,7 +74,7 @@ class Actors(Processor):
                         dlemma = deep_lemma(self.hg, pred).root()
                         if dlemma in ACTOR_PRED_LEMMAS:
                             try:
-                                actor = main_coref(self.hg, subject)
+                                actor = self.corefs.main_coref(subject)
                                 self.actor_counter[actor] += 1
                             except Exception as e:
                                 print(str(e))
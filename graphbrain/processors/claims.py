@@ -3,7 +3,7 @@ from collections import Counter
 import progressbar
 
 from graphbrain import hedge
-from graphbrain.utils.corefs import main_coref
+from graphbrain.utils.corefs import MainCorefResolver
 from graphbrain.processor import Processor
 from graphbrain.utils.concepts import has_proper_concept, strip_concept
 from graphbrain.utils.lemmas import deep_lemma
@@ -46,6 +46,7 @@ class Claims(Processor):
         self.non_human_counter = Counter()
         self.claims = []
         self.anaphoras = 0
+        self.corefs = MainCorefResolver(hg)
 
     def _gender(self, actor):
         counts = (('female', self.female_counter[actor]),
@@ -78,6 +79,9 @@ class Claims(Processor):
         # record claim
         self.claims.append({'actor': actor, 'claim': claim, 'edge': edge})
 
+    def edges(self):
+        return self.relation_edges(CLAIM_PRED_LEMMAS, 's')
+
     def process_edge(self, edge):
         if edge.not_atom:
             ct = edge.connector_type()
@@ -93,7 +97,7 @@ class Claims(Processor):
                     if len(subjects) == 1 and len(claims) >= 1:
                         subject = strip_concept(subjects[0])
                         if subject and has_proper_concept(subject):
-                            actor = main_coref(self.hg, subject)
+                            actor = self.corefs.main_coref(subject)
                             self.actors.add(actor)
                             for claim in claims:
                                 # if specificatin, claim is inside
@@ -1,6 +1,6 @@
 from graphbrain import hedge
 from graphbrain.processor import Processor
-from graphbrain.utils.corefs import main_coref
+from graphbrain.utils.corefs import MainCorefResolver
 from graphbrain.utils.concepts import all_concepts
 from graphbrain.utils.concepts import has_proper_concept
 from graphbrain.utils.concepts import strip_concept
@@ -18,6 +18,7 @@ class Conflicts(Processor):
         super().__init__(hg=hg, sequence=sequence)
         self.conflicts = 0
         self.conflict_topics = 0
+        self.corefs = MainCorefResolver(hg)
 
     def _process_topics(self, actor_orig, actor_targ, edge):
         for item in edge[1:]:
@@ -29,6 +30,9 @@ class Conflicts(Processor):
                                         actor_targ, concept, edge))
                             self.conflict_topics += 1
 
+    def edges(self):
+        return self.relation_edges(CONFLICT_PRED_LEMMAS, 's')
+
     def process_edge(self, edge):
         if edge.not_atom:
             ct = edge.connector_type()
@@ -47,8 +51,8 @@ class Conflicts(Processor):
                         if (subject and obj and
                                 has_proper_concept(subject) and
                                 has_proper_concept(obj)):
-                            actor_orig = main_coref(self.hg, subject)
-                            actor_targ = main_coref(self.hg, obj)
+                            actor_orig = self.corefs.main_coref(subject)
+                            actor_targ = self.corefs.main_coref(obj)
                             conflict_edge = hedge(
                                 ('conflict/P/.', actor_orig, actor_targ, edge))
                             self.hg.add(conflict_edge)
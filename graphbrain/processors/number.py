@@ -41,12 +41,12 @@ class Number(Processor):
     def on_end(self):
         lemmas = defaultdict(set)
         i = 0
-        lemma_edge_count = self.hg.count((const.lemma_connector, '*', '*'))
+        lemma_edge_count = self.hg.count((const.lemma_connector, '*', '*'), strict=True)
         with progressbar.ProgressBar(max_value=lemma_edge_count) as bar:
             for edge in self.hg.search((const.lemma_connector, '*', '*'), strict=True):
                 lemmas[edge[2]].add(edge[1])
-            i += 1
-            bar.update(i)
+                i += 1
+                bar.update(i)
 
         i = 0
         with progressbar.ProgressBar(max_value=len(lemmas)) as bar:
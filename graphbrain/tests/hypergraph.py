@@ -1,6 +1,7 @@
 import graphbrain.constants as const
 from graphbrain import hedge, hgraph
 from graphbrain import hopen
+from graphbrain.utils.lemmas import lemma_degrees
 
 
 class Hypergraph:
@@ -58,7 +59,8 @@ class Hypergraph:
 
         labels = set([edge.to_str() for edge in self.hg.all_non_atoms()])
         self.assertEqual(labels,
-                         {'(size graphbrain/1 7)', '(is graphbrain/1 great/1)', '(src mary/1 (is graphbrain/1 great/1))'})
+                         {'(size graphbrain/1 7)', '(is graphbrain/1 great/1)',
+                          '(src mary/1 (is graphbrain/1 great/1))'})
         self.hg.destroy()
         labels = set(self.hg.all())
         self.assertEqual(labels, set())
@@ -245,6 +247,34 @@ class Hypergraph:
         self.assertEqual(
             self.hg.count('(says/Pd * (is/Pd graphbrain/Cp great/C) ...)'), 2)
 
+    def test_count_strict(self):
+        self.hg.destroy()
+        self.hg.add('(is/Pd graphbrain/Cp great/C)')
+        self.hg.add('(is/Pd.so graphbrain/Cp (very/M great/C))')
+        self.hg.add('(says/Pd mary/Cp)')
+        self.hg.add('(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C))')
+        self.hg.add('(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C) extra/C)')
+        for pattern in ('(is/Pd * *)', '(is/Pd graphbrain/Cp .)', '(is/Pd graphbrain/Cp (*))', '(says/Pd ...)',
+                        '(says/Pd mary/Cp * ...)', '(* graphbrain/Cp *)', '(* * great/C)', '(x * *)',
+                        '(says/Pd * (is/Pd * *))'):
+            self.assertEqual(self.hg.count(pattern, strict=True),
+                             len(list(self.hg.search(pattern, strict=True))))
+        self.assertEqual(self.hg.count('(is/Pd * *)', strict=True), 2)
+        self.assertEqual(self.hg.count('(is/Pd graphbrain/Cp .)', strict=True), 1)
+        self.assertEqual(self.hg.count('(says/Pd ...)', strict=True), 3)
+
+    def test_estimate_count(self):
+        self.hg.destroy()
+        self.hg.add('(is/Pd graphbrain/Cp great/C)')
+        self.hg.add('(says/Pd mary/Cp)')
+        self.hg.add('(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C))')
+        self.hg.add('(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C) extra/C)')
+        for pattern in ('(* graphbrain/Cp *)', '(says/Pd * (is/Pd * *))', '(says/Pd ...)', '*', '.',
+                        '(is/Pd graphbrain/C *)'):
+            for strict in (False, True):
+                self.assertEqual(self.hg.estimate_count(pattern, strict=strict),
+                                 self.hg.count(pattern, strict=strict))
+
     def test_count_star(self):
         self.hg.destroy()
         self.hg.add('(is/Pd graphbrain/Cp great/C)')
@@ -325,7 +355,8 @@ class Hypergraph:
         self.assertEqual(list(self.hg.match('((is/M playing/Pd) *X *Y)')),
                          [(edge, [{'X': hedge('mary/Cp.s'), 'Y': hedge('(a/Md ((very/M old/Ma) violin/Cn.s))')}])])
         self.assertEqual(list(self.hg.match('(PRED mary/Cp.s X)')),
-                         [(edge, [{'PRED': hedge('(is/M playing/Pd)'), 'X': hedge('(a/Md ((very/M old/Ma) violin/Cn.s))')}])])
+                         [(edge, [{'PRED': hedge('(is/M playing/Pd)'),
+                                   'X': hedge('(a/Md ((very/M old/Ma) violin/Cn.s))')}])])
         self.assertEqual(list(self.hg.match('(X Y (a/Md ((very/M old/Ma) violin/Cn.s)))')),
                          [(edge, [{'X': hedge('(is/M playing/Pd)'), 'Y': hedge('mary/Cp.s')}])])
 
@@ -459,6 +490,19 @@ class Hypergraph:
         self.assertEqual(list(self.hg.edges_with_edges((hedge('graphbrain/1'), hedge('is')), 'great')), [edge1, edge2])
         self.assertEqual(list(self.hg.edges_with_edges((hedge('graphbrain/1'),), 'grea')), [])
 
+    def test_edges_with_edges_root(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P graphbrain/C great/C great/M)'), hedge('(is/P graphbrain/C great/C)'),
+                 hedge('(is/P graphbrain/C (of/B great/C ideas/C))')]
+        for edge in edges:
+            self.hg.add(edge)
+        # edges with several atoms with the root are found once
+        res = sorted(edge.to_str() for edge in self.hg.edges_with_edges([hedge('graphbrain/C')], 'great'))
+        self.assertEqual(res, sorted(edge.to_str() for edge in edges[:2]))
+        res = sorted(edge.to_str()
+                     for edge in self.hg.edges_with_edges([hedge('is/P'), hedge('graphbrain/C')], 'great'))
+        self.assertEqual(res, sorted(edge.to_str() for edge in edges[:2]))
+
     def test_edges_with_edges2(self):
         self.hg.destroy()
         self.hg.add(hedge('(syns/P (of/B city/C lights/C) paris/C)'))
@@ -843,6 +887,366 @@ class Hypergraph:
         edges = list(self.hg.sequence('test_seq'))
         self.assertEqual(edges, [])
 
+    def test_sequence_slice(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(12)]
+        for edge in edges:
+            self.hg.add_to_sequence('test_seq', edge)
+        self.hg.add_to_sequence('test_seq2', edges[0])
+        self.assertEqual(list(self.hg.sequence('test_seq')), edges)
+        self.assertEqual(list(self.hg.sequence('test_seq', 2, 5)), edges[2:5])
+        self.assertEqual(list(self.hg.sequence('test_seq', start=10)), edges[10:])
+        self.assertEqual(list(self.hg.sequence('test_seq', stop=0)), [])
+        self.assertEqual(list(self.hg.sequence('test_seq', start=12)), [])
+
+    def test_sequence_remove(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(3)]
+        for edge in edges:
+            self.hg.add_to_sequence('test_seq', edge)
+        self.hg.remove((const.sequence_connector, 'test_seq', '1', edges[1]))
+        # like the position searches, sequences stop at the first gap
+        self.assertEqual(list(self.hg.sequence('test_seq')), edges[:1])
+        self.assertEqual(list(self.hg.sequence('test_seq', start=2)), edges[2:])
+
+    def test_batch_sequence(self):
+        self.hg.destroy()
+        self.hg.add_to_sequence('test_seq', '(is/P 0/C number/C)')
+        self.hg.close()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(5)]
+        with hopen(self.hg_str) as hg:
+            for edge in edges[1:]:
+                hg.add_to_sequence('test_seq', edge)
+            self.assertEqual(list(hg.sequence('test_seq', 1)), edges[1:])
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(list(self.hg.sequence('test_seq')), edges)
+        seq_attrs_edge = (const.sequence_attrs_connector, 'test_seq')
+        self.assertEqual(self.hg.get_int_attribute(seq_attrs_edge, 'size'), 5)
+
+    def test_recompute_sequence_index(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(3)]
+        for edge in edges:
+            self.hg.add_to_sequence('seq0', edge)
+        self.hg.add_to_sequence('seq1', edges[0])
+        self.assertEqual(self.hg.recompute_sequence_index(), 4)
+        self.assertEqual(list(self.hg.sequence('seq0', 1)), edges[1:])
+        self.assertEqual(set(self.hg.sequences()), {'seq0', 'seq1'})
+
+    def _add_lemmas(self):
+        self.hg.destroy()
+        self.hg.add('(said/Pd.sr mary/Cp.s (is/P.sc graphbrain/Cp.s great/Ca))')
+        self.hg.add((const.lemma_connector, 'said/P', 'say/P'), primary=False)
+        self.hg.add((const.lemma_connector, 'says/P', 'say/P'), primary=False)
+        self.hg.add((const.lemma_connector, 'is/P', 'be/P'), primary=False)
+
+    def test_lemma_of(self):
+        self._add_lemmas()
+        self.assertEqual(self.hg.lemma_of(['said/Pd.sr', 'mary/Cp.s', 'is/P.sc', '(is/P.sc x/C y/C)', 'said/Pd']),
+                         [hedge('say/P'), None, hedge('be/P'), None, hedge('say/P')])
+        self.assertEqual(self.hg.lemma_of([]), [])
+
+    def test_atoms_with_lemma(self):
+        self._add_lemmas()
+        self.assertEqual(list(self.hg.atoms_with_lemma('say/P')), [hedge('said/P'), hedge('says/P')])
+        self.assertEqual(list(self.hg.atoms_with_lemma('go/P')), [])
+
+    def test_lemma_updates(self):
+        self._add_lemmas()
+        self.assertEqual(self.hg.lemma_of(['goes/P', 'said/P']), [None, hedge('say/P')])
+        self.hg.add((const.lemma_connector, 'goes/P', 'go/P'), primary=False)
+        self.hg.remove((const.lemma_connector, 'said/P', 'say/P'))
+        self.assertEqual(self.hg.lemma_of(['goes/P', 'said/P']), [hedge('go/P'), None])
+        self.assertEqual(list(self.hg.atoms_with_lemma('say/P')), [hedge('says/P')])
+
+    def test_recompute_lemma_index(self):
+        self._add_lemmas()
+        self.assertEqual(self.hg.recompute_lemma_index(), 3)
+        self.assertEqual(self.hg.lemma_of(['said/Pd.sr', 'mary/Cp.s']), [hedge('say/P'), None])
+        self.assertEqual(list(self.hg.atoms_with_lemma('be/P')), [hedge('is/P')])
+
+    def _add_types(self):
+        self.hg.destroy()
+        for edge, type_edge in (('(black/M cat/C)', 'cat/C'), ('(big/M (black/M cat/C))', '(black/M cat/C)'),
+                                ('cat/C', 'animal/C'), ('dog/C', 'animal/C'), ('animal/C', 'being/C'),
+                                ('cat/C', 'being/C')):
+            self.hg.add((const.type_of_connector, edge, type_edge), primary=False)
+
+    def _check_types(self):
+        self.assertEqual(self.hg.supertypes('cat/C'), {hedge('animal/C'): 1, hedge('being/C'): 1})
+        self.assertEqual(self.hg.supertypes('(big/M (black/M cat/C))', deep=True),
+                         {hedge('(black/M cat/C)'): 1, hedge('cat/C'): 2, hedge('animal/C'): 3,
+                          hedge('being/C'): 3})
+        self.assertEqual(self.hg.subtypes('animal/C', deep=True),
+                         {hedge('cat/C'): 1, hedge('dog/C'): 1, hedge('(black/M cat/C)'): 2,
+                          hedge('(big/M (black/M cat/C))'): 3})
+        self.assertEqual(self.hg.subtypes('dog/C', deep=True), {})
+        self.assertTrue(self.hg.is_type_of('(big/M (black/M cat/C))', 'being/C'))
+        self.assertFalse(self.hg.is_type_of('being/C', 'cat/C'))
+        self.assertFalse(self.hg.is_type_of('dog/C', 'cat/C'))
+
+    def test_types(self):
+        self._add_types()
+        self._check_types()
+
+    def test_type_index_updates(self):
+        self._add_types()
+        self.hg.remove((const.type_of_connector, 'cat/C', 'being/C'))
+        self.assertEqual(self.hg.supertypes('(black/M cat/C)', deep=True),
+                         {hedge('cat/C'): 1, hedge('animal/C'): 2, hedge('being/C'): 3})
+        self.hg.remove((const.type_of_connector, 'cat/C', 'animal/C'))
+        self.assertEqual(self.hg.supertypes('(black/M cat/C)', deep=True), {hedge('cat/C'): 1})
+        self.assertEqual(self.hg.subtypes('being/C', deep=True), {hedge('animal/C'): 1, hedge('dog/C'): 2})
+        self.assertFalse(self.hg.is_type_of('cat/C', 'being/C'))
+        self.hg.add((const.type_of_connector, 'cat/C', 'animal/C'), primary=False)
+        self.assertEqual(self.hg.supertypes('(big/M (black/M cat/C))', deep=True),
+                         {hedge('(black/M cat/C)'): 1, hedge('cat/C'): 2, hedge('animal/C'): 3,
+                          hedge('being/C'): 4})
+        # a cycle
+        self.hg.add((const.type_of_connector, 'being/C', 'cat/C'), primary=False)
+        self.assertEqual(self.hg.supertypes('cat/C', deep=True), {hedge('animal/C'): 1, hedge('being/C'): 2})
+        self.assertFalse(self.hg.is_type_of('being/C', '(black/M cat/C)'))
+        self.assertTrue(self.hg.is_type_of('being/C', 'animal/C'))
+
+    def test_recompute_type_index(self):
+        self._add_types()
+        self.assertEqual(self.hg.recompute_type_index(), 6)
+        self._check_types()
+
+    def _add_relations(self):
+        self.hg.destroy()
+        self.hg.add('(said/Pd.sr mary/Cp.s (claimed/Pd.{sr} john/Cp.s (is/P.sc x/C y/C)))')
+        self.hg.add('((will/M claim/Pd.so) bob/Cp.s it/Ci)')
+        self.hg.add('(claim/Pd.s alice/Cp.s)')
+        self.hg.add('(kills/Pd.so mary/Cp.s john/Cp.s)')
+        self.hg.add('(say/Pd.s x/C)')
+        self.hg.add((const.lemma_connector, 'said/P', 'say/P'), primary=False)
+        self.hg.add((const.lemma_connector, 'claimed/P', 'claim/P'), primary=False)
+        self.hg.add((const.lemma_connector, 'kills/P', 'kill/P'), primary=False)
+        # an atom with the root of a lemma, but another lemma
+        self.hg.add((const.lemma_connector, 'say/P', 'tell/P'), primary=False)
+
+    def _check_relations(self):
+        self.assertEqual(set(self.hg.relations({'say', 'claim'}, 's')),
+                         {(hedge('(said/Pd.sr mary/Cp.s (claimed/Pd.{sr} john/Cp.s (is/P.sc x/C y/C)))'),
+                           hedge('mary/Cp.s')),
+                          (hedge('(claimed/Pd.{sr} john/Cp.s (is/P.sc x/C y/C))'), hedge('john/Cp.s')),
+                          (hedge('((will/M claim/Pd.so) bob/Cp.s it/Ci)'), hedge('bob/Cp.s')),
+                          (hedge('(claim/Pd.s alice/Cp.s)'), hedge('alice/Cp.s'))})
+        self.assertEqual(list(self.hg.relations({'kill'}, 'o')),
+                         [(hedge('(kills/Pd.so mary/Cp.s john/Cp.s)'), hedge('john/Cp.s'))])
+        self.assertEqual(list(self.hg.relations({'tell'}, 's')), [(hedge('(say/Pd.s x/C)'), hedge('x/C'))])
+        self.assertEqual(list(self.hg.relations({'claim'}, 'x')), [])
+        self.assertEqual(list(self.hg.relations({'be'}, 's')), [])
+
+    def test_relations(self):
+        self._add_relations()
+        self._check_relations()
+
+    def test_create_relation_index(self):
+        self._add_relations()
+        self.assertEqual(self.hg.create_relation_index(), 7)
+        self._check_relations()
+        self.hg.drop_relation_index()
+        self._check_relations()
+
+    def test_relation_index_updates(self):
+        self.hg.destroy()
+        self.hg.create_relation_index()
+        self._add_relations()
+        self._check_relations()
+        self.hg.remove('(claim/Pd.s alice/Cp.s)')
+        self.hg.add('(claims/Pd.sx bob/Cp.s (in/T 2020/C))')
+        self.hg.add((const.lemma_connector, 'claims/P', 'claim/P'), primary=False)
+        self.assertEqual(set(self.hg.relations({'claim'}, 's')),
+                         {(hedge('(claimed/Pd.{sr} john/Cp.s (is/P.sc x/C y/C))'), hedge('john/Cp.s')),
+                          (hedge('((will/M claim/Pd.so) bob/Cp.s it/Ci)'), hedge('bob/Cp.s')),
+                          (hedge('(claims/Pd.sx bob/Cp.s (in/T 2020/C))'), hedge('bob/Cp.s'))})
+        self.hg.drop_relation_index()
+
+    def test_coref_sets(self):
+        self.assertIsNone(self.hg.coref_size('abc'))
+        self.assertEqual(list(self.hg.coref_members('abc')), [])
+        self.assertEqual(self.hg.add_coref_members('abc', ['paris/C', '(of/B city/C paris/C)']), 2)
+        self.assertEqual(self.hg.add_coref_members('abc', ['paris/C', 'france/C', 'france/C']), 3)
+        self.assertEqual(self.hg.add_coref_members('abcd', ['berlin/C']), 1)
+        self.assertEqual(self.hg.coref_size('abc'), 3)
+        self.assertEqual(set(self.hg.coref_members('abc')),
+                         {hedge('paris/C'), hedge('(of/B city/C paris/C)'), hedge('france/C')})
+        self.assertEqual(list(self.hg.coref_members('abcd')), [hedge('berlin/C')])
+        self.hg.remove_coref_set('abc')
+        self.assertIsNone(self.hg.coref_size('abc'))
+        self.assertEqual(list(self.hg.coref_members('abc')), [])
+        self.assertEqual(self.hg.coref_size('abcd'), 1)
+        with self.assertRaises(ValueError):
+            self.hg.add_coref_members('a b', ['paris/C'])
+
+    def test_lemma_degrees(self):
+        self._add_lemmas()
+        self.hg.add('(said/P mary/Cp.s hello/C)')
+        self.hg.add('(says/P john/Cp.s (said/P x/C y/C))')
+        self.hg.add('(tells/Pd.so john/Cp.s (said/P x/C y/C))')
+        # said/Pd.sr, said/P and says/P, but not the atoms with the same roots
+        self.assertEqual(lemma_degrees(self.hg, hedge('said/Pd.sr')), (3, 5))
+        self.assertEqual(lemma_degrees(self.hg, hedge('says/P')), (2, 4))
+        # atoms without a lemma, and non-atomic edges
+        self.assertEqual(lemma_degrees(self.hg, hedge('tells/Pd.so')), (1, 1))
+        self.assertEqual(lemma_degrees(self.hg, hedge('(said/P x/C y/C)')), (2, 2))
+
+    def _pages(self, query, *args, page_size=2, **kwargs):
+        """Reads all the pages of a query, and returns their results and
+        sizes."""
+        results = []
+        sizes = []
+        cursor = None
+        while True:
+            page = query(*args, cursor=cursor, page_size=page_size, **kwargs)
+            results += page
+            sizes.append(len(page))
+            cursor = page.cursor
+            if cursor is None:
+                return results, sizes
+
+    def _add_pages_edges(self):
+        self.hg.destroy()
+        for i in range(5):
+            self.hg.add('(is/P graphbrain/C number{}/C)'.format(i))
+            self.hg.add('(says/P mary/C (is/P graphbrain/C number{}/C))'.format(i))
+        self.hg.add('(is/P mary/C graphbrain/C)')
+
+    def test_search_pages(self):
+        self._add_pages_edges()
+        for pattern, strict in (('(is/P graphbrain/C *)', True), ('(is/P graphbrain/C *)', False),
+                                ('(*/P mary/C *)', False), ('(is/P * *)', False), ('(*)', False)):
+            edges, sizes = self._pages(self.hg.search, pattern, strict=strict)
+            self.assertEqual(edges, list(self.hg.search(pattern, strict=strict)))
+            self.assertTrue(all(size == 2 for size in sizes[:-1]))
+        page = self.hg.search('(is/P graphbrain/C *)', page_size=3)
+        self.assertEqual(len(page), 3)
+        self.assertEqual(list(page) + list(self.hg.search('(is/P graphbrain/C *)', cursor=page.cursor)),
+                         list(self.hg.search('(is/P graphbrain/C *)')))
+        self.assertIsNone(self.hg.search('(is/P graphbrain/C *)', page_size=10).cursor)
+
+    def test_match_pages(self):
+        self._add_pages_edges()
+        matches, _ = self._pages(self.hg.match, '(says/P mary/C (is/P graphbrain/C *X))', page_size=3)
+        self.assertEqual(matches, list(self.hg.match('(says/P mary/C (is/P graphbrain/C *X))')))
+        self.assertEqual(len(matches), 5)
+
+    def test_search_pages_edges_added(self):
+        self._add_pages_edges()
+        page = self.hg.search('(is/P graphbrain/C *)', page_size=2)
+        self.hg.add('(is/P graphbrain/C number9/C)')
+        self.hg.remove('(is/P graphbrain/C number0/C)')
+        # the search resumes at the same place, with the same plan
+        edges = list(page) + list(self.hg.search('(is/P graphbrain/C *)', cursor=page.cursor))
+        self.assertEqual(edges[:2], list(page))
+        self.assertEqual(set(edges[2:]), {hedge('(is/P graphbrain/C number{}/C)'.format(i)) for i in (2, 3, 4, 9)})
+
+    def test_star_pages(self):
+        self._add_pages_edges()
+        edges, sizes = self._pages(self.hg.star, 'graphbrain/C', page_size=4)
+        self.assertEqual(edges, list(self.hg.star('graphbrain/C')))
+        self.assertEqual(sizes, [4, 2])
+        page = self.hg.star('graphbrain/C', limit=3, page_size=4)
+        self.assertEqual((list(page), page.cursor), (list(self.hg.star('graphbrain/C', limit=3)), None))
+
+    def test_edges_with_edges_pages(self):
+        self._add_pages_edges()
+        edges, _ = self._pages(self.hg.edges_with_edges, [hedge('graphbrain/C'), hedge('mary/C')])
+        self.assertEqual(edges, [hedge('(is/P mary/C graphbrain/C)')])
+        edges, _ = self._pages(self.hg.edges_with_edges, [hedge('graphbrain/C')], root='number3')
+        self.assertEqual(edges, list(self.hg.edges_with_edges([hedge('graphbrain/C')], root='number3')))
+
+    def test_sequence_pages(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(5)]
+        for edge in edges:
+            self.hg.add_to_sequence('test_seq', edge)
+        self.assertEqual(self._pages(self.hg.sequence, 'test_seq'), (edges, [2, 2, 1]))
+        self.assertEqual(self._pages(self.hg.sequence, 'test_seq', 1, 3), (edges[1:3], [2, 0]))
+
+    def test_invalid_cursor(self):
+        self._add_pages_edges()
+        page = self.hg.star('graphbrain/C', page_size=2)
+        with self.assertRaises(ValueError):
+            list(self.hg.search('(is/P graphbrain/C *)', cursor=page.cursor))
+        with self.assertRaises(ValueError):
+            list(self.hg.search('(is/P graphbrain/C *)', cursor='not a cursor'))
+        with self.assertRaises(ValueError):
+            self.hg.search('(is/P graphbrain/C *)', page_size=0)
+
+    def _add_ranked_edges(self):
+        self.hg.destroy()
+        for i in range(6):
+            self.hg.add('(is/P item{}/C small/C)'.format(i))
+            self.hg.set_attribute('item{}/C'.format(i), 'score', (i * 5) % 7 - 2)
+        self.hg.set_attribute('small/C', 'score', 'unknown')
+        self.hg.add('(is/P item3/C big/C)')
+
+    def test_top_k(self):
+        self._add_ranked_edges()
+        self.assertEqual(self.hg.top_k('score', 3),
+                         [hedge('item4/C'), hedge('item1/C'), hedge('item5/C')])
+        self.assertEqual(self.hg.top_k('d', 3), [hedge('is/P'), hedge('small/C'), hedge('item3/C')])
+        self.assertEqual(self.hg.top_k('d', 2, pattern='*/C'), [hedge('small/C'), hedge('item3/C')])
+        self.assertEqual(self.hg.top_k('foo', 3), [])
+
+    def test_edges_by_attribute(self):
+        self._add_ranked_edges()
+        self.assertEqual(list(self.hg.edges_by_attribute('score', -1, 3)),
+                         [hedge('item1/C'), hedge('item5/C'), hedge('item2/C'), hedge('item3/C')])
+        self.assertEqual(list(self.hg.edges_by_attribute('score', lo=2)),
+                         [hedge('item4/C'), hedge('item1/C'), hedge('item5/C')])
+        self.assertEqual(list(self.hg.edges_by_attribute('score', hi=-2)), [hedge('item0/C')])
+
+    def test_create_index(self):
+        self._add_ranked_edges()
+        top = self.hg.top_k('d', 4)
+        scores = list(self.hg.edges_by_attribute('score', -1, 3))
+        self.assertEqual(self.hg.create_index('score'), 6)
+        self.hg.create_index('d')
+        self.assertEqual(self.hg.top_k('d', 4), top)
+        self.assertEqual(list(self.hg.edges_by_attribute('score', -1, 3)), scores)
+        with self.assertRaises(ValueError):
+            self.hg.create_index('bad attribute')
+        self.hg.drop_index('d')
+        self.hg.drop_index('score')
+
+    def test_index_updates(self):
+        self._add_ranked_edges()
+        self.hg.create_index('score')
+        self.hg.create_index('d')
+        self.hg.set_attribute('item0/C', 'score', 10)
+        self.hg.set_attribute('small/C', 'score', -10)
+        self.hg.remove('item4/C')
+        self.hg.add('(is/P item2/C big/C)')
+        self.hg.add('(is/P item2/C tall/C)')
+        self.hg.remove('(is/P item5/C small/C)')
+        top = self.hg.top_k('d', 4)
+        scores = list(self.hg.edges_by_attribute('score'))
+        self.assertEqual(top[2], hedge('item2/C'))
+        self.assertEqual(scores[0], hedge('item0/C'))
+        self.assertEqual(scores[-1], hedge('small/C'))
+        self.assertNotIn(hedge('item4/C'), scores)
+        self.hg.drop_index('d')
+        self.hg.drop_index('score')
+        self.assertEqual(self.hg.top_k('d', 4), top)
+        self.assertEqual(list(self.hg.edges_by_attribute('score')), scores)
+
+    def test_batch_index_updates(self):
+        self._add_ranked_edges()
+        self.hg.create_index('d')
+        self.hg.close()
+        with hopen(self.hg_str) as hg:
+            for i in range(6):
+                hg.add('(has/P item1/C property{}/C)'.format(i))
+            self.assertEqual(hg.top_k('d', 2), [hedge('is/P'), hedge('item1/C')])
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(self.hg.top_k('d', 2), [hedge('is/P'), hedge('item1/C')])
+        self.hg.drop_index('d')
+        self.assertEqual(self.hg.top_k('d', 2), [hedge('is/P'), hedge('item1/C')])
+
     def test_add_with_attributes1(self):
         self.hg.destroy()
         edge = hedge('(is graphbrain/1 great/1)')
@@ -875,6 +1279,54 @@ class Hypergraph:
         self.hg.add(edge, primary=True)
         self.assertTrue(self.hg.is_primary(edge))
 
+    def test_add_many(self):
+        self.hg.destroy()
+        edges = ['(is/Pd graphbrain/Cp great/C)', '(says/Pd mary/Cp)',
+                 '(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C))',
+                 '(says/Pd mary/Cp (is/Pd graphbrain/Cp great/C))', '(src mary/Cp (says/Pd mary/Cp))']
+        for edge in edges:
+            self.hg.add(edge)
+        self.hg.add('(is/Pd (the/M sun/C) shining/C)', primary=False)
+        self.hg.add('(says/Pd john/Cp (is/Pd (the/M sun/C) shining/C))')
+        expected = set((edge, str(attributes)) for edge, attributes in self.hg.all_attributes())
+        self.hg.destroy()
+        self.assertEqual(self.hg.add_many(edges), 5)
+        self.hg.add_many(['(is/Pd (the/M sun/C) shining/C)'], primary=False)
+        self.hg.add_many(['(says/Pd john/Cp (is/Pd (the/M sun/C) shining/C))'])
+        result = set((edge, str(attributes)) for edge, attributes in self.hg.all_attributes())
+        self.assertEqual(result, expected)
+
+    def test_add_many_search(self):
+        self.hg.destroy()
+        self.hg.add_many(hedge('(is/P {}/C number/C)'.format(i)) for i in range(10))
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 10)
+        self.assertEqual(self.hg.degree('number/C'), 10)
+        self.assertTrue(self.hg.is_primary('(is/P 7/C number/C)'))
+
+    def test_add_many_non_primary_to_primary(self):
+        self.hg.destroy()
+        edge = hedge('(is/P (the/M sun/C) shining/C)')
+        self.hg.add_many([edge], primary=False)
+        self.assertFalse(self.hg.is_primary(edge))
+        self.assertEqual(self.hg.degree('shining/C'), 0)
+        self.hg.add_many([edge, edge])
+        self.assertTrue(self.hg.is_primary(edge))
+        self.assertEqual(self.hg.degree('shining/C'), 1)
+        self.assertEqual(self.hg.deep_degree('sun/C'), 1)
+
+    def test_add_many_with_attributes(self):
+        self.hg.destroy()
+        edge1 = hedge('(is graphbrain/1 great/1)')
+        edge2 = hedge('(is graphbrain/1 fast/1)')
+        n = self.hg.add_many_with_attributes([(edge1, {'p': 1, 'd': 10, 'dd': 20, 'foo': 777}),
+                                              (edge2, {'p': 0, 'd': 1, 'dd': 2})])
+        self.assertEqual(n, 2)
+        self.assertTrue(self.hg.is_primary(edge1))
+        self.assertFalse(self.hg.is_primary(edge2))
+        self.assertEqual(self.hg.degree(edge1), 10)
+        self.assertEqual(self.hg.get_int_attribute(edge1, 'foo'), 777)
+        self.assertEqual(set(self.hg.search('(is graphbrain/1 *)')), {edge1, edge2})
+
     def test_batch_adds(self):
         self.hg.destroy()
         self.hg.close()
@@ -887,3 +1339,113 @@ class Hypergraph:
         self.hg = hgraph(self.hg_str)
         for edge in edges:
             self.assertTrue(self.hg.exists(edge))
+
+    def test_batch_add_many(self):
+        self.hg.destroy()
+        self.hg.close()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(10)]
+        with hopen(self.hg_str) as hg:
+            hg.add_many(edges)
+        self.hg = hgraph(self.hg_str)
+        for edge in edges:
+            self.assertTrue(self.hg.exists(edge))
+        self.assertEqual(self.hg.degree('number/C'), 10)
+
+    def test_batch_reads(self):
+        self.hg.destroy()
+        self.hg.close()
+        with hopen(self.hg_str) as hg:
+            hg.add('(is/P graphbrain/C great/C)')
+            hg.add('(is/P graphbrain/C fast/C)')
+            self.assertTrue(hg.exists('(is/P graphbrain/C great/C)'))
+            self.assertEqual(hg.degree('graphbrain/C'), 2)
+            self.assertEqual(set(hg.search('(is/P graphbrain/C *)')),
+                             {hedge('(is/P graphbrain/C great/C)'), hedge('(is/P graphbrain/C fast/C)')})
+            hg.remove('(is/P graphbrain/C fast/C)')
+            self.assertEqual(list(hg.search('(is/P graphbrain/C *)')), [hedge('(is/P graphbrain/C great/C)')])
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(list(self.hg.search('(is/P graphbrain/C *)')), [hedge('(is/P graphbrain/C great/C)')])
+
+    def test_batch_degrees(self):
+        self.hg.destroy()
+        self.hg.close()
+        with hopen(self.hg_str) as hg:
+            hg.add('(is/P graphbrain/C great/C)')
+            hg.add('(is/P graphbrain/C fast/C)')
+            hg.add('(says/P mary/C (is/P graphbrain/C great/C))')
+            self.assertEqual(hg.degree('graphbrain/C'), 2)
+            self.assertEqual(hg.deep_degree('graphbrain/C'), 3)
+            hg.set_attribute('graphbrain/C', 'label', 'gb')
+            hg.add('(is/P graphbrain/C open/C)')
+            hg.remove('(is/P graphbrain/C fast/C)')
+            self.assertEqual(hg.degree('graphbrain/C'), 2)
+            self.assertEqual(hg.deep_degree('is/P'), 3)
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(self.hg.degree('graphbrain/C'), 2)
+        self.assertEqual(self.hg.deep_degree('graphbrain/C'), 3)
+        self.assertEqual(self.hg.degree('is/P'), 2)
+        self.assertEqual(self.hg.deep_degree('is/P'), 3)
+        self.assertEqual(self.hg.degree('(is/P graphbrain/C great/C)'), 1)
+        self.assertEqual(self.hg.get_str_attribute('graphbrain/C', 'label'), 'gb')
+
+    def test_recompute_degrees(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.add('(says/P mary/C (is/P graphbrain/C great/C))')
+        self.hg.add('(is/P graphbrain/C fast/C)', primary=False)
+        self.assertEqual(self.hg.recompute_degrees(), 0)
+        self.hg.set_attribute('graphbrain/C', 'd', 10)
+        self.hg.set_attribute('mary/C', 'dd', 0)
+        self.assertEqual(self.hg.recompute_degrees(), 2)
+        self.assertEqual(self.hg.degree('graphbrain/C'), 1)
+        self.assertEqual(self.hg.deep_degree('graphbrain/C'), 2)
+        self.assertEqual(self.hg.deep_degree('mary/C'), 1)
+        self.assertEqual(self.hg.degree('fast/C'), 0)
+
+    def test_explain(self):
+        self.hg.destroy()
+        for i in range(5):
+            self.hg.add('(says/Pd.sr person{}/Cp.s (is/P x/C y/C))'.format(i))
+        self.hg.add('(says/Pd.sr trump/Cp.s/en (is/P x/C z/C))')
+        plan = self.hg.explain('(says/Pd.sr trump/Cp.s/en *)')
+        self.assertEqual(plan['scan'], 'index')
+        self.assertEqual(plan['plan'], [1])
+        self.assertEqual([anchor['rows'] for anchor in plan['anchors']], [6, 1])
+        self.assertEqual(plan['rows'], 1)
+        self.assertEqual(plan['filters'], [0])
+        # with index_positions, only the most selective anchor is scanned
+        self.assertEqual(self.hg.explain('(says/Pd.sr trump/Cp.s/en *)', strict=True)['plan'][-1], 1)
+        self.assertEqual(self.hg.explain('(* * *)')['scan'], 'all')
+        self.assertEqual(list(self.hg.search('(says/P trump/Cp *)')),
+                         [hedge('(says/Pd.sr trump/Cp.s/en (is/P x/C z/C))')])
+
+    def test_search_multiple_anchors(self):
+        self.hg.destroy()
+        self.hg.add('(meets/Pd.so obama/Cp.s/en putin/Cp.s/en)')
+        self.hg.add('(calls/Pd.so obama/Cp.s/en (the/Md (of/Br president/Cc.s russia/Cp.s)))')
+        self.hg.add('(meets/Pd.so putin/Cp.s/en obama/Cp.s/en)')
+        self.hg.add('(meets/Pd.so obama/Cp.s/en merkel/Cp.s/en)')
+        self.hg.add('(is/Pd.sc putin/Cp.s/en (of/Br president/Cc.s russia/Cp.s))')
+        self.assertEqual(list(self.hg.search('(*/Pd.so obama/Cp putin/Cp)')),
+                         [hedge('(meets/Pd.so obama/Cp.s/en putin/Cp.s/en)')])
+        self.assertEqual(list(self.hg.search('(meets/P putin/Cp obama/Cp)')),
+                         [hedge('(meets/Pd.so putin/Cp.s/en obama/Cp.s/en)')])
+        self.assertEqual(list(self.hg.search('(* putin/Cp (of/Br president/Cc russia/Cp))')),
+                         [hedge('(is/Pd.sc putin/Cp.s/en (of/Br president/Cc.s russia/Cp.s))')])
+        self.assertEqual(list(self.hg.search('(* obama/Cp (of/Br president/Cc russia/Cp))')), [])
+
+    def test_search_more_specific_anchor(self):
+        self.hg.destroy()
+        self.hg.add('(is/Pd.sc (the/M sky/C) blue/Ca)')
+        self.assertEqual(list(self.hg.search('(is/P.sc * *)')), [hedge('(is/Pd.sc (the/M sky/C) blue/Ca)')])
+
+    def test_recompute_statistics(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.add('(says/P mary/C (is/P graphbrain/C great/C))')
+        self.hg.add('(says/P john/C (is/P graphbrain/C great/C))')
+        self.hg.remove('(says/P john/C (is/P graphbrain/C great/C))')
+        plan = self.hg.explain('(says/P mary/C *)')
+        self.assertEqual(self.hg.recompute_statistics(), 2)
+        self.assertEqual(self.hg.explain('(says/P mary/C *)'), plan)
+        self.assertEqual([anchor['rows'] for anchor in plan['anchors']], [1, 1])
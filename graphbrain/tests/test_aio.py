@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+
+from graphbrain import hedge, hgraph
+from graphbrain.aio import AsyncHypergraph
+
+
+def _create(hg_str):
+    hg = hgraph(hg_str)
+    hg.destroy()
+    for i in range(25):
+        hg.add('(is/P number{}/C (of/B type/C {}/C))'.format(i, i % 3))
+    hg.set_attribute('number1/C', 'text', 'one')
+    hg.add_to_sequence('numbers', '(is/P number1/C (of/B type/C 1/C))')
+    hg.add_to_sequence('numbers', '(is/P number2/C (of/B type/C 2/C))')
+    edges = list(hg.all())
+    hg.close()
+    return edges
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+class AsyncHypergraphTests:
+    def setUp(self):
+        self.edges = _create(self.hg_str)
+
+    def _run(self, test):
+        """Runs the coroutine function test with an AsyncHypergraph."""
+        async def run():
+            hg = await AsyncHypergraph.open(self.hg_str, chunk_size=4, **self.kwargs)
+            try:
+                await test(hg)
+            finally:
+                await hg.close()
+
+        asyncio.run(run())
+
+    def test_iterators(self):
+        async def run(hg):
+            edges = await _collect(hg.search('(is/P * *)'))
+            self.assertEqual(len(edges), 25)
+            self.assertEqual(set(await _collect(hg.search('(is/P * (of/B type/C 1/C))'))),
+                             {hedge('(is/P number{}/C (of/B type/C 1/C))'.format(i)) for i in range(1, 25, 3)})
+            matches = await _collect(hg.match('(is/P *X (of/B type/C 0/C))'))
+            self.assertEqual(len(matches), 9)
+            self.assertEqual(len(await _collect(hg.star('type/C'))), 3)
+            self.assertEqual(await _collect(hg.sequence('numbers')),
+                             [hedge('(is/P number1/C (of/B type/C 1/C))'), hedge('(is/P number2/C (of/B type/C 2/C))')])
+            self.assertEqual(await _collect(hg.all()), self.edges)
+
+        self._run(run)
+
+    def test_getters(self):
+        async def run(hg):
+            self.assertTrue(await hg.exists('number1/C'))
+            self.assertFalse(await hg.exists('number100/C'))
+            self.assertEqual(await hg.count('(is/P * (of/B type/C 0/C))'), 9)
+            self.assertTrue(await hg.is_primary('(is/P number1/C (of/B type/C 1/C))'))
+            self.assertEqual(await hg.degree('(of/B type/C 0/C)'), 9)
+            self.assertEqual(await hg.deep_degree('type/C'), 27)
+            self.assertEqual(await hg.get_str_attribute('number1/C', 'text'), 'one')
+            self.assertEqual(await hg.get_int_attribute('number1/C', 'd'), 1)
+            self.assertEqual(await hg.get_float_attribute('number1/C', 'x', 0.5), 0.5)
+            self.assertEqual(await hg.text('number1/C'), 'one')
+
+        self._run(run)
+
+    def test_page(self):
+        async def run(hg):
+            page = await hg.page('search', '(is/P * *)', page_size=10)
+            self.assertEqual(len(page), 10)
+            edges = list(page) + await _collect(hg.search('(is/P * *)', cursor=page.cursor))
+            self.assertEqual(edges, await _collect(hg.search('(is/P * *)')))
+            page = await hg.page('star', 'type/C', page_size=2)
+            page = await hg.page('star', 'type/C', page_size=2, cursor=page.cursor)
+            self.assertEqual((len(page), page.cursor), (1, None))
+            with self.assertRaises(ValueError):
+                await hg.page('all', page_size=10)
+
+        self._run(run)
+
+    def test_attribute_rankings(self):
+        async def run(hg):
+            self.assertEqual(await hg.top_k('d', 1), [hedge('is/P')])
+            self.assertEqual(await _collect(hg.edges_by_attribute('d', lo=9)),
+                             [hedge('is/P'), hedge('(of/B type/C 0/C)')])
+
+        self._run(run)
+
+    def test_break(self):
+        async def run(hg):
+            n = 0
+            async for _ in hg.search('(is/P * *)'):
+                n += 1
+                if n == 5:
+                    break
+            self.assertEqual(n, 5)
+            self.assertEqual(len(await _collect(hg.search('(is/P * *)'))), 25)
+
+        self._run(run)
+
+    def test_cancel(self):
+        async def run(hg):
+            started = asyncio.Event()
+
+            async def consume():
+                async for _ in hg.all():
+                    started.set()
+                    await asyncio.sleep(1)
+
+            task = asyncio.create_task(consume())
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(await hg.degree('(of/B type/C 0/C)'), 9)
+
+        self._run(run)
+
+    def test_concurrent(self):
+        async def run(hg):
+            results = await asyncio.gather(*[_collect(hg.search('(is/P * (of/B type/C {}/C))'.format(i % 3)))
+                                             for i in range(6)])
+            self.assertEqual([len(edges) for edges in results], [9, 8, 8, 9, 8, 8])
+
+        self._run(run)
+
+
+class TestAsyncSQLite(AsyncHypergraphTests, unittest.TestCase):
+    hg_str = 'test.db'
+    kwargs = {}
+
+
+class TestAsyncSQLiteReaders(AsyncHypergraphTests, unittest.TestCase):
+    hg_str = 'test_readers.db'
+    kwargs = {'workers': 3, 'readers': 2}
+
+
+class TestAsyncLevelDB(AsyncHypergraphTests, unittest.TestCase):
+    hg_str = 'test.hg'
+    kwargs = {'workers': 3}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
+import os
 import unittest
 
 from graphbrain import hedge
 from graphbrain import hgraph
-from graphbrain.utils.corefs import are_corefs, coref_id, coref_set, main_coref, make_corefs
+from graphbrain.constants import coref_connector, coref_set_id_key
+from graphbrain.memory.snapshot import write_snapshot
+from graphbrain.utils.corefs import (are_corefs, coref_id, coref_set, main_coref, main_coref_from_id, make_corefs,
+                                     MainCorefResolver)
 
 
 class TestCorefs(unittest.TestCase):
@@ -105,6 +109,120 @@ class TestCorefs(unittest.TestCase):
         self.assertEqual(main_coref(self.hg, concepts[1]), concepts[1])
         self.assertEqual(main_coref(self.hg, concepts[2]), concepts[1])
 
+    def test_merge_many_sets(self):
+        concepts = [hedge('concept{}/C'.format(i)) for i in range(20)]
+        for i in range(0, 20, 2):
+            make_corefs(self.hg, concepts[i], concepts[i + 1])
+        merged_ids = {coref_id(self.hg, concept) for concept in concepts}
+        self.assertEqual(len(merged_ids), 10)
+        for i in range(0, 20, 4):
+            make_corefs(self.hg, concepts[i + 1], concepts[i + 2])
+        for i in range(0, 20, 8):
+            make_corefs(self.hg, concepts[i], concepts[min(i + 7, 19)])
+        make_corefs(self.hg, concepts[19], concepts[0])
+        make_corefs(self.hg, concepts[3], concepts[10])
+
+        cref_id = coref_id(self.hg, concepts[0])
+        self.assertIsNotNone(cref_id)
+        for concept in concepts:
+            self.assertEqual(coref_id(self.hg, concept), cref_id)
+            self.assertEqual(coref_set(self.hg, concept), set(concepts))
+            self.assertTrue(are_corefs(self.hg, concepts[0], concept))
+            self.assertEqual(main_coref(self.hg, concept), main_coref(self.hg, concepts[0]))
+
+        self.assertEqual(self.hg.coref_size(cref_id), 20)
+        self.assertEqual(set(self.hg.coref_members(cref_id)), set(concepts))
+        # the records of the merged sets are removed
+        for merged_id in merged_ids - {cref_id}:
+            self.assertIsNone(self.hg.coref_size(merged_id))
+            self.assertEqual(list(self.hg.coref_members(merged_id)), [])
+
+    def test_merge_keeps_larger_set(self):
+        concepts = self.concepts
+
+        make_corefs(self.hg, concepts[0], concepts[1])
+        make_corefs(self.hg, concepts[1], concepts[2])
+        make_corefs(self.hg, concepts[3], concepts[4])
+        cref_id = coref_id(self.hg, concepts[0])
+        make_corefs(self.hg, concepts[3], concepts[0])
+        for concept in concepts[:5]:
+            self.assertEqual(coref_id(self.hg, concept), cref_id)
+        self.assertEqual(self.hg.coref_size(cref_id), 5)
+
+    def test_earlier_coref_sets(self):
+        concepts = self.concepts
+
+        # coreference sets as written by earlier versions
+        for concept in concepts[:3]:
+            self.hg.set_attribute(concept, coref_set_id_key, 'abc')
+        self.hg.add((coref_connector, concepts[0], concepts[1]), primary=False)
+        self.hg.add((coref_connector, concepts[2], concepts[1]), primary=False)
+
+        self.assertEqual(coref_set(self.hg, concepts[2]), set(concepts[:3]))
+        self.assertTrue(are_corefs(self.hg, concepts[0], concepts[2]))
+        self.assertEqual(coref_id(self.hg, concepts[1]), 'abc')
+        self.assertIsNone(self.hg.coref_size('abc'))
+
+        # and are recorded when they are merged
+        make_corefs(self.hg, concepts[3], concepts[0])
+        self.assertEqual(coref_id(self.hg, concepts[3]), 'abc')
+        self.assertEqual(self.hg.coref_size('abc'), 4)
+        self.assertEqual(coref_set(self.hg, concepts[3]), set(concepts[:4]))
+        self.assertEqual(main_coref(self.hg, concepts[3]), concepts[1])
+
+    def test_main_coref_resolver(self):
+        concepts = self.concepts
+
+        make_corefs(self.hg, concepts[0], concepts[1])
+        resolver = MainCorefResolver(self.hg)
+        self.assertEqual(resolver.main_coref(concepts[0]), concepts[1])
+        self.assertEqual(resolver.main_coref(concepts[2]), concepts[2])
+
+        # the main edge changes when the sets are merged
+        make_corefs(self.hg, concepts[3], concepts[4])
+        self.hg.add('(love/P you/C berlin/C)')
+        self.hg.add('(hate/P you/C berlin/C)')
+        self.hg.add('(see/P you/C berlin/C)')
+        make_corefs(self.hg, concepts[1], concepts[3])
+        for concept in (concepts[0], concepts[1], concepts[3], concepts[4]):
+            self.assertEqual(resolver.main_coref(concept), concepts[3])
+            self.assertEqual(resolver.main_coref(concept), main_coref(self.hg, concept))
+        self.assertEqual(resolver.main_coref_from_id(coref_id(self.hg, concepts[0])), concepts[3])
+
+    def test_read_only(self):
+        concepts = self.concepts
+
+        make_corefs(self.hg, concepts[0], concepts[1])
+        make_corefs(self.hg, concepts[3], concepts[4])
+        make_corefs(self.hg, concepts[0], concepts[3])
+        self.assertEqual(self.hg.coref_size(coref_id(self.hg, concepts[0])), 4)
+        # and a set as written by earlier versions
+        for concept in (concepts[2], concepts[5]):
+            self.hg.set_attribute(concept, coref_set_id_key, 'abc')
+        self.hg.add((coref_connector, concepts[2], concepts[5]), primary=False)
+        cref_id = coref_id(self.hg, concepts[0])
+        main_edge = main_coref(self.hg, concepts[0])
+        write_snapshot(self.hg, 'test_corefs.gbs')
+        self.hg.close()
+
+        for locator_string, kwargs in (('test_corefs.gbs', {}), ('test.db', {'profile': 'readonly'})):
+            hg = hgraph(locator_string, **kwargs)
+            resolver = MainCorefResolver(hg)
+            for concept in (concepts[0], concepts[1], concepts[3], concepts[4]):
+                self.assertEqual(coref_id(hg, concept), cref_id)
+                self.assertEqual(coref_set(hg, concept), {concepts[0], concepts[1], concepts[3], concepts[4]})
+                self.assertTrue(are_corefs(hg, concepts[1], concept))
+                self.assertEqual(main_coref(hg, concept), main_edge)
+                self.assertEqual(resolver.main_coref(concept), main_edge)
+            self.assertEqual(main_coref_from_id(hg, cref_id), main_edge)
+            self.assertEqual(coref_id(hg, concepts[5]), 'abc')
+            self.assertEqual(coref_set(hg, concepts[5]), {concepts[2], concepts[5]})
+            self.assertTrue(are_corefs(hg, concepts[2], concepts[5]))
+            self.assertFalse(are_corefs(hg, concepts[2], concepts[0]))
+            hg.close()
+        os.remove('test_corefs.gbs')
+        self.hg = hgraph('test.db')
+
 
 if __name__ == '__main__':
     unittest.main()
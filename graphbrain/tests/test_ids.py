@@ -0,0 +1,49 @@
+import unittest
+
+from graphbrain.memory.ids import decode_id, encode_id, split_ids
+
+
+class TestIds(unittest.TestCase):
+    def test_encode_id1(self):
+        self.assertEqual(encode_id(0), '@')
+
+    def test_encode_id2(self):
+        self.assertEqual(encode_id(62), '~')
+
+    def test_encode_id3(self):
+        self.assertEqual(encode_id(63), '\x02@')
+
+    def test_encode_id_negative(self):
+        with self.assertRaises(ValueError):
+            encode_id(-1)
+
+    def test_encode_decode(self):
+        for n in (0, 1, 62, 63, 64, 3968, 3969, 1000000, 15752960, 15752961, 10 ** 12):
+            self.assertEqual(decode_id(encode_id(n)), n)
+
+    def test_encoding_is_ascii(self):
+        for n in (0, 63, 10 ** 12):
+            self.assertEqual(len(encode_id(n).encode('utf-8')), len(encode_id(n)))
+
+    def test_decode_incomplete(self):
+        with self.assertRaises(ValueError):
+            decode_id('\x02')
+
+    def test_split_ids(self):
+        ids = (5, 100000, 63, 0)
+        self.assertEqual(split_ids(''.join(encode_id(n) for n in ids)), [encode_id(n) for n in ids])
+
+    def test_split_ids_empty(self):
+        self.assertEqual(split_ids(''), [])
+
+    def test_split_ids_incomplete(self):
+        with self.assertRaises(ValueError):
+            split_ids('@\x02')
+
+    def test_prefix(self):
+        self.assertTrue((encode_id(1) + encode_id(2)).startswith(encode_id(1)))
+        self.assertFalse(encode_id(63 * 5).startswith(encode_id(5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
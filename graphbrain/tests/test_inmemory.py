@@ -0,0 +1,93 @@
+import os
+import shutil
+import unittest
+
+from graphbrain import hedge, hgraph
+from graphbrain.tests.hypergraph import Hypergraph
+
+
+class TestInMemory(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test.mem'
+        super().setUp()
+
+    def test_private(self):
+        hg1 = hgraph(':memory:')
+        hg2 = hgraph(':memory:')
+        hg1.add('(is/P graphbrain/C great/C)')
+        self.assertTrue(hg1.exists('(is/P graphbrain/C great/C)'))
+        self.assertFalse(hg2.exists('(is/P graphbrain/C great/C)'))
+
+    def test_shared(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.close()
+        self.hg = hgraph(self.hg_str)
+        self.assertTrue(self.hg.exists('(is/P graphbrain/C great/C)'))
+
+    def test_remove_while_iterating(self):
+        self.hg.destroy()
+        for i in range(3000):
+            self.hg.add('(is/P {}/C number/C)'.format(i))
+        self.hg.remove_by_pattern('(is/P * number/C)')
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 0)
+
+    def _test_save_load(self, locator_string):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.add('(says/P mary/C (is/P graphbrain/C great/C))')
+        self.hg.set_attribute('mary/C', 'foo', 'bar')
+        expected = set((edge, str(attributes)) for edge, attributes in self.hg.all_attributes())
+        self.hg.save(locator_string)
+        self.hg.destroy()
+        self.hg.load(locator_string)
+        result = set((edge, str(attributes)) for edge, attributes in self.hg.all_attributes())
+        self.assertEqual(result, expected)
+        self.assertEqual(list(self.hg.search('(says/P * (is/P * *))')),
+                         [hedge('(says/P mary/C (is/P graphbrain/C great/C))')])
+        hg = hgraph(locator_string)
+        self.assertEqual(list(hg.star('mary/C')), [hedge('(says/P mary/C (is/P graphbrain/C great/C))')])
+        hg.destroy()
+        hg.close()
+
+    def test_save_load_sqlite(self):
+        self._test_save_load('test_snapshot.db')
+        os.remove('test_snapshot.db')
+
+    def test_save_load_leveldb(self):
+        self._test_save_load('test_snapshot.hg')
+        shutil.rmtree('test_snapshot.hg')
+
+
+class TestInMemoryIndexPositions1(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_index1.mem'
+        self.hg = hgraph(self.hg_str, index_positions=1)
+
+    def test_index_positions(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.assertEqual(len(self.hg.store.p), 3)
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, index_positions=2)
+
+
+class TestInMemoryIndexPositions2(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_index2.mem'
+        self.hg = hgraph(self.hg_str, index_positions=2)
+
+    def test_index_positions(self):
+        self.hg.destroy()
+        self.hg.add('(says/P mary/C (is/P graphbrain/C great/C) today/C)')
+        self.assertEqual(len(self.hg.store.p), 12 + 6)
+
+
+class TestInMemoryIdsIndexPositions(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_ids_index1.mem'
+        self.hg = hgraph(self.hg_str, encoding='ids', index_positions=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
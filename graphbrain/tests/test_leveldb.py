@@ -1,5 +1,6 @@
 import unittest
 
+from graphbrain import hedge, hgraph, hopen
 from graphbrain.tests.hypergraph import Hypergraph
 
 
@@ -7,3 +8,42 @@ class TestLevelDB(Hypergraph, unittest.TestCase):
     def setUp(self):
         self.hg_str = 'test.hg'
         super().setUp()
+
+    def test_transaction_is_atomic(self):
+        self.hg.destroy()
+        self.hg.begin_transaction()
+        self.hg.batch_mode = True
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.assertTrue(self.hg.exists('(is/P graphbrain/C great/C)'))
+        self.assertIsNone(self.hg.db.get(self.hg._edge2key(hedge('(is/P graphbrain/C great/C)'))))
+        self.hg.batch_mode = False
+        self.hg.end_transaction()
+        self.assertIsNotNone(self.hg.db.get(self.hg._edge2key(hedge('(is/P graphbrain/C great/C)'))))
+
+    def test_no_flush_threshold(self):
+        self.hg.destroy()
+        self.hg.begin_transaction()
+        for i in range(20):
+            self.hg.add('(is/P {}/C number/C)'.format(i))
+        self.assertIsNone(self.hg.db.get(self.hg._edge2key(hedge('(is/P 0/C number/C)'))))
+        self.hg.end_transaction()
+        self.assertIsNotNone(self.hg.db.get(self.hg._edge2key(hedge('(is/P 0/C number/C)'))))
+
+    def test_flush_threshold(self):
+        self.hg.destroy()
+        self.hg.close()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(20)]
+        with hopen(self.hg_str, flush_threshold=10) as hg:
+            for edge in edges:
+                hg.add(edge)
+                self.assertLess(len(hg.pending), 10)
+            self.assertEqual(hg.count('(is/P * number/C)'), 20)
+        self.hg = hgraph(self.hg_str, sync=True)
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 20)
+        self.assertEqual(self.hg.degree('number/C'), 20)
+
+
+class TestLevelDBIds(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_ids.hg'
+        self.hg = hgraph(self.hg_str, encoding='ids')
@@ -1,5 +1,7 @@
+import itertools
 import unittest
 
+from graphbrain.hyperedge import hedge, Atom, Hyperedge
 from graphbrain.memory.permutations import *
 
 
@@ -226,5 +228,54 @@ class TestPermutations(unittest.TestCase):
         self.assertEqual(str_plus_1('zzz'), 'zz{')
 
 
+    def test_first_permutation_unordered(self):
+        for positions in ((2, 0), (3, 1, 0), (1, 3)):
+            nper = first_permutation(4, positions)
+            self.assertEqual(tuple(nthperm(4, nper)[:len(positions)]), positions)
+
+    def test_permutation_numbers_full(self):
+        self.assertEqual(list(permutation_numbers(3)), list(range(6)))
+
+    def test_permutation_numbers_positions(self):
+        numbers = permutation_numbers(4, 1)
+        self.assertEqual(len(numbers), 4)
+        for position in range(4):
+            self.assertIn(first_permutation(4, (position,)), numbers)
+        self.assertEqual(len(permutation_numbers(4, 2)), 12)
+        self.assertEqual(len(permutation_numbers(4, 3)), 24)
+        self.assertEqual(len(permutation_numbers(2, 5)), 2)
+
+
+    def test_nthperm_lexicographic(self):
+        for n in range(1, 7):
+            for nper, perm in enumerate(itertools.permutations(range(n))):
+                self.assertEqual(nthperm(n, nper), perm)
+
+    def test_nthperm_large(self):
+        self.assertEqual(nthperm(25, 1), tuple(range(23)) + (24, 23))
+
+    def test_do_with_edge_permutations_complex(self):
+        edge = hedge('(is/Pd.sc (my/M name/Cn.s) mary/Cp.s)')
+        perms = []
+        do_with_edge_permutations(edge, perms.append)
+        self.assertEqual(perms[0], 'is/Pd.sc (my/M name/Cn.s) mary/Cp.s 0')
+        self.assertEqual(perms[3], '(my/M name/Cn.s) mary/Cp.s is/Pd.sc 3')
+        self.assertEqual(len(perms), 6)
+        for perm in perms:
+            self.assertEqual(perm2edge(perm), edge)
+
+    def test_decode_permutation(self):
+        edge, nper = decode_permutation('(my/M name/Cn.s) mary/Cp.s is/Pd.sc 3')
+        self.assertEqual(edge, hedge('(is/Pd.sc (my/M name/Cn.s) mary/Cp.s)'))
+        self.assertEqual(nper, 3)
+        self.assertEqual(type(edge[1]), Hyperedge)
+        self.assertEqual(type(edge[2]), Atom)
+
+    def test_decode_permutation_invalid(self):
+        self.assertIsNone(decode_permutation('a b c x'))
+        self.assertIsNone(decode_permutation('a b c 6'))
+        self.assertIsNone(decode_permutation('0'))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+import json
+import os
+import unittest
+
+from graphbrain import hedge, hgraph, hopen
+from graphbrain.memory.sharded import MANIFEST, shard_index
+from graphbrain.tests.hypergraph import Hypergraph
+
+
+class TestSharded(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test.shards'
+        self.hg = hgraph(self.hg_str, shards=3)
+
+    def test_shards(self):
+        self.hg.destroy()
+        edges = [hedge('(is/P {}/C number/C)'.format(i)) for i in range(30)]
+        self.hg.add_many(edges)
+        counts = [len(list(shard.all())) for shard in self.hg.shards]
+        self.assertEqual(len(counts), 3)
+        self.assertEqual(sum(counts), len(edges))
+        self.assertTrue(all(count > 0 for count in counts))
+        for edge in edges:
+            i = shard_index(edge.to_str(), 3)
+            self.assertTrue(self.hg.shards[i].exists(edge))
+        # the permutations of every edge are in its shard
+        for shard, count in zip(self.hg.shards, counts):
+            self.assertEqual(len(list(shard._permutations_with_prefix('number/C'))), 2 * count)
+        # and the atoms are in the atom shard
+        self.assertEqual(len(list(self.hg.atom_shard.all())), 32)
+        self.assertTrue(self.hg.atom_shard.exists('number/C'))
+        self.assertEqual(len(list(self.hg.all())), len(edges) + 32)
+        self.assertEqual(self.hg.degree('number/C'), 30)
+        self.assertEqual(set(self.hg.atoms_with_root('number')), {hedge('number/C')})
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 30)
+
+    def test_sorted(self):
+        self.hg.destroy()
+        for i in range(30):
+            self.hg.add('(is/P {}/C number/C)'.format(i))
+        edges = [edge.to_str() for edge in self.hg.all()]
+        self.assertEqual(edges, sorted(edges))
+
+    def test_batch(self):
+        self.hg.destroy()
+        self.hg.close()
+        with hopen(self.hg_str) as hg:
+            for i in range(30):
+                hg.add('(is/P {}/C number/C)'.format(i))
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 30)
+        self.assertEqual(self.hg.deep_degree('number/C'), 30)
+
+    def test_manifest(self):
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, shards=4)
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, shard_backend='hg')
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, workers=2)
+        self.assertEqual(self.hg.workers, 1)
+
+    def test_earlier_layout(self):
+        self.hg.close()
+        path = os.path.join(self.hg_str, MANIFEST)
+        with open(path) as f:
+            manifest = json.load(f)
+        del manifest['version']
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str)
+        manifest['version'] = 2
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        self.hg = hgraph(self.hg_str)
+
+
+class TestShardedIds(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_ids.shards'
+        self.hg = hgraph(self.hg_str, shards=2, encoding='ids')
+
+
+class TestShardedLevelDBWorkers(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_hg.shards'
+        self.hg = hgraph(self.hg_str, shards=3, shard_backend='hg', workers=2)
+
+    def test_default_workers(self):
+        self.hg.close()
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(self.hg.workers, min(4, os.cpu_count()))
+
+    def test_prefetch(self):
+        self.hg.destroy()
+        for i in range(2500):
+            self.hg.add('(is/P {}/C number/C)'.format(i))
+        self.assertEqual(self.hg.count('(is/P * number/C)'), 2500)
+        edges = [edge.to_str() for edge in self.hg.search('(is/P * number/C)')]
+        self.assertEqual(edges, sorted(edges))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import unittest
+
+from graphbrain import hedge, hgraph
+from graphbrain.memory.snapshot import write_snapshot
+
+
+EDGES = ['(is/Pd.sc graphbrain/Cp.s great/C)',
+         '(is/Pd.sc graphbrain/Cp.s fast/C)',
+         '(says/Pd.sr mary/Cp.s (is/Pd.sc graphbrain/Cp.s great/C))',
+         '(says/Pd.sr john/Cp.s (is/Pd.sc (the/Md sky/Cc.s) blue/Ca))',
+         '(src/P (is/Pd.sc graphbrain/Cp.s fast/C) (+/B.am my/M test/Cc.s))']
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.source = hgraph(':memory:')
+        for edge in EDGES:
+            self.source.add(edge)
+        self.source.add('(is/Pd.sc graphbrain/Cp.s open/C)', primary=False)
+        self.source.set_attribute('mary/Cp.s', 'text', 'Mary')
+        self.source.set_attribute('sky/Cc.s', 'weight', 0.5)
+        self.source.set_attribute('john/Cp.s', 'd', 'x')
+        write_snapshot(self.source, 'test.gbs')
+        self.hg = hgraph('test.gbs')
+
+    def tearDown(self):
+        self.hg.close()
+        os.remove('test.gbs')
+
+    def test_all(self):
+        self.assertEqual(set(self.hg.all()), set(self.source.all()))
+        self.assertEqual({edge.to_str(): attributes for edge, attributes in self.hg.all_attributes()},
+                         {edge.to_str(): attributes for edge, attributes in self.source.all_attributes()})
+
+    def test_exists(self):
+        self.assertTrue(self.hg.exists('(is/Pd.sc graphbrain/Cp.s open/C)'))
+        self.assertTrue(self.hg.exists('sky/Cc.s'))
+        self.assertFalse(self.hg.exists('(is/Pd.sc graphbrain/Cp.s slow/C)'))
+        self.assertFalse(self.hg.exists('graph/Cp.s'))
+
+    def test_search(self):
+        for pattern in ('(is/Pd.sc * *)', '(is/Pd.sc graphbrain/Cp.s *)', '(* * great/C)',
+                        '(says/Pd.sr * (is/Pd.sc ...))', '(is/Pd.sc graphbrain/Cp.s great/C)', '(*/P * *)',
+                        '(is/P * *)', '*'):
+            self.assertEqual(set(self.hg.search(pattern)), set(self.source.search(pattern)))
+            self.assertEqual(set(self.hg.search(pattern, strict=True)), set(self.source.search(pattern, strict=True)))
+            self.assertEqual(self.hg.count(pattern), self.source.count(pattern))
+
+    def test_match(self):
+        pattern = '(says/Pd.sr *SPEAKER (is/Pd.sc ...))'
+        self.assertEqual(sorted(self.hg.match(pattern)), sorted(self.source.match(pattern)))
+
+    def test_star(self):
+        for center in ('graphbrain/Cp.s', '(is/Pd.sc graphbrain/Cp.s great/C)', 'nothing/C'):
+            self.assertEqual(set(self.hg.star(center)), set(self.source.star(center)))
+
+    def test_edges_with_edges(self):
+        edges = [hedge('graphbrain/Cp.s'), hedge('is/Pd.sc')]
+        self.assertEqual(set(self.hg.edges_with_edges(edges)), set(self.source.edges_with_edges(edges)))
+        self.assertEqual(set(self.hg.edges_with_edges(edges, 'great')), {hedge(EDGES[0])})
+
+    def test_attributes(self):
+        for edge in ('graphbrain/Cp.s', 'is/Pd.sc', '(is/Pd.sc graphbrain/Cp.s great/C)', 'nothing/C'):
+            self.assertEqual(self.hg.degree(edge), self.source.degree(edge))
+            self.assertEqual(self.hg.deep_degree(edge), self.source.deep_degree(edge))
+            self.assertEqual(self.hg.is_primary(edge), self.source.is_primary(edge))
+        self.assertEqual(self.hg.get_str_attribute('mary/Cp.s', 'text'), 'Mary')
+        self.assertEqual(self.hg.get_float_attribute('sky/Cc.s', 'weight'), 0.5)
+        self.assertEqual(self.hg.get_str_attribute('john/Cp.s', 'd'), 'x')
+        self.assertEqual(self.hg.get_int_attribute('nothing/C', 'd', 7), 7)
+
+    def test_options(self):
+        self.assertEqual(self.hg.options['encoding'], 'ids')
+        with self.assertRaises(RuntimeError):
+            hgraph('test.gbs', encoding='text')
+
+    def test_index_positions(self):
+        source = hgraph(':memory:', index_positions=1)
+        for edge in EDGES:
+            source.add(edge)
+        write_snapshot(source, 'test_index1.gbs')
+        hg = hgraph('test_index1.gbs')
+        self.assertEqual(hg.options['index_positions'], 1)
+        self.assertEqual(len(hg.perm_table), len(source.store.p))
+        pattern = '(is/Pd.sc graphbrain/Cp.s *)'
+        self.assertEqual(set(hg.search(pattern, strict=True)), set(source.search(pattern, strict=True)))
+        hg.close()
+        os.remove('test_index1.gbs')
+
+    def test_sorted_runs(self):
+        files = set(os.listdir('.'))
+        write_snapshot(self.source, 'test_runs.gbs', run_size=5)
+        self.assertEqual(set(os.listdir('.')), files | {'test_runs.gbs'})
+        hg = hgraph('test_runs.gbs')
+        self.assertEqual(list(hg.perm_table.with_prefix(b'')), list(self.hg.perm_table.with_prefix(b'')))
+        pattern = '(is/Pd.sc graphbrain/Cp.s *)'
+        self.assertEqual(set(hg.search(pattern)), set(self.source.search(pattern)))
+        hg.close()
+        os.remove('test_runs.gbs')
+
+    def test_read_only(self):
+        with self.assertRaises(RuntimeError):
+            self.hg.add('(is/Pd.sc graphbrain/Cp.s slow/C)')
+        with self.assertRaises(RuntimeError):
+            self.hg.set_attribute('mary/Cp.s', 'text', 'Mary')
+        with self.assertRaises(RuntimeError):
+            self.hg.remove(EDGES[0])
+        with self.assertRaises(RuntimeError):
+            self.hg.destroy()
+
+    def test_not_a_snapshot(self):
+        with open('test_invalid.gbs', 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(RuntimeError):
+            hgraph('test_invalid.gbs')
+        os.remove('test_invalid.gbs')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import os
+import sqlite3
+import threading
 import unittest
 
+import graphbrain.constants as const
+from graphbrain import hedge, hgraph
+from graphbrain.memory.sqlite import SCHEMA_VERSION, SQLite
 from graphbrain.tests.hypergraph import Hypergraph
 
 
@@ -7,3 +13,238 @@ class TestSQLite(Hypergraph, unittest.TestCase):
     def setUp(self):
         self.hg_str = 'test.db'
         super().setUp()
+
+    def test_schema(self):
+        version = self.hg.conn.execute('PRAGMA user_version').fetchone()[0]
+        self.assertEqual(version, SCHEMA_VERSION)
+        for table in ('v', 'p', 'x'):
+            sql = self.hg.conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+            self.assertIn('WITHOUT ROWID', sql)
+
+    def test_profile_bulk(self):
+        self.hg.close()
+        self.hg = hgraph(self.hg_str, profile='bulk')
+        self.hg.destroy()
+        self.assertEqual(self.hg.conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(self.hg.conn.execute('PRAGMA synchronous').fetchone()[0], 0)
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.assertTrue(self.hg.exists('(is/P graphbrain/C great/C)'))
+
+    def test_profile_readonly(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.close()
+        self.hg = hgraph(self.hg_str, profile='readonly')
+        self.assertEqual(list(self.hg.search('(is/P * great/C)')), [hedge('(is/P graphbrain/C great/C)')])
+        with self.assertRaises(sqlite3.OperationalError):
+            self.hg.add('(is/P graphbrain/C fast/C)')
+
+    def test_edges_with_edges_index_positions(self):
+        edges = [hedge('(is/P graphbrain/C great/C great/M)'), hedge('(is/P graphbrain/C great/C)'),
+                 hedge('(says/P mary/C (is/P graphbrain/C great/C) today/C)')]
+        queries = (([hedge('graphbrain/C')], None), ([hedge('graphbrain/C')], 'great'),
+                   ([hedge('is/P'), hedge('graphbrain/C')], 'great'), ([hedge('mary/C')], 'today'),
+                   ([hedge('(is/P graphbrain/C great/C)')], 'says'))
+        results = []
+        for locator_string, index_positions in (('test_positions.db', None), ('test_positions1.db', 1),
+                                                ('test_positions2.db', 2)):
+            hg = hgraph(locator_string, index_positions=index_positions)
+            hg.destroy()
+            for edge in edges:
+                hg.add(edge)
+            results.append([sorted(edge.to_str() for edge in hg.edges_with_edges(items, root))
+                            for items, root in queries])
+            hg.close()
+            os.remove(locator_string)
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[2], results[0])
+        self.assertEqual(results[0][1], sorted(edge.to_str() for edge in edges[:2]))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, profile='xpto')
+
+    def test_migration(self):
+        # create database and convert it to the original schema
+        legacy_str = 'test_legacy.db'
+        hg = hgraph(legacy_str)
+        hg.destroy()
+        hg.add('(is/P graphbrain/C great/C)')
+        hg.add_to_sequence('test_seq', '(is/P graphbrain/C great/C)')
+        hg.add((const.lemma_connector, 'is/P', 'be/P'), primary=False)
+        hg.add((const.type_of_connector, 'graphbrain/C', 'software/C'), primary=False)
+        hg.close()
+        conn = sqlite3.connect(legacy_str)
+        for table, columns in (('v', 'key TEXT PRIMARY KEY, value TEXT'), ('p', 'key TEXT PRIMARY KEY')):
+            conn.execute('CREATE TABLE old_{} ({})'.format(table, columns))
+            conn.execute('INSERT INTO old_{0} SELECT * FROM {0}'.format(table))
+            conn.execute('DROP TABLE {}'.format(table))
+            conn.execute('ALTER TABLE old_{0} RENAME TO {0}'.format(table))
+        conn.execute('DROP TABLE x')
+        conn.execute('PRAGMA user_version = 0')
+        conn.commit()
+        conn.close()
+
+        hg = hgraph(legacy_str)
+        self.assertEqual(hg.conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+        sql = hg.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'p'").fetchone()[0]
+        self.assertIn('WITHOUT ROWID', sql)
+        self.assertEqual(list(hg.search('(is/P * great/C)')), [hedge('(is/P graphbrain/C great/C)')])
+        self.assertEqual(hg.degree('graphbrain/C'), 1)
+        # statistics are not available until they are recomputed
+        self.assertFalse(hg.explain('(is/P * great/C)')['statistics'])
+        self.assertEqual(hg.recompute_statistics(), 5)
+        self.assertEqual(hg.explain('(is/P * great/C)')['rows'], 1)
+        # sequences are searched until their index is recomputed
+        self.assertFalse(hg.has_sequence_index)
+        self.assertEqual(list(hg.sequence('test_seq')), [hedge('(is/P graphbrain/C great/C)')])
+        self.assertEqual(hg.recompute_sequence_index(), 1)
+        self.assertEqual(list(hg.sequence('test_seq')), [hedge('(is/P graphbrain/C great/C)')])
+        # as are lemmas
+        self.assertFalse(hg.has_lemma_index)
+        self.assertEqual(hg.lemma_of(['is/P.sc']), [hedge('be/P')])
+        self.assertEqual(hg.recompute_lemma_index(), 1)
+        self.assertEqual(hg.lemma_of(['is/P.sc']), [hedge('be/P')])
+        # and type-of relations
+        self.assertFalse(hg.has_type_index)
+        self.assertTrue(hg.is_type_of('graphbrain/C', 'software/C'))
+        self.assertEqual(hg.recompute_type_index(), 1)
+        self.assertEqual(hg.supertypes('graphbrain/C', deep=True), {hedge('software/C'): 1})
+        hg.close()
+        os.remove(legacy_str)
+
+
+class TestSQLiteIds(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_ids.db'
+        self.hg = hgraph(self.hg_str, encoding='ids')
+
+    def test_encoding(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.close()
+        self.hg = hgraph(self.hg_str)
+        self.assertEqual(self.hg.options['encoding'], 'ids')
+        for (key,) in self.hg.conn.execute('SELECT key FROM p'):
+            self.assertNotIn('graphbrain', key)
+        self.assertEqual(list(self.hg.star('graphbrain/C')), [hedge('(is/P graphbrain/C great/C)')])
+        with self.assertRaises(RuntimeError):
+            hgraph(self.hg_str, encoding='text')
+
+    def test_encoding_on_existing_hypergraph(self):
+        hg = hgraph('test.db')
+        hg.destroy()
+        hg.add('(is/P graphbrain/C great/C)')
+        hg.close()
+        with self.assertRaises(RuntimeError):
+            hgraph('test.db', encoding='ids')
+
+
+class TestSQLiteReaders(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_readers.db'
+        self.hg = hgraph(self.hg_str, readers=2)
+
+    def _in_threads(self, f, n=4):
+        """Runs f in n threads, and returns their results."""
+        results = [None] * n
+
+        def run(i):
+            try:
+                results[i] = f()
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_wal(self):
+        self.assertEqual(self.hg.conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_concurrent_reads(self):
+        self.hg.destroy()
+        for i in range(20):
+            self.hg.add('(is/P {}/C number/C)'.format(i))
+
+        def query():
+            edges = list(self.hg.search('(is/P * number/C)'))
+            return len(edges), self.hg.degree('number/C'), len(list(self.hg.all()))
+
+        self.assertEqual(self._in_threads(query), [(20, 20, 42)] * 4)
+        self.assertLessEqual(self.hg.pool_connections, 2)
+
+    def test_nested_reads(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.add('(says/P mary/C (is/P graphbrain/C great/C))')
+        self.hg.close()
+        self.hg = hgraph(self.hg_str, readers=1)
+
+        def query():
+            return [edge.to_str() for edge in self.hg.search('(says/P * (is/P ...))')
+                    if self.hg.exists(edge[2]) and len(list(self.hg.star(edge[2]))) > 0]
+
+        self.assertEqual(self._in_threads(query), [['(says/P mary/C (is/P graphbrain/C great/C))']] * 4)
+        self.assertEqual(self.hg.pool_connections, 1)
+
+    def test_read_while_writing(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.hg.begin_transaction()
+        self.hg.batch_mode = True
+        self.hg.add('(is/P graphbrain/C fast/C)')
+        self.hg.flush()
+        self.assertEqual(self.hg.degree('graphbrain/C'), 2)
+        # readers only see committed writes
+        self.assertEqual(self._in_threads(lambda: self.hg.degree('graphbrain/C')), [1] * 4)
+        self.hg.batch_mode = False
+        self.hg.end_transaction()
+        self.assertEqual(self._in_threads(lambda: self.hg.degree('graphbrain/C')), [2] * 4)
+
+    def test_memory(self):
+        with self.assertRaises(RuntimeError):
+            SQLite(':memory:', readers=2)
+
+
+class TestSQLiteAttributeCache(Hypergraph, unittest.TestCase):
+    def setUp(self):
+        self.hg_str = 'test_cache.db'
+        # small cache, so that evictions are also exercised by the suite
+        self.hg = hgraph(self.hg_str, attribute_cache_size=10)
+
+    def tearDown(self):
+        self.hg.close()
+        os.remove(self.hg_str)
+
+    def test_attribute_cache_info(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.assertEqual(self.hg.degree('graphbrain/C'), 1)
+        info = self.hg.attribute_cache_info()
+        hits = info['hits']
+        self.assertEqual(self.hg.degree('graphbrain/C'), 1)
+        self.assertEqual(self.hg.attribute_cache_info()['hits'], hits + 1)
+        self.assertEqual(info['maxsize'], 10)
+        self.assertLessEqual(info['size'], 10)
+        hg2 = hgraph('test.db')
+        self.assertIsNone(hg2.attribute_cache_info())
+        hg2.close()
+
+    def test_attribute_cache_write_through(self):
+        self.hg.destroy()
+        self.hg.add('(is/P graphbrain/C great/C)')
+        self.assertEqual(self.hg.degree('graphbrain/C'), 1)
+        self.hg.add('(is/P graphbrain/C fast/C)')
+        self.assertEqual(self.hg.degree('graphbrain/C'), 2)
+        self.hg.set_attribute('graphbrain/C', 'label', 'gb')
+        self.assertEqual(self.hg.get_str_attribute('graphbrain/C', 'label'), 'gb')
+        self.hg.remove('(is/P graphbrain/C fast/C)')
+        self.assertEqual(self.hg.degree('graphbrain/C'), 1)
+        self.assertFalse(self.hg.exists('(is/P graphbrain/C fast/C)'))
+        self.hg.destroy()
+        self.assertFalse(self.hg.exists('graphbrain/C'))
+        self.assertEqual(self.hg.degree('graphbrain/C'), 0)
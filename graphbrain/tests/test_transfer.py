@@ -0,0 +1,100 @@
+import gzip
+import os
+import unittest
+
+from graphbrain import hedge, hgraph
+from graphbrain.memory import transfer
+from graphbrain.memory.transfer import export_hypergraph, import_hypergraph
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        self.hg = hgraph(':memory:')
+        for i in range(25):
+            self.hg.add('(is/P number{}/C (of/B type/C {}/C))'.format(i, i % 3))
+        self.hg.set_attribute('number1/C', 'text', 'one')
+        self.hg.set_attribute('number2/C', 'weight', 0.5)
+        self.chunk_size = transfer.CHUNK_SIZE
+        # small chunks, so that multiple chunks are written and read
+        transfer.CHUNK_SIZE = 10
+
+    def tearDown(self):
+        transfer.CHUNK_SIZE = self.chunk_size
+        for path in ('test_export.jsonl', 'test_export.jsonl.gz'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _attributes(self, hg):
+        return {edge.to_str(): attributes for edge, attributes in hg.all_attributes()}
+
+    def _test_roundtrip(self, path, workers):
+        n = export_hypergraph(self.hg, path, workers=workers)
+        self.assertEqual(n, len(list(self.hg.all())))
+        hg = hgraph(':memory:')
+        self.assertEqual(import_hypergraph(hg, path, workers=workers), (n, _uncompressed_size(path)))
+        self.assertEqual(self._attributes(hg), self._attributes(self.hg))
+        self.assertEqual(hg.deep_degree('type/C'), 25)
+        self.assertEqual(list(hg.search('(is/P number1/C *)')), [hedge('(is/P number1/C (of/B type/C 1/C))')])
+
+    def test_roundtrip(self):
+        self._test_roundtrip('test_export.jsonl', 1)
+
+    def test_roundtrip_gzip(self):
+        self._test_roundtrip('test_export.jsonl.gz', 1)
+        with gzip.open('test_export.jsonl.gz', 'rt') as f:
+            self.assertEqual(len(f.readlines()), len(list(self.hg.all())))
+
+    def test_roundtrip_workers(self):
+        self._test_roundtrip('test_export.jsonl.gz', 2)
+
+    def test_resume(self):
+        n = export_hypergraph(self.hg, 'test_export.jsonl.gz')
+        offsets = []
+
+        def interrupt(edges, offset, position):
+            offsets.append(offset)
+            if len(offsets) == 2:
+                raise KeyboardInterrupt()
+
+        hg = hgraph(':memory:')
+        with self.assertRaises(KeyboardInterrupt):
+            import_hypergraph(hg, 'test_export.jsonl.gz', progress=interrupt)
+        self.assertEqual(len(list(hg.all())), 20)
+        m, _ = import_hypergraph(hg, 'test_export.jsonl.gz', offset=offsets[-1])
+        self.assertEqual(m, n - 20)
+        self.assertEqual(self._attributes(hg), self._attributes(self.hg))
+
+    def test_invalid_line(self):
+        export_hypergraph(self.hg, 'test_export.jsonl')
+        with open('test_export.jsonl', 'a') as f:
+            f.write('["(is/P", {}]\n')
+        hg = hgraph(':memory:')
+        with self.assertRaises(ValueError):
+            import_hypergraph(hg, 'test_export.jsonl')
+        self.assertEqual(len(list(hg.all())), 50)
+
+    def test_zstd(self):
+        try:
+            import zstandard
+        except ImportError:
+            with self.assertRaises(RuntimeError):
+                export_hypergraph(self.hg, 'test_export.jsonl.zst')
+            return
+        self._test_roundtrip('test_export.jsonl.zst', 2)
+        os.remove('test_export.jsonl.zst')
+
+
+def _uncompressed_size(path):
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return len(f.read())
+    elif path.endswith('.zst'):
+        import zstandard
+        with open(path, 'rb') as f:
+            with zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True) as reader:
+                return len(reader.read())
+    return os.path.getsize(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,34 @@
+"""Coreference sets.
+
+Coreferences are recorded in the hypergraph as (_coref edge1 edge2) edges.
+Every member of a set has the identifier of the set in its 'coref'
+attribute, and the hypergraph also records the members and the size of each
+set (see Hypergraph.coref_members()), so that sets can be found, compared
+and merged without traversing the _coref edges.
+
+Sets are merged by giving the members of the smaller set the identifier of
+the larger one, so each edge changes identifier at most log2(n) times over n
+merges. Sets created by earlier versions, whose members are not recorded,
+are recorded when they are merged with another set, and read by following
+their _coref edges until then. Functions that only read coreferences never
+write to the hypergraph, so they can be used with read-only hypergraphs.
+
+The main edge of each set is recorded with a (_main_coref id edge) edge. To
+resolve many edges to their main edges, MainCorefResolver keeps these in
+memory.
+"""
 import random
 import string
+import weakref
 
 from graphbrain import hedge
 from graphbrain.constants import coref_connector, coref_set_id_key, main_coref_connector
 
 
+# resolvers to update when the main edge of a set changes
+_resolvers = weakref.WeakSet()
+
+
 def _new_coref_id():
     chars = string.ascii_lowercase + string.digits
     # Note: the size of the id can be increased to reduce the probability
@@ -12,22 +36,65 @@ def _new_coref_id():
     return ''.join(random.choice(chars) for _ in range(7))
 
 
-def _set_coref_id(hg, edge, new_coref_id):
-    hg.set_attribute(edge, coref_set_id_key, new_coref_id)
-
-
-def _change_coref_id(hg, edge, new_coref_id):
-    for coref in coref_set(hg, edge):
-        _set_coref_id(hg, coref, new_coref_id)
-
+def _linked_corefs(hg, edge):
+    """Returns the list of edges connected to the given one by _coref edges,
+    directly or not, starting with the edge itself."""
+    corefs = [edge]
+    seen = {edge}
+    i = 0
+    while i < len(corefs):
+        for coref_edge in hg.edges_with_edges((hedge(coref_connector), corefs[i])):
+            if len(coref_edge) == 3 and coref_edge[0].to_str() == coref_connector:
+                for item in coref_edge[1:]:
+                    if item not in seen:
+                        seen.add(item)
+                        corefs.append(item)
+        i += 1
+    return corefs
 
-def _update_main_coref(hg, edge):
-    cref_id = coref_id(hg, edge)
-    corefs = coref_set(hg, edge)
 
+def _set_size(hg, edge, cref_id):
+    """Returns the size of the coreference set of the edge, recording its
+    members first if it was created by an earlier version."""
+    if cref_id is None:
+        return 1
+    size = hg.coref_size(cref_id)
+    if size is None:
+        size = hg.add_coref_members(cref_id, _linked_corefs(hg, edge))
+    return size
+
+
+def _union(hg, edge1, edge2):
+    """Merges the coreference sets of the two edges, creating them if
+    needed. The identifier of the larger set is kept (or the one of the set
+    of edge1, if they have the same size). Returns the identifier of the
+    merged set, and False if the edges were already in the same set, True
+    otherwise."""
+    cref_id1 = coref_id(hg, edge1)
+    cref_id2 = coref_id(hg, edge2)
+    if cref_id1 is not None and cref_id1 == cref_id2:
+        return cref_id1, False
+    size1 = _set_size(hg, edge1, cref_id1)
+    size2 = _set_size(hg, edge2, cref_id2)
+    if cref_id1 is None or (cref_id2 is not None and size2 > size1):
+        edge1, cref_id1, edge2, cref_id2 = edge2, cref_id2, edge1, cref_id1
+    members = [edge2] if cref_id2 is None else list(hg.coref_members(cref_id2))
+    if cref_id1 is None:
+        # neither edge belongs to a set
+        cref_id1 = _new_coref_id()
+        members.append(edge1)
+    for member in members:
+        hg.set_attribute(member, coref_set_id_key, cref_id1)
+    hg.add_coref_members(cref_id1, members)
+    if cref_id2 is not None:
+        hg.remove_coref_set(cref_id2)
+    return cref_id1, True
+
+
+def _update_main_coref(hg, cref_id):
     best_coref = None
     best_degree = -1
-    for coref in corefs:
+    for coref in hg.coref_members(cref_id):
         d = hg.degree(coref)
         if d > best_degree:
             best_degree = d
@@ -39,35 +106,25 @@ def _update_main_coref(hg, edge):
         for old_edge in old:
             hg.remove(old_edge)
         hg.add(coref_edge, primary=False)
+        for resolver in _resolvers:
+            if resolver.hg is hg:
+                resolver.main_corefs[cref_id] = best_coref
 
 
-def coref_set(hg, edge, corefs=None):
+def coref_set(hg, edge):
     """Returns the set of coreferences that the given edge belongs to."""
-    if corefs is None:
-        corefs = {edge}
-    for coref_edge in hg.edges_with_edges((hedge(coref_connector), edge)):
-        if len(coref_edge) == 3 and coref_edge[0].to_str() == coref_connector:
-            for item in coref_edge[1:]:
-                if item not in corefs:
-                    corefs.add(item)
-                    coref_set(hg, item, corefs)
-    return corefs
+    cref_id = coref_id(hg, edge)
+    if cref_id is None:
+        return {edge}
+    if hg.coref_size(cref_id) is None:
+        return set(_linked_corefs(hg, edge))
+    return set(hg.coref_members(cref_id))
 
 
-def are_corefs(hg, edge1, edge2, corefs=None):
+def are_corefs(hg, edge1, edge2):
     """Checks if the two given edges are coreferences."""
-    if corefs is None:
-        corefs = {edge1}
-    for coref_edge in hg.edges_with_edges((hedge(coref_connector), edge1)):
-        if len(coref_edge) == 3 and coref_edge[0].to_str() == coref_connector:
-            for item in coref_edge[1:]:
-                if item not in corefs:
-                    if item == edge2:
-                        return True
-                    corefs.add(item)
-                    if are_corefs(hg, item, edge2, corefs):
-                        return True
-    return False
+    cref_id = coref_id(hg, edge1)
+    return cref_id is not None and cref_id == coref_id(hg, edge2)
 
 
 def coref_id(hg, edge):
@@ -99,33 +156,44 @@ def make_corefs(hg, edge1, edge2):
     merging existing coreference sets and recomputing the main edge of
     a coreference set.
     """
-    cref_id_1 = coref_id(hg, edge1)
-    cref_id_2 = coref_id(hg, edge2)
-
-    if cref_id_1 is None:
-        if cref_id_2 is None:
-            new_cref_id = _new_coref_id()
-        else:
-            new_cref_id = cref_id_2
-    elif cref_id_2 is None:
-        new_cref_id = cref_id_1
-    else:
-        count1 = len(coref_set(hg, edge1))
-        count2 = len(coref_set(hg, edge2))
-        if count2 > count1:
-            new_cref_id = cref_id_2
-        else:
-            new_cref_id = cref_id_1
-
-    update = False
-    if cref_id_1 != new_cref_id:
-        _change_coref_id(hg, edge1, new_cref_id)
-        update = True
-    if cref_id_2 != new_cref_id:
-        _change_coref_id(hg, edge2, new_cref_id)
-        update = True
+    cref_id, update = _union(hg, edge1, edge2)
 
     hg.add((coref_connector, edge1, edge2), primary=False)
 
     if update:
-        _update_main_coref(hg, edge1)
+        _update_main_coref(hg, cref_id)
+
+
+class MainCorefResolver(object):
+    """Resolves edges to the main edges of their coreference sets, like
+    main_coref(), with a map from coreference identifiers to main edges kept
+    in memory. The map is loaded with one scan of the _main_coref edges, and
+    is updated by make_corefs() while the resolver exists. Sets whose main
+    edge is not in the map (for example, because it was written by another
+    process) are searched for and then added to it.
+    """
+
+    def __init__(self, hg):
+        self.hg = hg
+        self.main_corefs = {}
+        for coref_edge in hg.search((main_coref_connector, '*', '*'), strict=True):
+            self.main_corefs[coref_edge[1].to_str()] = coref_edge[2]
+        _resolvers.add(self)
+
+    def main_coref_from_id(self, cref_id):
+        """Returns main edge in the coreference set for the given
+        identifier."""
+        main_edge = self.main_corefs.get(cref_id)
+        if main_edge is None:
+            main_edge = main_coref_from_id(self.hg, cref_id)
+            if main_edge is not None:
+                self.main_corefs[cref_id] = main_edge
+        return main_edge
+
+    def main_coref(self, edge):
+        """Returns main edge for the coreference set that the given edge
+        belongs to."""
+        cref_id = coref_id(self.hg, edge)
+        if cref_id is None:
+            return edge
+        return self.main_coref_from_id(cref_id)
@@ -1,5 +1,3 @@
-import graphbrain.constants as const
-
 
 def lemma(hg, atom, same_if_none=False):
     """Returns the lemma of the given atom if it exists, None otherwise.
@@ -9,9 +7,9 @@ def lemma(hg, atom, same_if_none=False):
     returns atom items when lemma does not exist. (default: False)
     """
     if atom.atom:
-        satom = atom.simplify()
-        for lemma_edge in hg.search((const.lemma_connector, satom, '*'), strict=True):
-            return lemma_edge[2]
+        _lemma = hg.lemma_of((atom,))[0]
+        if _lemma is not None:
+            return _lemma
 
     if same_if_none:
         return atom
@@ -44,28 +42,26 @@ def deep_lemma(hg, edge, same_if_none=False):
 
 
 def lemma_degrees(hg, edge):
-    """Finds all the atoms that share the same given lemma
+    """Finds all the atoms that share the same lemma as the given atom
     and computes the sum of both their degrees and deep degrees.
     These two sums are returned.
 
+    The atoms are the given one and the ones with its lemma in the lemma
+    edges (see Hypergraph.atoms_with_lemma()), which relate simplified
+    atoms. Other atoms with the same roots are not included.
+
     If the parameter edge is non-atomic, this function simply returns
     the degree and deep degree of that edge.
     """
     if edge.atom:
-        roots = {edge.root()}
-
-        # find lemma
-        satom = edge.simplify()
-        for edge in hg.search((const.lemma_connector, satom, '*'), strict=True):
-            roots.add(edge[2].root())
+        atoms = {edge}
+        _lemma = hg.lemma_of((edge,))[0]
+        if _lemma is not None:
+            atoms.update(hg.atoms_with_lemma(_lemma))
 
         # compute degrees
-        d = 0
-        dd = 0
-        for r in roots:
-            atoms = set(hg.atoms_with_root(r))
-            d += sum([hg.degree(atom) for atom in atoms])
-            dd += sum([hg.deep_degree(atom) for atom in atoms])
+        d = sum([hg.degree(atom) for atom in atoms])
+        dd = sum([hg.deep_degree(atom) for atom in atoms])
 
         return d, dd
     else:
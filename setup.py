@@ -70,6 +70,7 @@ install_requires = [
         'plyvel',
         'progressbar2',
         'scikit-learn',
+        'sortedcontainers',
         'spacy',
         'spacy-experimental==0.6.1',
         'spacy-transformers',
@@ -111,6 +112,9 @@ setup(
             'pytest',
             'Sphinx',
             'sphinx_rtd_theme'
+        ],
+        'zstd': [
+            'zstandard'
         ]
     },
     package_data={'': ['data/*.csv']},